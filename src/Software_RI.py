@@ -2,25 +2,36 @@
 # D50 y C80 de un recinto, según la Norma ISO 3382 (UNE-EN ISO 3382, 2010)
 import funciones as f
 import pandas as pd
+import logging
+import sys
 from tkinter import *
 # Etapa de generación y adquisición
 import generacion_adquisicion as ga
-# Etapa de preprocesamiento y filtrado
-import preprocesamiento_filtrado as pf
 # Etapa de suavizado y cálculo
 import suavizado_calculo as sc
+# Análisis por lotes desde la línea de comandos
+import analisis_lote as al
+# Cadena de análisis con resultados memoizados por etapa
+import etapas as et
+# Almacén de resultados (SQLite)
+import almacen_resultados as ar
 
 if __name__ == "__main__":
-    file = 'data\IR2\Mono.wav'
-    data, fs = f.read_wav(file)
+    if len(sys.argv) > 1:
+        # Modo por lotes, por ejemplo: python Software_RI.py "data/IR*/Mono.wav" -o resultados.csv
+        al.main(sys.argv[1:])
+        sys.exit()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    file = 'data/IR2/Mono.wav'
+    # Cadena de etapas memoizadas: al recalcular sólo se rehacen las etapas
+    # cuyos parámetros cambiaron (por ejemplo el límite de integración)
+    analisis = et.AnalisisRI()
+    data, fs = analisis.leer(file).valor
 
     def graph_ir():
         f.time_domain_plot(data, fs)
     
-    
-    frec = pf.filtro_IEC(file)  # lista con las frecuencias filtradas por banda de octava     
-    nominal_frec = [31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000]
-    
     ## Genero un gráfico para determinar el corte de la integral de Schroeder
     log_signal = f.esc_log(data)
     f.time_domain_plot(log_signal, fs)
@@ -31,26 +42,29 @@ if __name__ == "__main__":
     window.title("Suavizado y calculo")
 
     limit = Entry(window, width=50)
-    limit.insert(0, "Ingrese el límite de integración en segundos: ")
+    limit.insert(0, "Ingrese el límite de integración en segundos (vacío: automático)")
     limit.pack()
     
     def param():        
-        list_param = [] # Lista que almacena los parámetros acústicos por banda de octava
-        for i in range(len(nominal_frec)):
-            log_signal_i = f.esc_log(frec[i][1])
-            param_i = sc.parametros_acústicos(frec[i][1], int(limit.get()))
-            list_param.append(nominal_frec[i])
-            list_param.append(param_i)
-        print(list_param)
+        limite = sc.leer_limite(limit.get())
+        frecuencias, resultados = analisis.resultados(file, limite)
+        filtrado = analisis.filtrar(analisis.leer(file))
+        envolventes = analisis.suavizar(filtrado, 1000).valor
+        _, bandas, _ = filtrado.valor
+        for i, resultado in enumerate(resultados):
+            sc.graficar_parametros(bandas[i], resultado, fs, graph_name="{} Hz".format(frecuencias[i]),
+                                   data_suav=envolventes[i])
 
-        index = list_param[::2]
-        list_param_df = list_param[1::2]
-    
-        df = pd.DataFrame(list_param_df, index = index, columns =["EDT", "T10", "T20", "T30", "C80", "D50"])
+        df = pd.DataFrame([resultado.lista() for resultado in resultados], index=frecuencias, columns=sc.PARAMETROS)
         df = df.transpose()
         label = Label(window, text=str(df))
         label.pack()
-        df.to_csv('resultados.csv')
+        # Los resultados se agregan al almacén; si ya estaban con el mismo límite no se duplican
+        clave, ajustes = ar.configuracion(limit=limite)
+        filas = [dict(zip(sc.PARAMETROS, resultado.lista()), canal=0, banda=frecuencia)
+                 for frecuencia, resultado in zip(frecuencias, resultados)]
+        with ar.AlmacenResultados('resultados.sqlite') as almacen:
+            almacen.agregar(file, clave, ajustes, filas)
         print(df)
     
     button = Button(window, 
@@ -0,0 +1,234 @@
+# Almacén de resultados en SQLite. Cada análisis de una RI se agrega (nunca se
+# sobrescribe) identificado por el hash del contenido del archivo, la sala, la
+# posición y la configuración del análisis, con una fila de parámetros por
+# canal y banda. Volver a analizar una RI con la misma configuración se omite.
+#
+# Ejemplo:
+#   python analisis_lote.py "../data/IR*/Mono.wav" -a resultados.sqlite
+import json
+import hashlib
+import logging
+import os
+import sqlite3
+import pandas as pd
+from funciones import precision
+from etapas import huella_archivo
+from suavizado_calculo import PARAMETROS
+
+logger = logging.getLogger(__name__)
+
+# Configuración por defecto de un análisis (argumentos de analisis_lote.analizar_archivo)
+AJUSTES = dict(limit=None, fraccion=1, compensacion=False, multitasa=False, banco="iec", recortar=False, dtype=None)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS analisis (
+    id INTEGER PRIMARY KEY,
+    huella TEXT NOT NULL,
+    sala TEXT NOT NULL,
+    posicion TEXT NOT NULL,
+    configuracion TEXT NOT NULL,
+    ajustes TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    fecha TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (huella, sala, posicion, configuracion)
+);
+CREATE INDEX IF NOT EXISTS analisis_sala ON analisis (sala, posicion);
+CREATE INDEX IF NOT EXISTS analisis_configuracion ON analisis (configuracion);
+CREATE TABLE IF NOT EXISTS parametros (
+    analisis_id INTEGER NOT NULL REFERENCES analisis (id),
+    canal INTEGER NOT NULL,
+    banda REAL NOT NULL,
+    {columnas},
+    PRIMARY KEY (analisis_id, canal, banda)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS parametros_banda ON parametros (banda);
+""".format(columnas=",\n    ".join('"{}" REAL'.format(nombre) for nombre in PARAMETROS))
+
+def configuracion(**ajustes):
+    """
+    Normaliza los ajustes de un análisis y devuelve (clave, ajustes).
+
+    Parametros
+    ----------
+    ajustes:
+        Argumentos de analisis_lote.analizar_archivo (limit, fraccion, compensacion,
+        multitasa, banco, recortar, dtype). Los que faltan toman el valor de AJUSTES;
+        dtype None se reemplaza por la precisión de la política actual.
+
+    Returns
+    -------
+    clave: str
+        SHA-1 de los ajustes completos. Dos análisis con la misma clave dan los mismos resultados.
+    ajustes: dict
+        Ajustes completos.
+    """
+    desconocidos = set(ajustes) - set(AJUSTES)
+    if desconocidos:
+        raise ValueError("Ajustes desconocidos: {}".format(", ".join(sorted(desconocidos))))
+    ajustes = dict(AJUSTES, **ajustes)
+    ajustes["dtype"] = precision(ajustes["dtype"]).name
+    if ajustes["limit"] is not None:
+        ajustes["limit"] = float(ajustes["limit"])
+    texto = json.dumps(ajustes, sort_keys=True)
+    return hashlib.sha1(texto.encode()).hexdigest(), ajustes
+
+def ubicacion(archivo):
+    """
+    Sala y posición de una RI a partir de su ruta: el nombre del directorio y el
+    del archivo sin extensión (por ejemplo "data/IR2/Mono.wav" -> ("IR2", "Mono")).
+    """
+    ruta = os.path.abspath(archivo)
+    return os.path.basename(os.path.dirname(ruta)), os.path.splitext(os.path.basename(ruta))[0]
+
+class AlmacenResultados:
+    """
+    Tabla de resultados por análisis, canal y banda en una base SQLite.
+
+    Parametros
+    ----------
+    ruta: str
+        Archivo de la base de datos. Se crea si no existe.
+
+    Ejemplo
+    -------
+    with AlmacenResultados('resultados.sqlite') as almacen:
+        clave, ajustes = configuracion(fraccion=1)
+        if not almacen.existe(archivo, clave):
+            almacen.agregar(archivo, clave, ajustes, filas)
+        df = almacen.consultar(sala='IR2', banda=1000)
+        resumen = almacen.resumen('T30', por=('sala', 'banda'))
+    """
+    def __init__(self, ruta="resultados.sqlite"):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta)
+        # WAL: se puede consultar la base mientras otro proceso agrega resultados
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.executescript(_ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *error):
+        self.cerrar()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def _id(self, huella, sala, posicion, clave):
+        fila = self.conexion.execute(
+            "SELECT id FROM analisis WHERE huella=? AND sala=? AND posicion=? AND configuracion=?",
+            (huella, sala, posicion, clave)).fetchone()
+        return None if fila is None else fila[0]
+
+    def existe(self, archivo, clave, sala=None, posicion=None):
+        """
+        True si ya hay resultados de archivo (por su contenido, no por su ruta)
+        en la sala y posición indicadas con la configuración clave.
+        Si sala o posicion son None se obtienen de la ruta con ubicacion().
+        """
+        sala, posicion = self._ubicacion(archivo, sala, posicion)
+        return self._id(huella_archivo(archivo), sala, posicion, clave) is not None
+
+    def agregar(self, archivo, clave, ajustes, filas, sala=None, posicion=None):
+        """
+        Agrega los resultados de un análisis en una sola transacción.
+
+        Parametros
+        ----------
+        archivo: str
+            Ruta del archivo ".wav" analizado.
+        clave, ajustes:
+            Configuración del análisis, como la devuelve configuracion().
+        filas: list de dict o pandas DataFrame
+            Una fila por canal y banda con las columnas canal, banda y las de PARAMETROS
+            (el formato de analisis_lote.analizar_archivo).
+        sala, posicion: str
+            Por defecto se obtienen de la ruta con ubicacion().
+
+        Returns
+        -------
+        True si se agregaron los resultados, False si ya existían (no se modifican).
+        """
+        sala, posicion = self._ubicacion(archivo, sala, posicion)
+        filas = pd.DataFrame(filas)
+        with self.conexion:
+            cursor = self.conexion.execute(
+                "INSERT OR IGNORE INTO analisis (huella, sala, posicion, configuracion, ajustes, archivo) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (huella_archivo(archivo), sala, posicion, clave, json.dumps(ajustes, sort_keys=True), archivo))
+            if cursor.rowcount == 0:
+                return False
+            columnas = ["canal", "banda"] + PARAMETROS
+            # sqlite3 sólo acepta tipos de Python: los valores pasan por float64
+            valores = filas[columnas].to_numpy(dtype="float64").tolist()
+            self.conexion.executemany(
+                "INSERT INTO parametros (analisis_id, {}) VALUES (?, {})".format(
+                    ", ".join('"{}"'.format(c) for c in columnas), ", ".join("?"*len(columnas))),
+                [(cursor.lastrowid, int(canal), *resto) for canal, *resto in valores])
+        return True
+
+    def leer(self, archivo, clave, sala=None, posicion=None):
+        """
+        Resultados de archivo con la configuración clave en el formato de
+        analisis_lote.analizar_archivo: pandas DataFrame con las columnas
+        archivo, canal, banda y las de PARAMETROS.
+        """
+        sala, posicion = self._ubicacion(archivo, sala, posicion)
+        df = self.consultar(sala=sala, posicion=posicion, clave=clave, huella=huella_archivo(archivo))
+        return df.assign(archivo=archivo)[["archivo", "canal", "banda"] + PARAMETROS]
+
+    def consultar(self, sala=None, posicion=None, banda=None, clave=None, huella=None):
+        """
+        Devuelve los resultados como pandas DataFrame, con las columnas archivo,
+        huella, sala, posicion, configuracion, canal, banda y las de PARAMETROS.
+        Los argumentos que no son None filtran por igualdad.
+        """
+        condiciones = {"a.sala": sala, "a.posicion": posicion, "p.banda": banda,
+                       "a.configuracion": clave, "a.huella": huella}
+        filtros = [(columna, valor) for columna, valor in condiciones.items() if valor is not None]
+        consulta = ("SELECT a.archivo, a.huella, a.sala, a.posicion, a.configuracion, p.canal, p.banda, {} "
+                    "FROM parametros p JOIN analisis a ON a.id = p.analisis_id").format(
+                        ", ".join('p."{}"'.format(nombre) for nombre in PARAMETROS))
+        if filtros:
+            consulta += " WHERE " + " AND ".join("{}=?".format(columna) for columna, _ in filtros)
+        consulta += " ORDER BY a.id, p.canal, p.banda"
+        return pd.read_sql_query(consulta, self.conexion, params=[valor for _, valor in filtros])
+
+    def resumen(self, parametro, por=("sala", "banda"), clave=None):
+        """
+        Agrega un parámetro en la base de datos (sin cargar todas las filas).
+
+        Parametros
+        ----------
+        parametro: str
+            Uno de PARAMETROS.
+        por: tuple
+            Columnas de agrupación: sala, posicion, configuracion, canal o banda.
+        clave: str
+            Si no es None sólo se consideran los análisis con esa configuración.
+
+        Returns
+        -------
+        pandas DataFrame indexado por las columnas de por, con las columnas
+        n, media, minimo y maximo.
+        """
+        if parametro not in PARAMETROS:
+            raise ValueError("parametro debe ser uno de {}".format(", ".join(PARAMETROS)))
+        tablas = {"sala": "a", "posicion": "a", "configuracion": "a", "canal": "p", "banda": "p"}
+        if not set(por) <= set(tablas):
+            raise ValueError("por sólo admite {}".format(", ".join(tablas)))
+        grupos = ", ".join("{}.{}".format(tablas[columna], columna) for columna in por)
+        consulta = ('SELECT {g}, COUNT(p."{p}") AS n, AVG(p."{p}") AS media, MIN(p."{p}") AS minimo, '
+                    'MAX(p."{p}") AS maximo FROM parametros p JOIN analisis a ON a.id = p.analisis_id').format(
+                        g=grupos, p=parametro)
+        parametros = []
+        if clave is not None:
+            consulta += " WHERE a.configuracion=?"
+            parametros.append(clave)
+        consulta += " GROUP BY {g} ORDER BY {g}".format(g=grupos)
+        return pd.read_sql_query(consulta, self.conexion, params=parametros).set_index(list(por))
+
+    @staticmethod
+    def _ubicacion(archivo, sala, posicion):
+        sala_ruta, posicion_ruta = ubicacion(archivo)
+        return sala_ruta if sala is None else sala, posicion_ruta if posicion is None else posicion
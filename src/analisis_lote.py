@@ -0,0 +1,282 @@
+# Análisis por lotes de respuestas al impulso desde la línea de comandos.
+# Calcula los parámetros acústicos por banda de todas las RI indicadas y
+# guarda una única tabla de resultados en formato CSV o Parquet.
+#
+# Ejemplo:
+#   python analisis_lote.py "data/IR*/Mono.wav" "noteboks/central-hall-university-york/b-format/*.wav" -o resultados.csv
+import argparse
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+from funciones import FuenteAudio, modo_precision, precision
+from preprocesamiento_filtrado import BancoFiltrosIEC, BancoFiltrosMultitasa, BancoFiltrosFFT, recortar_ri
+from suavizado_calculo import calculo_parametros, deteccion_inicio, factor_diezmado, PARAMETROS
+from almacen_resultados import AlmacenResultados, configuracion
+from telemetria import medir
+
+logger = logging.getLogger(__name__)
+
+def buscar_archivos(rutas):
+    """
+    Expande directorios y patrones glob a una lista ordenada de archivos ".wav".
+
+    Parametros
+    ----------
+    rutas: list
+        Directorios, archivos o patrones glob (por ejemplo "data/IR*/Mono.wav").
+
+    Returns
+    -------
+    list con las rutas de los archivos, sin repetidos.
+    """
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            encontrados = sorted(glob.glob(os.path.join(ruta, "**", "*.wav"), recursive=True))
+        else:
+            encontrados = sorted(glob.glob(ruta, recursive=True))
+        if not encontrados:
+            logger.warning("No se encontraron archivos para %s", ruta)
+        for archivo in encontrados:
+            if archivo not in archivos:
+                archivos.append(archivo)
+    return archivos
+
+def analizar_archivo(archivo, limit=None, fraccion=1, compensacion=False, multitasa=False, banco="iec", recortar=False, dtype=None):
+    """
+    Calcula los parámetros acústicos por banda y por canal de una RI.
+
+    Parametros
+    ----------
+    archivo: str
+        Ruta del archivo ".wav".
+    limit: float
+        Límite de integración de Schroeder en segundos. Si es None se estima
+        para cada banda y canal con el método de Lundeby.
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+    compensacion: bool
+        Si es True se agrega a la integral de Schroeder el término de compensación del ruido.
+    multitasa: bool
+        Si es True la energía de cada banda se diezma según su ancho de banda.
+    banco: str
+        "iec": BancoFiltrosIEC. "multitasa": BancoFiltrosMultitasa, cada banda se
+        analiza a la frecuencia de muestreo reducida en la que fue filtrada.
+        "fft": BancoFiltrosFFT, bandas de fase cero calculadas en frecuencia.
+    recortar: bool
+        Si es True se descartan el silencio inicial y la cola de ruido sobrante
+        (ver recortar_ri) antes de filtrar.
+    dtype: str
+        Precisión del análisis, "float64" o "float32" (ver funciones.fijar_precision).
+        Por defecto la de la política actual.
+
+    Returns
+    -------
+    list de dict, una fila por canal y banda con las columnas
+    archivo, canal, banda y los parámetros de PARAMETROS.
+    """
+    with modo_precision(precision(dtype)), medir("analizar_archivo", archivo=archivo):
+        return _analizar_archivo(archivo, limit, fraccion, compensacion, multitasa, banco, recortar)
+
+def _analizar_archivo(archivo, limit, fraccion, compensacion, multitasa, banco, recortar):
+    with medir("leer"):
+        fuente = FuenteAudio(archivo)
+        data, fs = fuente.leer(always_2d=True), fuente.fs
+    if recortar:
+        ri = recortar_ri(data, fs)
+        logger.debug("%s: muestras [%d, %d) de %d", archivo, ri.inicio, ri.fin, ri.n_original)
+        data = ri.data
+    # Todos los canales se filtran y analizan juntos
+    if banco == "multitasa":
+        filtros = BancoFiltrosMultitasa(fs, fraccion)
+        _, bandas, tasas = zip(*filtros.filtrar(data))
+    else:
+        if banco == "iec":
+            filtros = BancoFiltrosIEC(fs, fraccion)
+        elif banco == "fft":
+            filtros = BancoFiltrosFFT(fs, fraccion)
+        else:
+            raise ValueError("banco debe ser 'iec', 'multitasa' o 'fft'")
+        bandas = filtros.filtrar(data)
+        tasas = [fs]*len(bandas)
+    diezmados = [factor_diezmado(frecuencia, tasa, fraccion) if multitasa else 1
+                 for frecuencia, tasa in zip(filtros.frecuencias, tasas)]
+    # Los parámetros de energía se miden desde el inicio de la RI de banda ancha
+    inicio = deteccion_inicio(data)
+    valores = []
+    for frecuencia, banda, tasa, diezmado in zip(filtros.frecuencias, bandas, tasas, diezmados):
+        with medir("banda", banda=frecuencia):
+            valores.append(calculo_parametros(banda, limit, tasa, compensacion, diezmado,
+                                              np.round(inicio*tasa/fs).astype(int)).lista())
+    filas = []
+    for canal in range(data.shape[1]):
+        for frecuencia, valores_banda in zip(filtros.frecuencias, valores):
+            fila = {"archivo": archivo, "canal": canal, "banda": frecuencia}
+            fila.update((nombre, valor[canal]) for nombre, valor in zip(PARAMETROS, valores_banda))
+            filas.append(fila)
+    return filas
+
+def analizar_lote(archivos, limit=None, fraccion=1, n_workers=None, max_pendientes=None, compensacion=False, multitasa=False, banco="iec", recortar=False, dtype=None, almacen=None):
+    """
+    Analiza una lista de RI en paralelo con una cantidad acotada de archivos en memoria.
+
+    Parametros
+    ----------
+    archivos: list
+        Rutas de los archivos ".wav".
+    limit: float
+        Límite de integración de Schroeder en segundos. Si es None se estima
+        para cada banda y canal con el método de Lundeby.
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+    n_workers: int
+        Cantidad de procesos. Por defecto la cantidad de núcleos disponibles.
+    max_pendientes: int
+        Máxima cantidad de archivos enviados al pool y aún no terminados.
+        Por defecto 2*n_workers.
+    compensacion: bool
+        Si es True se agrega a la integral de Schroeder el término de compensación del ruido.
+    multitasa: bool
+        Si es True la energía de cada banda se diezma según su ancho de banda.
+    banco: str
+        Banco de filtros: "iec", "multitasa" o "fft" (ver analizar_archivo).
+    recortar: bool
+        Si es True se recorta cada RI con recortar_ri antes de analizarla.
+    dtype: str
+        Precisión del análisis y de la tabla de resultados, "float64" o "float32".
+        Por defecto la de la política actual.
+    almacen: AlmacenResultados
+        Si no es None, los archivos cuyo contenido ya fue analizado con la misma
+        configuración (en la misma sala y posición) no se vuelven a analizar y sus
+        resultados se leen del almacén; los nuevos se agregan a medida que terminan.
+
+    Returns
+    -------
+    pandas DataFrame con una fila por archivo, canal y banda, en el orden de archivos.
+    Los archivos que no se pudieron analizar se informan en el log y se omiten.
+    """
+    # La precisión se pasa explícitamente: los procesos no heredan la política
+    dtype = precision(dtype).name
+    resultados = {}
+    registro = ()
+    if almacen is not None:
+        clave, ajustes = configuracion(limit=limit, fraccion=fraccion, compensacion=compensacion, multitasa=multitasa,
+                                       banco=banco, recortar=recortar, dtype=dtype)
+        registro = (almacen, clave, ajustes)
+        for archivo in archivos:
+            if almacen.existe(archivo, clave):
+                resultados[archivo] = almacen.leer(archivo, clave).to_dict("records")
+        logger.info("%d archivos ya analizados en %s", len(resultados), almacen.ruta)
+    n_workers = n_workers or os.cpu_count() or 1
+    max_pendientes = max_pendientes or 2*n_workers
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        pendientes = {}
+        for archivo in archivos:
+            if archivo in resultados:
+                continue
+            # Se espera a que termine algún archivo antes de enviar más
+            while len(pendientes) >= max_pendientes:
+                listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    _recolectar(futuro, pendientes.pop(futuro), resultados, *registro)
+            futuro = pool.submit(analizar_archivo, archivo, limit, fraccion, compensacion=compensacion,
+                                 multitasa=multitasa, banco=banco, recortar=recortar, dtype=dtype)
+            pendientes[futuro] = archivo
+        for futuro in list(pendientes):
+            _recolectar(futuro, pendientes.pop(futuro), resultados, *registro)
+
+    filas = [fila for archivo in archivos for fila in resultados.get(archivo, [])]
+    df = pd.DataFrame(filas, columns=["archivo", "canal", "banda"] + PARAMETROS)
+    df[PARAMETROS] = df[PARAMETROS].astype(dtype)
+    return df
+
+def validar_precision(archivos, **opciones):
+    """
+    Compara el análisis en float32 con el de float64 sobre los mismos archivos.
+
+    Parametros
+    ----------
+    archivos: list
+        Rutas de los archivos ".wav".
+    opciones:
+        Argumentos de analizar_lote (limit, fraccion, banco, etc.), salvo dtype.
+
+    Returns
+    -------
+    pandas DataFrame con una fila por banda y parámetro y las columnas
+    desvio_max (diferencia absoluta máxima) y desvio_relativo_max (respecto
+    de float64), sobre todos los archivos y canales.
+    """
+    referencia = analizar_lote(archivos, dtype="float64", **opciones)
+    rapido = analizar_lote(archivos, dtype="float32", **opciones)
+    desvio = (rapido[PARAMETROS].astype("float64") - referencia[PARAMETROS]).abs()
+    relativo = (desvio / referencia[PARAMETROS].abs()).replace([np.inf, -np.inf], np.nan)
+    bandas = referencia["banda"]
+    informe = pd.DataFrame({"desvio_max": desvio.groupby(bandas).max().stack(),
+                            "desvio_relativo_max": relativo.groupby(bandas).max().stack()})
+    return informe.rename_axis(["banda", "parametro"])
+
+def _recolectar(futuro, archivo, resultados, almacen=None, clave=None, ajustes=None):
+    try:
+        resultados[archivo] = futuro.result()
+        logger.info("Analizado %s", archivo)
+    except Exception as error:
+        logger.warning("No se pudo analizar %s: %s", archivo, error)
+        return
+    if almacen is not None:
+        # Se guarda apenas termina: si el lote se interrumpe no se pierde lo analizado
+        almacen.agregar(archivo, clave, ajustes, resultados[archivo])
+
+def guardar_resultados(df, salida):
+    """
+    Guarda la tabla de resultados. El formato se elige por la extensión:
+    ".parquet" (requiere pyarrow o fastparquet) o ".csv".
+    """
+    if salida.endswith(".parquet"):
+        df.to_parquet(salida, index=False)
+    else:
+        df.to_csv(salida, index=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cálculo por lotes de parámetros acústicos (ISO 3382) de respuestas al impulso.")
+    parser.add_argument("rutas", nargs="+", help="Directorios, archivos o patrones glob de RI en formato .wav")
+    parser.add_argument("-o", "--salida", default=None, help="Archivo de salida .csv o .parquet (por defecto resultados.csv si no se usa --almacen)")
+    parser.add_argument("-a", "--almacen", default=None, help="Base SQLite de resultados: se agregan los nuevos y se omiten las RI ya analizadas con la misma configuración")
+    parser.add_argument("-l", "--limite", type=float, default=None, help="Límite de integración de Schroeder en segundos (por defecto automático, Lundeby)")
+    parser.add_argument("-c", "--compensacion", action="store_true", help="Compensar el truncamiento de la integral de Schroeder")
+    parser.add_argument("-m", "--multitasa", action="store_true", help="Diezmar la energía de cada banda según su ancho de banda")
+    parser.add_argument("-b", "--banco", default="iec", choices=["iec", "multitasa", "fft"],
+                        help="Banco de filtros: iec (IIR), multitasa (árbol de diezmado) o fft (fase cero)")
+    parser.add_argument("-r", "--recortar", action="store_true", help="Descartar el silencio inicial y la cola de ruido sobrante")
+    parser.add_argument("-f", "--fraccion", type=int, default=1, choices=[1, 3], help="1: octava, 3: tercio de octava")
+    parser.add_argument("-p", "--precision", default="float64", choices=["float64", "float32"],
+                        help="Precisión del análisis: float64 o float32 (más rápido, la mitad de memoria)")
+    parser.add_argument("--validar", action="store_true", help="Informar el desvío de float32 respecto de float64 en lugar de guardar resultados")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Cantidad de procesos")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    archivos = buscar_archivos(args.rutas)
+    logger.info("%d archivos a analizar", len(archivos))
+    opciones = dict(compensacion=args.compensacion, multitasa=args.multitasa, banco=args.banco, recortar=args.recortar)
+    if args.validar:
+        informe = validar_precision(archivos, limit=args.limite, fraccion=args.fraccion, n_workers=args.workers, **opciones)
+        logger.info("Desvío de float32 respecto de float64:\n%s", informe.to_string())
+        return informe
+    almacen = AlmacenResultados(args.almacen) if args.almacen else None
+    try:
+        df = analizar_lote(archivos, args.limite, args.fraccion, args.workers, dtype=args.precision, almacen=almacen, **opciones)
+    finally:
+        if almacen is not None:
+            almacen.cerrar()
+    salida = args.salida or (None if almacen else "resultados.csv")
+    if salida:
+        guardar_resultados(df, salida)
+        logger.info("Resultados guardados en %s", salida)
+    return df
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# Benchmarks de las etapas del análisis: generación (ruido rosa, sine sweep),
+# deconvolución, filtrado por bandas, suavizado, Schroeder y parámetros
+# acústicos, sobre las RI del repositorio y RI sintéticas (ir_sint) de varios
+# largos, frecuencias de muestreo y cantidades de canales. Informa el tiempo,
+# el throughput (muestras/s) y el pico de memoria de cada caso, y los compara
+# con una línea base guardada para detectar regresiones.
+#
+# Ejemplo:
+#   python benchmark.py --guardar linea_base.json      # registra la línea base de esta máquina
+#   python benchmark.py --comparar linea_base.json     # sale con código 1 si hay regresiones
+#   python benchmark.py --rapido -k filtro_IEC
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from scipy import signal
+from funciones import read_wav
+from generacion_adquisicion import ruidoRosa_voss_modified, log_sweep_invfilter
+from preprocesamiento_filtrado import ir_sint, respuesta_impulso, filtro_IEC
+from suavizado_calculo import suavizado_señal, schroeder, parametros_acústicos
+
+logger = logging.getLogger(__name__)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+YORK = os.path.join(RAIZ, "noteboks", "central-hall-university-york", "b-format")
+RI_REPOSITORIO = [os.path.join(RAIZ, "data", "IR1", "Mono.wav"),
+                  os.path.join(RAIZ, "data", "IR2", "Mono.wav"),
+                  os.path.join(YORK, "ir_centre_stalls.wav"),
+                  os.path.join(YORK, "ir_row_3l_centre_mid.wav")]
+# Bandas de octava y T60 de la Central Hall de York, como en preprocesamiento_filtrado
+FRECUENCIAS_SINT = [31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000]
+T60_SINT = [2.67, 1.58, 1.42, 1.07, 1.11, 1.12, 1.03, 0.86, 0.63, 1.95]
+# (segundos, fs, canales) de las RI sintéticas: largos, frecuencias de muestreo y canales
+SINTETICAS = [(1, 44100, 1), (3, 44100, 1), (6, 44100, 1), (3, 48000, 1), (3, 96000, 1), (3, 44100, 4)]
+SINTETICAS_RAPIDO = [(1, 44100, 1), (1, 48000, 2)]
+DURACION_BARRIDO = 3
+# Duración mínima de cada repetición cronometrada, en segundos
+TIEMPO_REPETICION = 0.1
+
+@dataclass
+class Caso:
+    """
+    Un caso de benchmark.
+
+    Atributos
+    ---------
+    nombre: str
+        "<etapa>/<entrada>".
+    etapa: str
+        Función medida.
+    muestras: int
+        Muestras procesadas por llamada (muestras por canales), para el throughput.
+    funcion: Callable
+        Llamada sin argumentos que ejecuta la etapa.
+    """
+    nombre: str
+    etapa: str
+    muestras: int
+    funcion: Callable
+
+@contextlib.contextmanager
+def _silencio():
+    # Algunas etapas imprimen o registran información; no se mezcla con el informe
+    logging.disable(logging.INFO)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+@contextlib.contextmanager
+def _en_directorio(directorio):
+    anterior = os.getcwd()
+    os.chdir(directorio)
+    try:
+        yield
+    finally:
+        os.chdir(anterior)
+
+def entradas(rapido=False):
+    """
+    RI de entrada de los benchmarks: las del repositorio (salvo con rapido, sólo
+    data/IR2) y las sintéticas generadas con ir_sint.
+
+    Returns
+    -------
+    list de (nombre, data, fs). data es (muestras,) o (muestras, canales).
+    """
+    rutas = RI_REPOSITORIO[1:2] if rapido else RI_REPOSITORIO
+    lista = []
+    for ruta in rutas:
+        data, fs = read_wav(ruta)
+        nombre = "{}-{}".format(os.path.basename(os.path.dirname(ruta)), os.path.splitext(os.path.basename(ruta))[0])
+        lista.append((nombre, data, fs))
+    for segundos, fs, canales in (SINTETICAS_RAPIDO if rapido else SINTETICAS):
+        # Canales con tiempos de reverberación levemente distintos
+        data = np.column_stack([ir_sint(FRECUENCIAS_SINT, np.multiply(T60_SINT, 1 + 0.05*c), segundos, fs, guardar_wav=False)
+                                for c in range(canales)])
+        lista.append(("sint-{}s-{}Hz-{}ch".format(segundos, fs, canales), data[:, 0] if canales == 1 else data, fs))
+    return lista
+
+def casos(directorio, rapido=False):
+    """
+    Arma los casos de benchmark de todas las etapas.
+
+    Parametros
+    ----------
+    directorio: str
+        Directorio de trabajo para los archivos ".wav" intermedios (grabaciones
+        simuladas para respuesta_impulso).
+    rapido: bool
+        Si es True se usan menos entradas (para una verificación rápida).
+
+    Returns
+    -------
+    list de Caso.
+    """
+    lista = []
+    # Generación: sólo depende del largo y la frecuencia de muestreo
+    generacion = dict.fromkeys((segundos, fs) for segundos, fs, _ in (SINTETICAS_RAPIDO if rapido else SINTETICAS))
+    for segundos, fs in generacion:
+        entrada = "{}s-{}Hz".format(segundos, fs)
+        lista.append(Caso("ruidoRosa_voss_modified/" + entrada, "ruidoRosa_voss_modified", segundos*fs,
+                          lambda segundos=segundos, fs=fs: ruidoRosa_voss_modified(segundos, fs, seed=0)))
+        lista.append(Caso("log_sweep_invfilter/" + entrada, "log_sweep_invfilter", segundos*fs,
+                          lambda segundos=segundos, fs=fs: log_sweep_invfilter(20, 20000, segundos, fs, guardar_wav=False)))
+
+    for nombre, data, fs in entradas(rapido):
+        muestras = data.size
+        if data.ndim == 1:
+            # Grabación simulada: el sine sweep convolucionado con la RI
+            barrido, invfilter = log_sweep_invfilter(20, 20000, DURACION_BARRIDO, fs, guardar_wav=False)
+            grabacion = os.path.join(directorio, "grabacion-{}.wav".format(nombre))
+            filtro = os.path.join(directorio, "invfilter-{}.wav".format(nombre))
+            sf.write(grabacion, signal.fftconvolve(barrido, data), fs, subtype="FLOAT")
+            sf.write(filtro, invfilter, fs, subtype="FLOAT")
+            lista.append(Caso("respuesta_impulso/" + nombre, "respuesta_impulso", sf.info(grabacion).frames,
+                              lambda grabacion=grabacion, filtro=filtro: respuesta_impulso(grabacion, filtro, guardar_wav=False)))
+        lista.append(Caso("filtro_IEC/" + nombre, "filtro_IEC", muestras,
+                          lambda data=data, fs=fs: filtro_IEC(data, fs, guardar_wav=False)))
+        lista.append(Caso("suavizado_señal/" + nombre, "suavizado_señal", muestras,
+                          lambda data=data: suavizado_señal(data, 1000)))
+        lista.append(Caso("schroeder/" + nombre, "schroeder", muestras,
+                          lambda data=data, fs=fs: schroeder(data, None, fs)))
+        lista.append(Caso("parametros_acústicos/" + nombre, "parametros_acústicos", muestras,
+                          lambda data=data, fs=fs: parametros_acústicos(data, None, fs=fs, graficar=False)))
+    return lista
+
+def medir(caso, repeticiones=5):
+    """
+    Mide un caso: una llamada de calentamiento, repeticiones mediciones cronometradas
+    (de al menos TIEMPO_REPETICION segundos cada una) y una llamada con tracemalloc para el pico de memoria (las asignaciones de
+    Numpy incluidas), que no se cronometra porque tracemalloc la hace más lenta.
+
+    Returns
+    -------
+    dict con caso, etapa, muestras, tiempo_min, tiempo_mediana (en segundos),
+    muestras_s (muestras por segundo, con tiempo_min) y memoria_pico_MB.
+    """
+    with _silencio():
+        inicio = time.perf_counter()
+        caso.funcion()
+        # Como timeit: cada repetición llama varias veces a las etapas muy rápidas
+        # para que el tiempo medido no quede dominado por el ruido del sistema
+        llamadas = max(1, int(np.ceil(TIEMPO_REPETICION / (time.perf_counter() - inicio))))
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for _ in range(llamadas):
+                caso.funcion()
+            tiempos.append((time.perf_counter() - inicio) / llamadas)
+        tracemalloc.start()
+        try:
+            caso.funcion()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"caso": caso.nombre, "etapa": caso.etapa, "muestras": caso.muestras,
+            "tiempo_min": min(tiempos), "tiempo_mediana": float(np.median(tiempos)),
+            "muestras_s": caso.muestras/min(tiempos), "memoria_pico_MB": pico/2**20}
+
+def ejecutar(rapido=False, repeticiones=5, filtro=None):
+    """
+    Ejecuta los benchmarks.
+
+    Parametros
+    ----------
+    rapido: bool
+        Si es True se usan menos entradas.
+    repeticiones: int
+        Repeticiones cronometradas por caso.
+    filtro: str
+        Si no es None sólo se ejecutan los casos cuyo nombre lo contiene.
+
+    Returns
+    -------
+    pandas DataFrame con una fila por caso (ver medir), indexado por caso.
+    """
+    filas = []
+    # Los archivos intermedios y los que escriben algunas etapas quedan en un directorio temporal
+    with tempfile.TemporaryDirectory() as directorio, _en_directorio(directorio):
+        for caso in casos(directorio, rapido):
+            if filtro is not None and filtro not in caso.nombre:
+                continue
+            filas.append(medir(caso, repeticiones))
+            logger.info("%-55s %9.4f s %12.3g muestras/s %9.1f MB", caso.nombre, filas[-1]["tiempo_min"],
+                        filas[-1]["muestras_s"], filas[-1]["memoria_pico_MB"])
+    return pd.DataFrame(filas).set_index("caso")
+
+def maquina():
+    """Identificador de la máquina con el que se guardan las líneas base."""
+    return "{}-{}-{}cpu-py{}".format(platform.node(), platform.machine(), os.cpu_count(), platform.python_version())
+
+def guardar_linea_base(df, ruta):
+    """
+    Guarda los resultados como línea base de esta máquina en un archivo JSON.
+    Las líneas base de otras máquinas del mismo archivo se conservan.
+    """
+    lineas = {}
+    if os.path.exists(ruta):
+        with open(ruta) as f:
+            lineas = json.load(f)
+    lineas[maquina()] = {"fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+                         "casos": df[["tiempo_min", "memoria_pico_MB"]].to_dict("index")}
+    with open(ruta, "w") as f:
+        json.dump(lineas, f, indent=1, ensure_ascii=False, sort_keys=True)
+
+def comparar(df, ruta, tolerancia=0.25):
+    """
+    Compara los resultados con la línea base de esta máquina.
+
+    Parametros
+    ----------
+    df: pandas DataFrame
+        Salida de ejecutar.
+    ruta: str
+        Archivo JSON de líneas base (ver guardar_linea_base).
+    tolerancia: float
+        Aumento relativo de tiempo o de memoria a partir del cual un caso es una regresión.
+
+    Returns
+    -------
+    pandas DataFrame con los casos presentes en ambos, con las columnas
+    relacion_tiempo y relacion_memoria (actual / línea base) y regresion (bool).
+    """
+    with open(ruta) as f:
+        lineas = json.load(f)
+    if maquina() not in lineas:
+        raise KeyError("No hay línea base para la máquina {} en {}".format(maquina(), ruta))
+    base = pd.DataFrame.from_dict(lineas[maquina()]["casos"], orient="index")
+    comunes = df.index.intersection(base.index)
+    informe = pd.DataFrame({"relacion_tiempo": df.loc[comunes, "tiempo_min"] / base.loc[comunes, "tiempo_min"],
+                            "relacion_memoria": df.loc[comunes, "memoria_pico_MB"] / base.loc[comunes, "memoria_pico_MB"]})
+    informe["regresion"] = (informe["relacion_tiempo"] > 1 + tolerancia) | (informe["relacion_memoria"] > 1 + tolerancia)
+    return informe
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de las etapas del análisis de respuestas al impulso.")
+    parser.add_argument("-k", "--filtro", default=None, help="Ejecutar sólo los casos cuyo nombre contiene este texto")
+    parser.add_argument("-n", "--repeticiones", type=int, default=5, help="Repeticiones cronometradas por caso")
+    parser.add_argument("--rapido", action="store_true", help="Usar menos entradas")
+    parser.add_argument("-o", "--salida", default=None, help="Guardar los resultados en un archivo .csv")
+    parser.add_argument("--guardar", default=None, help="Guardar los resultados como línea base de esta máquina en este archivo JSON")
+    parser.add_argument("--comparar", default=None, help="Comparar con la línea base de esta máquina en este archivo JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Aumento relativo de tiempo o memoria considerado regresión")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Las rutas se resuelven antes de pasar al directorio temporal
+    rutas = {nombre: os.path.abspath(ruta) for nombre, ruta in
+             [("salida", args.salida), ("guardar", args.guardar), ("comparar", args.comparar)] if ruta}
+    df = ejecutar(args.rapido, args.repeticiones, args.filtro)
+    if "salida" in rutas:
+        df.to_csv(rutas["salida"])
+    if "guardar" in rutas:
+        guardar_linea_base(df, rutas["guardar"])
+        logger.info("Línea base guardada en %s", rutas["guardar"])
+    if "comparar" in rutas:
+        informe = comparar(df, rutas["comparar"], args.tolerancia)
+        logger.info("Comparación con la línea base:\n%s", informe.to_string())
+        if informe["regresion"].any():
+            logger.warning("Regresiones: %s", ", ".join(informe.index[informe["regresion"]]))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
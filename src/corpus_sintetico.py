@@ -0,0 +1,203 @@
+# Corpus de RI sintéticas con parámetros conocidos para validar y someter a
+# carga el análisis. Cada RI se genera con preprocesamiento_filtrado.ri_sintetica
+# (ruido por banda con decaimiento exponencial, sonido directo y piso de ruido)
+# a partir de parámetros aleatorios reproducibles, se guarda como ".wav" y sus
+# parámetros verdaderos por banda (T60, C80, C50, D50) se guardan en una tabla.
+#
+# Ejemplo:
+#   python corpus_sintetico.py ../corpus -n 2000 --semilla 0
+#   python corpus_sintetico.py ../corpus --validar      # error del análisis por banda
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from preprocesamiento_filtrado import ri_sintetica, parametros_ri_sintetica, bandas_fraccionales
+from analisis_lote import analizar_lote, guardar_resultados
+
+logger = logging.getLogger(__name__)
+
+TABLA = "verdad.csv"
+
+def muestrear_parametros(rng, fs=(44100, 48000), canales=(1,), fraccion=1):
+    """
+    Parámetros aleatorios de una RI sintética.
+
+    El T60 de 1 kHz es log-uniforme entre 0.3 y 3 s y varía con la frecuencia
+    según una pendiente aleatoria (más largo en graves) con un 10 % de variación
+    por banda. El sonido directo es log-uniforme entre 3 y 300 veces el valor
+    eficaz inicial de las bandas (o ausente en 1 de cada 5 RI), el piso de ruido
+    uniforme entre -90 y -50 dB y el retardo entre 2 y 50 ms.
+
+    Parametros
+    ----------
+    rng: numpy.random.Generator
+        Generador aleatorio.
+    fs, canales: tuple
+        Frecuencias de muestreo y cantidades de canales entre las que se elige.
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+
+    Returns
+    -------
+    dict con los argumentos de ri_sintetica: t60 (list), fs, canales, fraccion,
+    directo, ruido_dB y retardo.
+    """
+    fs = int(rng.choice(fs))
+    frecuencias = np.array([banda[0] for banda in bandas_fraccionales(fs, fraccion)])
+    t60_1k = np.exp(rng.uniform(np.log(0.3), np.log(3)))
+    pendiente = rng.uniform(-0.3, 0)
+    t60 = t60_1k*(frecuencias/1000)**pendiente*rng.uniform(0.9, 1.1, len(frecuencias))
+    return {"t60": np.clip(t60, 0.1, 8).round(4).tolist(), "fs": fs, "canales": int(rng.choice(canales)),
+            "fraccion": fraccion,
+            "directo": None if rng.random() < 0.2 else float(np.exp(rng.uniform(np.log(3), np.log(300)))),
+            "ruido_dB": float(rng.uniform(-90, -50)), "retardo": float(rng.uniform(0.002, 0.05))}
+
+def generar_ri(ruta, parametros, seed, subtype="PCM_24"):
+    """
+    Genera una RI sintética, la guarda en ruta y devuelve sus parámetros verdaderos.
+
+    Parametros
+    ----------
+    ruta: str
+        Archivo ".wav" de salida.
+    parametros: dict
+        Salida de muestrear_parametros.
+    seed:
+        Semilla del ruido de la RI.
+    subtype: str
+        Formato de las muestras (soundfile). PCM_24 ocupa 3 bytes por muestra y
+        su piso de cuantización (-144 dB) queda debajo del piso de ruido.
+
+    Returns
+    -------
+    list de dict, una fila por banda con archivo, banda, T60, C80, C50, D50 y los parámetros de la RI.
+    """
+    argumentos = dict(parametros, t60=np.asarray(parametros["t60"]))
+    fs = argumentos.pop("fs")
+    # La escala no cambia los parámetros: se deja margen para PCM
+    ri = 0.9*ri_sintetica(argumentos.pop("t60"), fs, seed=seed, **argumentos)
+    sf.write(ruta, ri, fs, subtype=subtype)
+    verdad = parametros_ri_sintetica(np.asarray(parametros["t60"]), fs, fraccion=parametros["fraccion"],
+                                     retardo=parametros["retardo"], directo=parametros["directo"],
+                                     ruido_dB=parametros["ruido_dB"])
+    comunes = {"archivo": os.path.basename(ruta), "fs": fs, "canales": parametros["canales"],
+               "directo": parametros["directo"], "ruido_dB": parametros["ruido_dB"], "retardo": parametros["retardo"]}
+    return [dict(comunes, banda=banda, **fila) for banda, fila in verdad.iterrows()]
+
+def construir_corpus(directorio, n, semilla=0, fs=(44100, 48000), canales=(1,), fraccion=1, subtype="PCM_24",
+                     n_workers=None, max_pendientes=None, tabla=TABLA):
+    """
+    Genera n RI sintéticas en paralelo en directorio ("ri_000000.wav", ...) y la
+    tabla con sus parámetros verdaderos por banda.
+
+    Los parámetros y la semilla de cada RI dependen sólo de semilla y de su
+    número, por lo que el corpus es el mismo con cualquier cantidad de procesos.
+
+    Parametros
+    ----------
+    directorio: str
+        Directorio del corpus. Se crea si no existe.
+    n: int
+        Cantidad de RI.
+    semilla: int
+        Semilla del corpus.
+    fs, canales: tuple
+        Frecuencias de muestreo y cantidades de canales entre las que se elige.
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+    subtype: str
+        Formato de las muestras de los ".wav".
+    n_workers: int
+        Cantidad de procesos. Por defecto la cantidad de núcleos disponibles.
+    max_pendientes: int
+        Máxima cantidad de RI enviadas al pool y aún no terminadas. Por defecto 2*n_workers.
+    tabla: str
+        Nombre del archivo de la tabla dentro de directorio (".csv" o ".parquet").
+
+    Returns
+    -------
+    pandas DataFrame con una fila por RI y banda (ver generar_ri), en el orden de las RI.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    n_workers = n_workers or os.cpu_count() or 1
+    max_pendientes = max_pendientes or 2*n_workers
+    filas = {}
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        pendientes = {}
+        for i in range(n):
+            parametros = muestrear_parametros(rng, fs, canales, fraccion)
+            while len(pendientes) >= max_pendientes:
+                listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    filas[pendientes.pop(futuro)] = futuro.result()
+            ruta = os.path.join(directorio, "ri_{:06d}.wav".format(i))
+            pendientes[pool.submit(generar_ri, ruta, parametros, (semilla, i), subtype)] = i
+        for futuro in list(pendientes):
+            filas[pendientes.pop(futuro)] = futuro.result()
+    df = pd.DataFrame([fila for i in range(n) for fila in filas[i]])
+    guardar_resultados(df, os.path.join(directorio, tabla))
+    logger.info("%d RI generadas en %s", n, directorio)
+    return df
+
+def leer_verdad(directorio, tabla=TABLA):
+    """Lee la tabla de parámetros verdaderos de un corpus."""
+    ruta = os.path.join(directorio, tabla)
+    return pd.read_parquet(ruta) if ruta.endswith(".parquet") else pd.read_csv(ruta)
+
+def validar_corpus(directorio, tabla=TABLA, **opciones):
+    """
+    Analiza todas las RI de un corpus con analisis_lote.analizar_lote y compara
+    los resultados con los parámetros verdaderos.
+
+    Parametros
+    ----------
+    directorio: str
+        Directorio del corpus.
+    opciones:
+        Argumentos de analizar_lote (limit, banco, n_workers, dtype, etc.).
+
+    Returns
+    -------
+    pandas DataFrame indexado por (banda, parametro) con las columnas sesgo
+    (error medio), error_mediano y error_p95 (del error absoluto) sobre todas
+    las RI y canales. T20 y T30 se comparan con T60.
+    """
+    verdad = leer_verdad(directorio, tabla)
+    archivos = [os.path.join(directorio, archivo) for archivo in verdad["archivo"].unique()]
+    medidos = analizar_lote(archivos, **opciones)
+    medidos["archivo"] = medidos["archivo"].map(os.path.basename)
+    df = medidos.merge(verdad, on=["archivo", "banda"], suffixes=("", "_verdad"))
+    comparaciones = {"T20": "T60", "T30": "T60", "C80": "C80_verdad", "C50": "C50_verdad", "D50": "D50_verdad"}
+    errores = pd.DataFrame({medido: df[medido] - df[verdadero] for medido, verdadero in comparaciones.items()})
+    grupos = errores.groupby(df["banda"])
+    informe = pd.DataFrame({"sesgo": grupos.mean().stack(),
+                            "error_mediano": grupos.agg(lambda x: x.abs().median()).stack(),
+                            "error_p95": grupos.agg(lambda x: x.abs().quantile(0.95)).stack()})
+    return informe.rename_axis(["banda", "parametro"])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corpus de respuestas al impulso sintéticas con parámetros conocidos.")
+    parser.add_argument("directorio", help="Directorio del corpus")
+    parser.add_argument("-n", "--cantidad", type=int, default=100, help="Cantidad de RI a generar")
+    parser.add_argument("-s", "--semilla", type=int, default=0, help="Semilla del corpus")
+    parser.add_argument("--fs", type=int, nargs="+", default=[44100, 48000], help="Frecuencias de muestreo")
+    parser.add_argument("--canales", type=int, nargs="+", default=[1], help="Cantidades de canales")
+    parser.add_argument("-f", "--fraccion", type=int, default=1, choices=[1, 3], help="1: octava, 3: tercio de octava")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Cantidad de procesos")
+    parser.add_argument("--validar", action="store_true", help="Analizar un corpus existente e informar el error por banda")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.validar:
+        informe = validar_corpus(args.directorio, fraccion=args.fraccion, n_workers=args.workers)
+        logger.info("Error del análisis respecto de los parámetros verdaderos:\n%s", informe.to_string())
+        return informe
+    return construir_corpus(args.directorio, args.cantidad, args.semilla, tuple(args.fs), tuple(args.canales),
+                            args.fraccion, n_workers=args.workers)
+
+if __name__ == "__main__":
+    main()
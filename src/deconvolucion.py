@@ -0,0 +1,225 @@
+import numpy as np
+import os
+import soundfile as sf
+from functools import lru_cache
+from scipy import fft
+from funciones import abrir_audio, precision
+from generacion_adquisicion import barrido_cacheado, espectro_filtro_inverso
+from telemetria import instrumentar
+
+## Motor de deconvolución de sine sweeps
+class Deconvolucion:
+    """
+    Obtiene respuestas al impulso a partir de sine sweeps grabados, reutilizando
+    el espectro del filtro inverso (o del sweep) para todas las grabaciones.
+
+    El espectro se calcula una sola vez con una longitud de FFT rápida para
+    grabaciones de hasta n_grabacion muestras.
+
+    Parametros
+    ----------
+    invfilter: Numpy array
+        Filtro inverso (sweep invertido en el tiempo y ecualizado).
+    n_grabacion: int
+        Cantidad máxima de muestras de las grabaciones a procesar.
+    largo_ri: int
+        Cantidad de muestras de la RI devuelta. Por defecto n_grabacion.
+    inicio: int
+        Muestra de la convolución completa donde comienza la RI devuelta.
+        Por defecto len(invfilter)-1, la posición del impulso (parte causal).
+        Con inicio=0 y largo_ri=n_grabacion+len(invfilter)-1 se obtiene la
+        convolución completa.
+    metodo: str
+        "convolucion" para convolucionar con el filtro inverso o "division" para
+        la división espectral regularizada por el espectro del sweep.
+    sweep: Numpy array
+        Sine sweep reproducido, necesario si metodo es "division".
+    regularizacion: float
+        Término de regularización de la división espectral dentro de la banda del
+        sweep, relativo al máximo de |S(f)|^2.
+    banda: tuple
+        (f1, f2, fs) del sweep. Si se indica, el máximo de |S(f)|^2 se toma dentro de
+        [f1, f2] y fuera de la banda la regularización es 1 para no amplificar el ruido (Kirkeby).
+    espectro: Numpy array
+        rFFT del filtro inverso ya calculada (por ejemplo desde la cache), de n_fft puntos.
+    n_fft: int
+        Longitud de la FFT. Por defecto la menor longitud rápida que evita el aliasing circular.
+
+    Ejemplo
+    -------
+    import soundfile as sf
+
+    grabacion, fs = sf.read('record_SineSweepLog.wav')
+    deconv = Deconvolucion.desde_barrido(20, 4000, 10, fs, len(grabacion), largo_ri=3*fs)
+    ri = deconv.deconvolucionar(grabacion)
+    """
+    def __init__(self, invfilter, n_grabacion, largo_ri=None, inicio=None, metodo="convolucion",
+                 sweep=None, regularizacion=1e-6, banda=None, espectro=None, n_fft=None):
+        self.n_inv = len(invfilter)
+        self.n_grabacion = n_grabacion
+        self.n_completa = n_grabacion + self.n_inv - 1
+        self.inicio = self.n_inv - 1 if inicio is None else inicio
+        self.largo_ri = n_grabacion if largo_ri is None else largo_ri
+        if self.inicio + self.largo_ri > self.n_completa:
+            raise ValueError("La ventana de la RI excede la longitud de la convolución")
+        self.n_fft = n_fft or fft.next_fast_len(self.n_completa, real=True)
+        self.metodo = metodo
+
+        if metodo == "convolucion":
+            if espectro is None:
+                espectro = fft.rfft(invfilter, self.n_fft)
+        elif metodo == "division":
+            if sweep is None:
+                raise ValueError("El método 'division' necesita el sweep reproducido")
+            # La división se alinea igual que la convolución: el impulso queda en n_inv-1
+            espectro_sweep = fft.rfft(sweep, self.n_fft)
+            potencia = np.abs(espectro_sweep)**2
+            retardo = np.exp(-2j*np.pi*np.fft.rfftfreq(self.n_fft)*(self.n_inv - 1))
+            epsilon = np.full(len(potencia), regularizacion)
+            if banda is not None:
+                f1, f2, fs = banda
+                frecuencias = np.fft.rfftfreq(self.n_fft, 1/fs)
+                fuera = (frecuencias < f1) | (frecuencias > f2)
+                epsilon[fuera] = 1
+                referencia = np.max(potencia[~fuera])
+            else:
+                referencia = np.max(potencia)
+            espectro = np.conj(espectro_sweep)*retardo/(potencia + epsilon*referencia)
+        else:
+            raise ValueError("metodo debe ser 'convolucion' o 'division'")
+        self.espectro = espectro
+
+    @classmethod
+    def desde_barrido(cls, f1, f2, t_sweep, fs_sweep, n_grabacion, metodo="convolucion", **kwargs):
+        """
+        Crea el motor a partir de los parámetros del sweep usando la cache de
+        barrido_cacheado y espectro_filtro_inverso.
+        """
+        x, k_t = barrido_cacheado(f1, f2, t_sweep, fs_sweep)
+        n_fft = kwargs.pop("n_fft", None) or fft.next_fast_len(n_grabacion + len(k_t) - 1, real=True)
+        if metodo == "convolucion":
+            kwargs["espectro"] = espectro_filtro_inverso(f1, f2, t_sweep, fs_sweep, n_fft)
+        else:
+            kwargs.setdefault("banda", (f1, f2, fs_sweep))
+        return cls(k_t, n_grabacion, metodo=metodo, sweep=x, n_fft=n_fft, **kwargs)
+
+    @classmethod
+    def desde_archivo(cls, invfilter, n_grabacion, largo_ri=None, inicio=None, dtype=None):
+        """
+        Devuelve el motor del filtro inverso guardado en el archivo invfilter. El
+        motor (con el espectro del filtro inverso ya calculado) se comparte entre
+        las llamadas con los mismos argumentos mientras el archivo no cambie (se
+        identifica por ruta, fecha de modificación y tamaño, como en abrir_audio).
+        Se conservan los últimos 4 motores.
+
+        Ejemplo
+        -------
+        grabacion, fs = read_wav('record_SineSweepLog.wav')
+        deconv = Deconvolucion.desde_archivo('InvFilter.wav', len(grabacion))
+        ri = deconv.deconvolucionar(grabacion)
+        """
+        ruta = os.path.realpath(invfilter)
+        estado = os.stat(ruta)
+        return _deconvolucion_archivo(ruta, estado.st_mtime_ns, estado.st_size, n_grabacion,
+                                      largo_ri, inicio, precision(dtype).name)
+
+    @instrumentar("Deconvolucion.deconvolucionar")
+    def deconvolucionar(self, grabacion):
+        """
+        Calcula la RI de una grabación.
+
+        Parametros
+        ----------
+        grabacion: Numpy array
+            Sweep grabado, mono (muestras,) o multicanal (muestras, canales).
+
+        Returns
+        -------
+        Numpy array con largo_ri muestras de la RI (por canal si es multicanal).
+        """
+        if len(grabacion) > self.n_grabacion:
+            raise ValueError("La grabación tiene más de n_grabacion muestras")
+        espectro = self.espectro if np.ndim(grabacion) == 1 else self.espectro[:, None]
+        salida = fft.irfft(fft.rfft(grabacion, self.n_fft, axis=0)*espectro, self.n_fft, axis=0)
+        return salida[self.inicio:self.inicio + self.largo_ri]
+
+@lru_cache(maxsize=4)
+def _deconvolucion_archivo(ruta, modificado, tamaño, n_grabacion, largo_ri, inicio, dtype):
+    return Deconvolucion(abrir_audio(ruta).datos(dtype), n_grabacion, largo_ri=largo_ri, inicio=inicio)
+
+## Deconvolución por bloques (overlap-save) de grabaciones con varios sweeps
+def deconvolucion_stream(archivo, invfilter, periodo, largo_ri, inicio=0, n_fft=None, espectro=None, canal=0):
+    """
+    Obtiene las RI de una grabación larga con varios sweeps consecutivos leyéndola
+    por bloques con overlap-save. Cada RI se entrega apenas está completa y la
+    memoria utilizada no depende de la duración de la grabación.
+
+    Parametros
+    ----------
+    archivo: str
+        Archivo ".wav" con la grabación.
+    invfilter: Numpy array
+        Filtro inverso del sweep.
+    periodo: int
+        Muestras entre el comienzo de un sweep y el del siguiente (sweep + silencio).
+    largo_ri: int
+        Cantidad de muestras de cada RI, contadas desde el impulso.
+    inicio: int
+        Muestra de la grabación donde comienza el primer sweep.
+    n_fft: int
+        Longitud de la FFT de cada bloque. Por defecto una longitud rápida
+        cercana a 4 veces el largo del filtro inverso.
+    espectro: Numpy array
+        rFFT de n_fft puntos del filtro inverso ya calculada (por ejemplo con espectro_filtro_inverso).
+    canal: int
+        Canal de la grabación a procesar si es multicanal.
+
+    yields: (int, Numpy array)
+        Número de sweep y su RI de largo_ri muestras.
+
+    Ejemplo
+    -------
+    x, k_t = barrido_cacheado(20, 20000, 10, 44100)
+    periodo = len(x) + 5*44100   # sweeps de 10 s separados por 5 s de silencio
+    for j, ri in deconvolucion_stream('sesion.wav', k_t, periodo, 3*44100):
+        sf.write('ri_{}.wav'.format(j), ri, 44100)
+    """
+    n_inv = len(invfilter)
+    n_fft = n_fft or fft.next_fast_len(4*n_inv, real=True)
+    tamaño_bloque = n_fft - (n_inv - 1)  # Muestras nuevas por bloque
+    if tamaño_bloque <= 0:
+        raise ValueError("n_fft debe ser mayor que el largo del filtro inverso")
+    if espectro is None:
+        espectro = fft.rfft(invfilter, n_fft)
+
+    entrada = np.zeros(n_fft)  # Últimas n_inv-1 muestras del bloque anterior + bloque actual
+    pendiente = np.empty(0)    # Salida de la convolución aún no entregada
+    pendiente_inicio = 0       # Índice (en la convolución completa) de pendiente[0]
+    j = 0
+    comienzo = inicio + n_inv - 1  # Posición del impulso del sweep j en la convolución
+
+    with sf.SoundFile(archivo) as wav:
+        n_total = wav.frames + n_inv - 1
+        bloques = wav.blocks(blocksize=tamaño_bloque, always_2d=True)
+        leidas = 0
+        while leidas < n_total:
+            bloque = next(bloques, None)
+            bloque = np.zeros(0) if bloque is None else bloque[:, canal]
+            n = tamaño_bloque if leidas + tamaño_bloque <= n_total else n_total - leidas
+            entrada[:n_inv - 1] = entrada[tamaño_bloque:]
+            entrada[n_inv - 1:] = 0
+            entrada[n_inv - 1:n_inv - 1 + len(bloque)] = bloque
+            salida = fft.irfft(fft.rfft(entrada)*espectro, n_fft)[n_inv - 1:n_inv - 1 + n]
+            leidas += n
+
+            pendiente = np.concatenate([pendiente, salida])
+            # Entregar las RI completas
+            while comienzo + largo_ri <= pendiente_inicio + len(pendiente):
+                desde = comienzo - pendiente_inicio
+                yield j, pendiente[desde:desde + largo_ri].copy()
+                j += 1
+                comienzo = inicio + j*periodo + n_inv - 1
+            # Descartar lo que ya no necesita ninguna RI
+            descartar = min(max(comienzo - pendiente_inicio, 0), len(pendiente))
+            pendiente = pendiente[descartar:]
+            pendiente_inicio += descartar
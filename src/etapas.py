@@ -0,0 +1,276 @@
+# Cadena de análisis lectura -> filtrado -> suavizado -> Schroeder -> ajuste
+# con el resultado de cada etapa memoizado bajo un hash de su entrada y sus
+# parámetros. Al cambiar, por ejemplo, el límite de integración sólo se
+# recalculan la integral de Schroeder y los ajustes; las bandas filtradas y
+# las envolventes se reutilizan.
+import hashlib
+import logging
+import os
+import pickle
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+import numpy as np
+import pandas as pd
+from funciones import abrir_audio, precision
+from preprocesamiento_filtrado import BancoFiltrosIEC, BancoFiltrosFFT
+from suavizado_calculo import (suavizado_señal, curva_schroeder, tiempos_reverberacion,
+                               parametros_energia, deteccion_inicio, ResultadoParametros, PARAMETROS)
+from telemetria import medir
+
+logger = logging.getLogger(__name__)
+
+def huella_archivo(archivo):
+    """
+    SHA-1 del contenido de un archivo. Se recuerda mientras el archivo no cambie
+    (ruta, fecha de modificación y tamaño), por lo que se lee una sola vez.
+    """
+    ruta = os.path.realpath(archivo)
+    estado = os.stat(ruta)
+    return _huella_archivo(ruta, estado.st_mtime_ns, estado.st_size)
+
+@lru_cache(maxsize=256)
+def _huella_archivo(ruta, modificado, tamaño, tamaño_bloque=1 << 20):
+    sha = hashlib.sha1()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tamaño_bloque), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+def huella_array(data):
+    """SHA-1 del contenido, el tipo y la forma de un Numpy array."""
+    data = np.ascontiguousarray(data)
+    sha = hashlib.sha1(repr((data.dtype.str, data.shape)).encode())
+    sha.update(data.data)
+    return sha.hexdigest()
+
+def clave_etapa(nombre, *entradas, **parametros):
+    """
+    Clave de una etapa: hash de su nombre, las claves de sus entradas y sus
+    parámetros. Las entradas se identifican por la clave de la etapa que las
+    produjo, por lo que los arrays sólo se hashean una vez, al leerlos.
+    """
+    texto = repr((nombre, entradas, sorted(parametros.items())))
+    return hashlib.sha1(texto.encode()).hexdigest()
+
+@dataclass
+class Etapa:
+    """
+    Resultado de una etapa de AnalisisRI.
+
+    Atributos
+    ---------
+    clave: str
+        Hash de la entrada y los parámetros de la etapa.
+    valor:
+        Resultado de la etapa.
+    """
+    clave: str
+    valor: Any
+
+class CacheEtapas:
+    """
+    Memoria de los resultados de las etapas, en memoria con desalojo LRU y,
+    opcionalmente, en disco (un archivo ".pkl" por clave).
+
+    Parametros
+    ----------
+    max_elementos: int
+        Cantidad máxima de resultados en memoria. Por defecto 64.
+    directorio: str
+        Directorio de la memoria en disco. Si es None sólo se usa la memoria.
+    """
+    def __init__(self, max_elementos=64, directorio=None):
+        self.max_elementos = max_elementos
+        self.directorio = directorio
+        self.aciertos = 0
+        self.fallos = 0
+        self._memoria = OrderedDict()
+
+    def __len__(self):
+        return len(self._memoria)
+
+    def __contains__(self, clave):
+        return clave in self._memoria or (self.directorio is not None and os.path.exists(self._ruta(clave)))
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave + ".pkl")
+
+    def _guardar(self, clave, valor):
+        self._memoria[clave] = valor
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_elementos:
+            self._memoria.popitem(last=False)
+
+    def obtener(self, clave, calcular):
+        """
+        Devuelve el resultado guardado bajo clave o lo calcula con calcular() y lo guarda.
+        """
+        if clave in self._memoria:
+            self.aciertos += 1
+            self._memoria.move_to_end(clave)
+            return self._memoria[clave]
+        if self.directorio is not None and os.path.exists(self._ruta(clave)):
+            self.aciertos += 1
+            with open(self._ruta(clave), 'rb') as f:
+                valor = pickle.load(f)
+            self._guardar(clave, valor)
+            return valor
+
+        self.fallos += 1
+        valor = calcular()
+        self._guardar(clave, valor)
+        if self.directorio is not None:
+            # Escritura atómica: otro proceso nunca lee un archivo a medias
+            os.makedirs(self.directorio, exist_ok=True)
+            temporal = "{}.{}.tmp".format(self._ruta(clave), os.getpid())
+            with open(temporal, 'wb') as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, self._ruta(clave))
+        return valor
+
+    def limpiar(self):
+        """Vacía la memoria (no borra los archivos en disco)."""
+        self._memoria.clear()
+
+class AnalisisRI:
+    """
+    Cadena de análisis de una RI en etapas memoizadas. Cada método recibe la
+    Etapa anterior y devuelve una Etapa nueva; si la clave ya está en la memoria
+    no se recalcula.
+
+        leer -> filtrar -> suavizar
+                        -> schroeder -> ajustar
+                        -> energia
+
+    Parametros
+    ----------
+    cache: CacheEtapas
+        Memoria compartida por las etapas. Por defecto una CacheEtapas en memoria.
+
+    Ejemplo
+    -------
+    analisis = AnalisisRI()
+    df = analisis.parametros('data/IR2/Mono.wav', limit=None)
+    df = analisis.parametros('data/IR2/Mono.wav', limit=1.5)   # sólo Schroeder y ajustes
+    """
+    def __init__(self, cache=None):
+        self.cache = CacheEtapas() if cache is None else cache
+
+    def _etapa(self, nombre, entradas, parametros, calcular):
+        # La precisión de la política actual también define el resultado
+        parametros = dict(parametros, dtype=precision().name)
+        clave = clave_etapa(nombre, *[entrada.clave for entrada in entradas], **parametros)
+        en_cache = clave in self.cache
+        if not en_cache:
+            logger.debug("Calculando %s %s", nombre, parametros)
+        with medir("AnalisisRI." + nombre, en_cache=en_cache):
+            return Etapa(clave, self.cache.obtener(clave, calcular))
+
+    def leer(self, archivo, dtype=None):
+        """Etapa de lectura. valor: (data, fs)."""
+        dtype = precision(dtype).name
+        with medir("AnalisisRI.leer", archivo=archivo):
+            clave = clave_etapa("leer", huella_archivo(archivo), dtype=dtype)
+            fuente = abrir_audio(archivo)
+            return Etapa(clave, self.cache.obtener(clave, lambda: (fuente.datos(dtype), fuente.fs)))
+
+    def señal(self, data, fs):
+        """Etapa de lectura a partir de un Numpy array ya cargado. valor: (data, fs)."""
+        return Etapa(clave_etapa("señal", huella_array(data), fs=fs), (data, fs))
+
+    def filtrar(self, lectura, fraccion=1, banco="iec"):
+        """
+        Etapa de filtrado por bandas. banco es "iec" (BancoFiltrosIEC) o "fft"
+        (BancoFiltrosFFT). valor: (frecuencias, bandas (bandas, muestras[, canales]), fs).
+        """
+        def calcular():
+            data, fs = lectura.valor
+            if banco == "iec":
+                filtros = BancoFiltrosIEC(fs, fraccion)
+            elif banco == "fft":
+                filtros = BancoFiltrosFFT(fs, fraccion)
+            else:
+                raise ValueError("banco debe ser 'iec' o 'fft'")
+            return filtros.frecuencias, filtros.filtrar(data), fs
+        return self._etapa("filtrar", [lectura], dict(fraccion=fraccion, banco=banco), calcular)
+
+    def suavizar(self, filtrado, w_size=1000):
+        """Etapa de suavizado (suavizado_señal) de todas las bandas. valor: envolventes con la forma de las bandas."""
+        def calcular():
+            _, bandas, _ = filtrado.valor
+            # suavizado_señal trabaja sobre el eje 0: el tiempo pasa al primer eje
+            return np.moveaxis(suavizado_señal(np.moveaxis(bandas, 1, 0), w_size), 0, 1)
+        return self._etapa("suavizar", [filtrado], dict(w_size=w_size), calcular)
+
+    def schroeder(self, filtrado, limit=None, compensacion=False):
+        """Etapa de integración de Schroeder (curva_schroeder). valor: lista con la curva de cada banda."""
+        def calcular():
+            _, bandas, fs = filtrado.valor
+            return [curva_schroeder(banda, limit, fs, compensacion) for banda in bandas]
+        return self._etapa("schroeder", [filtrado], dict(limit=limit, compensacion=compensacion), calcular)
+
+    def ajustar(self, curvas, fs):
+        """Etapa de regresiones (tiempos_reverberacion). valor: lista de (tiempos, ajustes, rangos) por banda."""
+        def calcular():
+            return [tiempos_reverberacion(curva, fs) for curva in curvas.valor]
+        return self._etapa("ajustar", [curvas], dict(fs=fs), calcular)
+
+    def energia(self, lectura, filtrado):
+        """
+        Etapa de parámetros de energía, medidos desde el inicio de la RI de banda
+        ancha. No depende del límite de integración. valor: lista de dicts por banda.
+        """
+        def calcular():
+            data, _ = lectura.valor
+            _, bandas, fs = filtrado.valor
+            inicio = deteccion_inicio(data)
+            return [parametros_energia(banda, fs, inicio) for banda in bandas]
+        return self._etapa("energia", [lectura, filtrado], {}, calcular)
+
+    def resultados(self, archivo, limit=None, fraccion=1, banco="iec", compensacion=False, dtype=None):
+        """
+        Ejecuta la cadena completa y devuelve (frecuencias, lista de ResultadoParametros por banda).
+        """
+        lectura = self.leer(archivo, dtype) if isinstance(archivo, str) else self.señal(*archivo)
+        filtrado = self.filtrar(lectura, fraccion, banco)
+        frecuencias, _, fs = filtrado.valor
+        curvas = self.schroeder(filtrado, limit, compensacion)
+        ajustes = self.ajustar(curvas, fs)
+        energias = self.energia(lectura, filtrado)
+        resultados = []
+        for curva, (tiempos, ajuste, rangos), energia in zip(curvas.valor, ajustes.valor, energias.valor):
+            resultados.append(ResultadoParametros(**energia, **tiempos, ajustes=ajuste,
+                                                  rangos=rangos, schroeder=curva))
+        return frecuencias, resultados
+
+    def parametros(self, archivo, limit=None, fraccion=1, banco="iec", compensacion=False, dtype=None):
+        """
+        Ejecuta la cadena completa y devuelve un pandas DataFrame con una fila por
+        banda (por (banda, canal) si la RI es multicanal) y las columnas de PARAMETROS.
+
+        Parametros
+        ----------
+        archivo: str o tuple
+            Ruta del archivo ".wav" o tupla (data, fs).
+        limit: float
+            Límite de integración de Schroeder en segundos. Si es None se estima
+            para cada banda y canal con el método de Lundeby.
+        fraccion: int
+            1 para bandas de octava, 3 para bandas de tercio de octava.
+        banco: str
+            "iec" o "fft".
+        compensacion: bool
+            Si es True se agrega a la integral de Schroeder el término de compensación del ruido.
+        dtype: str
+            Precisión de la lectura. Por defecto la de la política actual.
+        """
+        frecuencias, resultados = self.resultados(archivo, limit, fraccion, banco, compensacion, dtype)
+        valores = [resultado.lista() for resultado in resultados]
+        if np.ndim(valores[0][0]) == 0:
+            return pd.DataFrame(valores, index=frecuencias, columns=PARAMETROS)
+        canales = len(valores[0][0])
+        filas = [fila for valores_banda in valores for fila in np.column_stack(valores_banda)]
+        indice = pd.MultiIndex.from_product([frecuencias, range(canales)], names=["banda", "canal"])
+        return pd.DataFrame(filas, index=indice, columns=PARAMETROS)
@@ -1,19 +1,281 @@
 import numpy as np
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from matplotlib import pyplot as plt
 from scipy import signal
 import soundfile as sf
-import sounddevice as sd
 from tkinter import *
 from IPython.display import clear_output, display
 from tkinter import filedialog
 
-def read_wav(file):
+## Política de precisión
+# Tipo de dato de las señales (lectura, bandas, envolventes, Schroeder y resultados).
+# En modo float32 las acumulaciones que lo necesitan (sumas acumuladas, estado de
+# los filtros IIR, regresiones) se siguen haciendo en float64.
+# La política es una variable de contexto: cada hilo (y cada tarea de asyncio)
+# tiene la suya, por lo que cambiarla en un hilo no afecta a los demás.
+PRECISIONES = ("float64", "float32")
+_precision = ContextVar("precision", default="float64")
+
+def _validar_precision(dtype):
+    dtype = np.dtype(dtype).name
+    if dtype not in PRECISIONES:
+        raise ValueError("La precisión debe ser 'float64' o 'float32'")
+    return dtype
+
+def fijar_precision(dtype):
+    """
+    Fija el tipo de dato por defecto de todas las etapas en el contexto actual:
+    'float64' (por defecto) o 'float32' (modo rápido, la mitad de memoria). Los
+    hilos nuevos empiezan con 'float64'; para propagar la política a otros hilos
+    ejecutar sus tareas con contextvars.copy_context().run.
+    """
+    _precision.set(_validar_precision(dtype))
+
+def precision(dtype=None):
+    """Devuelve dtype como np.dtype o, si es None, el tipo de dato de la política actual."""
+    return np.dtype(_precision.get() if dtype is None else dtype)
+
+@contextmanager
+def modo_precision(dtype):
+    """
+    Cambia la política de precisión dentro de un bloque with.
+
+    Ejemplo
+    -------
+    with modo_precision('float32'):
+        data, fs = read_wav('data/IR2/Mono.wav')   # float32
+    """
+    token = _precision.set(_validar_precision(dtype))
+    try:
+        yield
+    finally:
+        _precision.reset(token)
+
+# Tipos de muestra que se pueden mapear en memoria directamente: (dtype, escala a [-1, 1), desplazamiento)
+_MUESTRAS_MAPEABLES = {
+    'PCM_U8': ('u1', 2**7, 2**7),
+    'PCM_16': ('<i2', 2**15, 0),
+    'PCM_24': ('u1', 2**23, 0),  # 3 bytes por muestra, ver _pcm24
+    'PCM_32': ('<i4', 2**31, 0),
+    'FLOAT': ('<f4', 1, 0),
+    'DOUBLE': ('<f8', 1, 0),
+}
+
+def _inicio_datos(archivo):
+    """Devuelve el byte donde empiezan las muestras de un WAV RIFF, o None si no se encuentra."""
+    with open(archivo, 'rb') as wav:
+        cabecera = wav.read(12)
+        if len(cabecera) < 12 or cabecera[:4] != b'RIFF' or cabecera[8:12] != b'WAVE':
+            return None
+        while True:
+            chunk = wav.read(8)
+            if len(chunk) < 8:
+                return None
+            tamaño = int.from_bytes(chunk[4:8], 'little')
+            if chunk[:4] == b'data':
+                return wav.tell()
+            # Los chunks ocupan una cantidad par de bytes
+            wav.seek(tamaño + tamaño % 2, 1)
+
+def _pcm24(crudo):
+    """Convierte bytes (muestras, canales, 3) de PCM de 24 bits little endian a int32."""
+    crudo = crudo.astype(np.int32)
+    valores = crudo[..., 0] | (crudo[..., 1] << 8) | (crudo[..., 2] << 16)
+    # Extensión de signo desde el bit 23
+    return (valores << 8) >> 8
+
+class FuenteAudio:
+    """
+    Acceso perezoso a un archivo de audio. Los WAV PCM de 8, 16, 24 y 32 bits y los
+    de punto flotante se mapean en memoria, por lo que leer una ventana no carga
+    el archivo completo; los demás formatos se leen por ventanas con soundfile.
+
+    Parametros
+    ----------
+    archivo: str
+        Ruta del archivo de audio.
+
+    Atributos
+    ---------
+    fs: int
+        Frecuencia de muestreo.
+    canales: int
+        Cantidad de canales.
+    frames: int
+        Cantidad de muestras por canal.
+    subtype: str
+        Tipo de muestra según soundfile (por ejemplo 'PCM_16', 'FLOAT').
+
+    Ejemplo
+    -------
+    fuente = FuenteAudio('data/IR2/Mono.wav')
+    inicio = fuente.leer(0, fuente.fs)            # primer segundo, float64
+    data = fuente.datos()                         # señal completa, compartida, de solo lectura
+    for bloque in fuente.bloques(65536, dtype='float32'):
+        pass
+    """
+    def __init__(self, archivo):
+        info = sf.info(archivo)
+        self.archivo = archivo
+        self.fs = info.samplerate
+        self.canales = info.channels
+        self.frames = info.frames
+        self.subtype = info.subtype
+        self._formato = info.format
+        self._mapa = None
+        self._datos = {}
+
+    def __len__(self):
+        return self.frames
+
+    @property
+    def mapa(self):
+        """
+        Numpy memmap de solo lectura (frames, canales) con las muestras crudas del
+        archivo ((frames, canales, 3) bytes en PCM de 24 bits), o None si el
+        formato no se puede mapear.
+        """
+        if self._mapa is None and self._formato == 'WAV' and self.subtype in _MUESTRAS_MAPEABLES:
+            inicio = _inicio_datos(self.archivo)
+            if inicio is not None:
+                dtype = _MUESTRAS_MAPEABLES[self.subtype][0]
+                forma = (self.frames, self.canales, 3) if self.subtype == 'PCM_24' else (self.frames, self.canales)
+                self._mapa = np.memmap(self.archivo, dtype=dtype, mode='r', offset=inicio, shape=forma)
+        return self._mapa
+
+    def leer(self, inicio=0, fin=None, dtype=None, always_2d=False):
+        """
+        Lee las muestras [inicio, fin) escaladas a [-1, 1) como hace soundfile.
+
+        Parametros
+        ----------
+        inicio, fin: int
+            Muestras de inicio y fin de la ventana. Por defecto el archivo completo.
+        dtype: str
+            'float64' o 'float32'. Por defecto el de la política de precisión. Si coincide con el tipo de un WAV de punto
+            flotante el resultado es una vista de solo lectura del archivo (sin copia).
+        always_2d: bool
+            Si es True el resultado es (muestras, canales) aunque el archivo sea mono.
+
+        Returns
+        -------
+        Numpy array (muestras,) o (muestras, canales).
+        """
+        dtype = precision(dtype)
+        fin = self.frames if fin is None else min(fin, self.frames)
+        mapa = self.mapa
+        if mapa is None:
+            data, _ = sf.read(self.archivo, start=inicio, stop=fin, dtype=dtype.name, always_2d=True)
+        else:
+            crudo = np.asarray(mapa[inicio:fin])
+            if self.subtype == 'PCM_24':
+                crudo = _pcm24(crudo)
+            _, escala, desplazamiento = _MUESTRAS_MAPEABLES[self.subtype]
+            if crudo.dtype == dtype:
+                data = crudo
+            elif desplazamiento:
+                data = (crudo.astype(dtype) - desplazamiento) / escala
+            else:
+                data = np.multiply(crudo, 1/escala, dtype=dtype)
+        if self.canales == 1 and not always_2d:
+            data = data[:, 0]
+        return data
+
+    def bloques(self, tamaño, dtype=None, always_2d=False):
+        """Recorre el archivo en ventanas consecutivas de tamaño muestras (ver leer)."""
+        for inicio in range(0, self.frames, tamaño):
+            yield self.leer(inicio, inicio + tamaño, dtype, always_2d)
+
+    def datos(self, dtype=None, always_2d=False):
+        """
+        Devuelve la señal completa convertida a dtype. La conversión se hace una
+        sola vez por dtype y el array, de solo lectura, se comparte entre todas las
+        etapas que usen esta fuente (usar .copy() para modificarlo).
+        """
+        dtype = precision(dtype).name
+        if dtype not in self._datos:
+            data = self.leer(dtype=dtype, always_2d=True)
+            data.flags.writeable = False
+            self._datos[dtype] = data
+            _liberar_fuentes(conservar=self)
+        data = self._datos[dtype]
+        if self.canales == 1 and not always_2d:
+            data = data[:, 0]
+        return data
+
+    def cerrar(self):
+        """
+        Libera el mapa en memoria y las señales decodificadas con datos(). Los
+        arrays ya entregados siguen siendo válidos y la fuente se puede volver a
+        usar (el archivo se mapea de nuevo al leer).
+        """
+        self._mapa = None
+        self._datos = {}
+
+    @property
+    def nbytes(self):
+        """Bytes ocupados por las señales decodificadas con datos() (el mapa en memoria no cuenta)."""
+        return sum(data.nbytes for data in self._datos.values())
+
+# Fuentes abiertas con abrir_audio, de la menos a la más recientemente usada
+MAX_BYTES_FUENTES = 512*2**20
+_fuentes = OrderedDict()
+_fuentes_lock = threading.Lock()
+
+def _liberar_fuentes(conservar=None):
+    """
+    Descarta las fuentes menos usadas recientemente hasta que las señales
+    decodificadas de todas ocupen a lo sumo MAX_BYTES_FUENTES. La fuente
+    conservar (la que se está usando) no se descarta aunque exceda el límite.
+    """
+    with _fuentes_lock:
+        total = sum(fuente.nbytes for fuente in _fuentes.values())
+        for clave in list(_fuentes):
+            if total <= MAX_BYTES_FUENTES:
+                break
+            if _fuentes[clave] is not conservar:
+                fuente = _fuentes.pop(clave)
+                total -= fuente.nbytes
+                fuente.cerrar()
+
+def abrir_audio(file):
+    """
+    Devuelve la FuenteAudio de un archivo, compartida por todas las llamadas
+    mientras el archivo no cambie (se identifica por ruta, fecha de modificación
+    y tamaño). Las fuentes menos usadas se descartan cuando las señales
+    decodificadas de todas superan MAX_BYTES_FUENTES bytes (512 MB).
+    """
+    if isinstance(file, FuenteAudio):
+        return file
+    ruta = os.path.realpath(file)
+    estado = os.stat(ruta)
+    clave = (ruta, estado.st_mtime_ns, estado.st_size)
+    with _fuentes_lock:
+        fuente = _fuentes.get(clave)
+        if fuente is None:
+            fuente = _fuentes[clave] = FuenteAudio(ruta)
+        _fuentes.move_to_end(clave)
+    _liberar_fuentes(conservar=fuente)
+    return fuente
+
+def read_wav(file, dtype=None):
     """
     Cargar un archivo ".wav".
+
+    El archivo se decodifica una vez, sin guardarlo en las fuentes compartidas de
+    abrir_audio, y el array devuelto es propio y se puede modificar. Para leer
+    varias veces el mismo archivo sin volver a decodificarlo, o para compartir el
+    array de solo lectura entre etapas, usar abrir_audio(file).datos(dtype).
     
     Parametros
     ----------
-    file: Archivo ".wav"
+    file: Archivo ".wav" o FuenteAudio
+
+    dtype: str, 'float64' o 'float32'. Por defecto el de la política de precisión (ver fijar_precision).
         
     return: (Numpy array, frecuencia de muestreo) 
 
@@ -26,8 +288,14 @@ def read_wav(file):
     read_wav(file)
 
     """
-    data, fs = sf.read(file)
-    return(data, fs)
+    fuente = file if isinstance(file, FuenteAudio) else FuenteAudio(file)
+    data = fuente.leer(dtype=dtype)
+    if not data.flags.writeable:
+        # Vista del mapa en memoria (WAV de punto flotante del mismo dtype)
+        data = data.copy()
+    if fuente is not file:
+        fuente.cerrar()
+    return(data, fuente.fs)
 
 def time_domain_plot(data, fs, graph_name=" "):
     """
@@ -68,6 +336,8 @@ def time_domain_plot(data, fs, graph_name=" "):
 
 def reproducir(filename):
     '''Función para reproducir audio'''
+    # sounddevice requiere PortAudio, se importa sólo al reproducir
+    import sounddevice as sd
 
     # Extract data and sampling rate from file
     data, fs = sf.read(filename, dtype='float32')  
@@ -144,7 +414,7 @@ def analisis_frecuencias(audio, fs):
     return(fft_data)
 
 if __name__ == '__main__':
-    file = 'data\IR2\Mono.wav'    
+    file = 'data/IR2/Mono.wav'    
         
     data, fs = read_wav(file) 
                     
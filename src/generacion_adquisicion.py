@@ -1,15 +1,126 @@
 import numpy as np
-import pandas as pd
+import hashlib
+import os
+from collections import OrderedDict
 import soundfile as sf
-import sounddevice as sd
+try:
+    import sounddevice as sd
+except OSError:
+    # Sin PortAudio no se puede reproducir ni grabar, el resto del módulo funciona igual
+    sd = None
 from scipy.io.wavfile import write
 from scipy import signal
 from funciones import time_domain_plot
 from funciones import read_wav
+from telemetria import instrumentar
 from tkinter import *
 
+## Funcion de sintetización de Ruido Rosa por bloques
+def ruido_rosa_bloques(t=None, fs=44100, ncols=16, tamaño_bloque=8192, seed=None):
+    """
+    Generador de ruido rosa por bloques con el algoritmo de Voss-McCartney.
+    La memoria utilizada depende sólo de tamaño_bloque y ncols, no de la duración.
+
+    Parametros
+    ----------
+    t : float
+        Duración en segundos. Si es None el generador no termina.
+    fs: int
+        Frecuencia de muestreo en Hz de la señal. Por defecto el valor es 44100 Hz.
+    ncols: int
+        Determina el número de fuentes a aleatorias a agregar.
+    tamaño_bloque: int
+        Cantidad de muestras de cada bloque.
+    seed: int
+        Semilla del generador aleatorio, para obtener resultados reproducibles.
+
+    yields: NumPy array
+        Bloques de hasta tamaño_bloque muestras con valores en [-1, 1].
+
+    Ejemplo
+    -------
+    for bloque in ruido_rosa_bloques(10, seed=0):
+        print(bloque.shape)
+    """
+    rng = np.random.default_rng(seed)
+    restantes = None if t is None else int(t*fs)
+    estado = rng.random(ncols)  # Último valor de cada fuente
+    columnas = np.arange(ncols)
+    while restantes is None or restantes > 0:
+        n = tamaño_bloque if restantes is None else min(tamaño_bloque, restantes)
+        valores = np.empty((n, ncols))
+        actualizado = np.zeros((n, ncols), dtype=bool)
+
+        # La primera fuente cambia en cada muestra, el resto con probabilidad geométrica
+        valores[:, 0] = rng.random(n)
+        actualizado[:, 0] = True
+        cols = rng.geometric(0.5, n)
+        cols[cols >= ncols] = 0
+        rows = rng.integers(n, size=n)
+        valores[rows, cols] = rng.random(n)
+        actualizado[rows, cols] = True
+
+        # Mantener el último valor de cada fuente (forward fill) continuando el bloque anterior
+        indices = np.where(actualizado, np.arange(n)[:, None], -1)
+        np.maximum.accumulate(indices, axis=0, out=indices)
+        filled = np.where(indices >= 0, valores[np.maximum(indices, 0), columnas], estado)
+        estado = filled[-1]
+
+        # Centrado en 0 y normalizado al rango teórico [0, ncols] de la suma
+        total = filled.sum(axis=1)
+        yield (total - ncols/2) / (ncols/2)
+        if restantes is not None:
+            restantes -= n
+
+def ruido_rosa_wav(archivo, t, fs=44100, ncols=16, tamaño_bloque=8192, seed=None, subtype='PCM_16'):
+    """
+    Escribe ruido rosa en un archivo ".wav" bloque a bloque, sin cargarlo entero en memoria.
+
+    Parametros
+    ----------
+    archivo: str
+        Nombre del archivo ".wav" a generar.
+    t, fs, ncols, tamaño_bloque, seed:
+        Ver ruido_rosa_bloques.
+    subtype: str
+        Formato de las muestras del archivo. Por defecto 'PCM_16'.
+
+    Ejemplo
+    -------
+    Una hora de ruido rosa de calibración:
+
+    ruido_rosa_wav('ruidoRosa_1h.wav', 3600, seed=1)
+    """
+    with sf.SoundFile(archivo, 'w', samplerate=fs, channels=1, subtype=subtype) as wav:
+        for bloque in ruido_rosa_bloques(t, fs, ncols, tamaño_bloque, seed):
+            wav.write(bloque)
+
+def ruido_rosa_callback(fs=44100, ncols=16, seed=None):
+    """
+    Genera un callback para sd.OutputStream que reproduce ruido rosa sin límite de duración.
+
+    Ejemplo
+    -------
+    import sounddevice as sd
+
+    with sd.OutputStream(samplerate=44100, channels=1, callback=ruido_rosa_callback()):
+        sd.sleep(10*1000)
+    """
+    bloques = ruido_rosa_bloques(None, fs, ncols, seed=seed)
+    pendiente = np.empty(0)
+
+    def callback(outdata, frames, time, status):
+        nonlocal pendiente
+        while len(pendiente) < frames:
+            pendiente = np.concatenate([pendiente, next(bloques)])
+        outdata[:] = pendiente[:frames, None]
+        pendiente = pendiente[frames:]
+
+    return callback
+
 ## Funcion de sintetización de Ruido Rosa
-def ruidoRosa_voss_modified(t, fs=44100, ncols=16):
+@instrumentar()
+def ruidoRosa_voss_modified(t, fs=44100, ncols=16, seed=None):
     """
     Genera ruido rosa utilizando el algoritmo de Voss-McCartney(https://www.dsprelated.com/showabstract/3933.php).
     
@@ -23,6 +134,8 @@ def ruidoRosa_voss_modified(t, fs=44100, ncols=16):
         Frecuencia de muestreo en Hz de la señal. Por defecto el valor es 44100 Hz.
     ncols: int
         Determina el número de fuentes a aleatorias a agregar.
+    seed: int
+        Semilla del generador aleatorio.
 
     returns: NumPy array
         Datos de la señal generada.
@@ -33,35 +146,19 @@ def ruidoRosa_voss_modified(t, fs=44100, ncols=16):
     frecuencia de muestreo de 44100 Hz.
     
         import numpy as np
-        import pandas as pd
         import soundfile as sf
         from scipy.io.wavfile import write
         from scipy import signal
         
         ruidoRosa_voss(10)
     """
-    nrows = int(t*fs)
-
-    array = np.full((nrows, ncols), np.nan)
-    array[0, :] = np.random.random(ncols)
-    array[:, 0] = np.random.random(nrows)
-    
-    # el numero total de cambios es nrows
-    n = nrows
-    cols = np.random.geometric(0.5, n)
-    cols[cols >= ncols] = 0
-    rows = np.random.randint(nrows, size=n)
-    array[rows, cols] = np.random.random(n)
-    
-    df = pd.DataFrame(array)
-    filled = df.fillna(method='ffill', axis=0)
-    total = filled.sum(axis=1)
+    total = np.concatenate(list(ruido_rosa_bloques(t, fs, ncols, seed=seed)))
     
     ## Centrado de el array en 0
     total = total - total.mean()
     
     ## Normalizado
-    valor_max = max(abs(max(total)),abs(min(total)))
+    valor_max = np.max(np.abs(total))
     total = total / valor_max
     
     # Agregar generación de archivo de audio .wav
@@ -70,7 +167,8 @@ def ruidoRosa_voss_modified(t, fs=44100, ncols=16):
     return total
 
 ## Funcion de generación de Sine Swep Logarítmico + Filtro Inverso
-def log_sweep_invfilter(f1, f2, t_sweep, fs_sweep):
+@instrumentar()
+def log_sweep_invfilter(f1, f2, t_sweep, fs_sweep, guardar_wav=True):
     """
     Genera Sine Sweep Logarítmico y su filtro inverso.
     
@@ -86,6 +184,8 @@ def log_sweep_invfilter(f1, f2, t_sweep, fs_sweep):
         Frecuencia inferior
     f2: int
         Frecuencia superior
+    guardar_wav: bool
+        Si es True se escriben 'SineSweepLog.wav' e 'InvFilter.wav'. Por defecto True.
     
     returns: (x: NumPy array, k_t: NumPy array)
         x: Datos del sine sweep logarítmico
@@ -118,11 +218,137 @@ def log_sweep_invfilter(f1, f2, t_sweep, fs_sweep):
     k_t = x[::-1]*m
     
     # Agregar generación de archivo de audio .wav
-    write('SineSweepLog.wav', fs_sweep, x)  # Save as WAV file 
-    write('InvFilter.wav', fs_sweep, k_t)  # Save as WAV file 
+    if guardar_wav:
+        write('SineSweepLog.wav', fs_sweep, x)  # Save as WAV file 
+        write('InvFilter.wav', fs_sweep, k_t)  # Save as WAV file 
 
     return x, k_t
 
+## Cache de sine sweeps y filtros inversos
+# En memoria se conservan los MAX_BARRIDOS pares y MAX_ESPECTROS espectros usados más
+# recientemente. En disco se guarda un ".npy" por par y por (par, n_fft) en
+# DIRECTORIO_CACHE, sin límite: limpiar_cache_barridos() borra ambos. La clave incluye
+# VERSION_BARRIDO, que se incrementa al cambiar log_sweep_invfilter para que no se
+# usen archivos generados por el código anterior.
+DIRECTORIO_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "signal_sistems")
+VERSION_BARRIDO = 1
+MAX_BARRIDOS = 8
+MAX_ESPECTROS = 8
+_cache_barridos = OrderedDict()
+_cache_espectros = OrderedDict()
+
+def clave_barrido(f1, f2, t_sweep, fs_sweep, dtype='float64'):
+    """
+    Calcula la clave (hash) que identifica un par sweep/filtro inverso.
+
+    returns: str con el hash SHA-1 de (VERSION_BARRIDO, f1, f2, t_sweep, fs_sweep, dtype).
+    """
+    parametros = (VERSION_BARRIDO, float(f1), float(f2), float(t_sweep), int(fs_sweep), np.dtype(dtype).name)
+    return hashlib.sha1(repr(parametros).encode()).hexdigest()
+
+def _recordar(cache, clave, valor, maximo):
+    # Guarda valor como el más reciente y descarta los menos usados
+    cache[clave] = valor
+    cache.move_to_end(clave)
+    while len(cache) > maximo:
+        cache.popitem(last=False)
+    return valor
+
+def limpiar_cache_barridos(directorio=DIRECTORIO_CACHE):
+    """
+    Vacía la cache en memoria de barrido_cacheado y espectro_filtro_inverso y
+    borra sus archivos ".npy" de directorio (si no es None).
+
+    returns: int, cantidad de archivos borrados.
+    """
+    _cache_barridos.clear()
+    _cache_espectros.clear()
+    if directorio is None or not os.path.isdir(directorio):
+        return 0
+    archivos = [nombre for nombre in os.listdir(directorio)
+                if nombre.endswith(".npy") and nombre.startswith(("barrido_", "espectro_"))]
+    for nombre in archivos:
+        os.remove(os.path.join(directorio, nombre))
+    return len(archivos)
+
+def _guardar_npy(ruta, array):
+    # Escritura atómica para que varios procesos puedan compartir el directorio
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = "{}.{}.tmp".format(ruta, os.getpid())
+    with open(temporal, 'wb') as archivo:
+        np.save(archivo, array)
+    os.replace(temporal, ruta)
+
+def barrido_cacheado(f1, f2, t_sweep, fs_sweep, dtype='float64', directorio=DIRECTORIO_CACHE):
+    """
+    Devuelve el sine sweep logarítmico y su filtro inverso desde la cache.
+    Si no están en memoria se buscan en disco y, si tampoco existen, se generan
+    con log_sweep_invfilter (sin escribir archivos ".wav") y se guardan.
+
+    Parametros
+    ----------
+    f1, f2, t_sweep, fs_sweep:
+        Ver log_sweep_invfilter.
+    dtype: str
+        Tipo de dato de los arrays devueltos.
+    directorio: str
+        Directorio de la cache en disco. Si es None sólo se usa la cache en memoria.
+
+    returns: (x: NumPy array, k_t: NumPy array)
+        Arrays de sólo lectura compartidos entre llamadas.
+
+    Ejemplo
+    -------
+    x, k_t = barrido_cacheado(20, 20000, 10, 44100)
+    """
+    clave = clave_barrido(f1, f2, t_sweep, fs_sweep, dtype)
+    if clave in _cache_barridos:
+        _cache_barridos.move_to_end(clave)
+        return _cache_barridos[clave]
+
+    ruta = None if directorio is None else os.path.join(directorio, "barrido_{}.npy".format(clave))
+    if ruta is not None and os.path.exists(ruta):
+        x, k_t = np.load(ruta)
+    else:
+        x, k_t = log_sweep_invfilter(f1, f2, t_sweep, fs_sweep, guardar_wav=False)
+        x, k_t = np.stack([x, k_t]).astype(dtype)
+        if ruta is not None:
+            _guardar_npy(ruta, np.stack([x, k_t]))
+
+    x.flags.writeable = False
+    k_t.flags.writeable = False
+    return _recordar(_cache_barridos, clave, (x, k_t), MAX_BARRIDOS)
+
+def espectro_filtro_inverso(f1, f2, t_sweep, fs_sweep, n_fft, dtype='float64', directorio=DIRECTORIO_CACHE):
+    """
+    Devuelve la rFFT de n_fft puntos del filtro inverso desde la cache.
+
+    Parametros
+    ----------
+    f1, f2, t_sweep, fs_sweep, dtype, directorio:
+        Ver barrido_cacheado.
+    n_fft: int
+        Cantidad de puntos de la FFT.
+
+    returns: NumPy array complejo de sólo lectura con n_fft//2 + 1 valores.
+    """
+    clave = (clave_barrido(f1, f2, t_sweep, fs_sweep, dtype), int(n_fft))
+    if clave in _cache_espectros:
+        _cache_espectros.move_to_end(clave)
+        return _cache_espectros[clave]
+
+    ruta = None if directorio is None else os.path.join(directorio, "espectro_{}_{}.npy".format(*clave))
+    if ruta is not None and os.path.exists(ruta):
+        espectro = np.load(ruta)
+    else:
+        _, k_t = barrido_cacheado(f1, f2, t_sweep, fs_sweep, dtype, directorio)
+        espectro = np.fft.rfft(k_t, n_fft)
+        if ruta is not None:
+            _guardar_npy(ruta, espectro)
+
+    espectro.flags.writeable = False
+    return _recordar(_cache_espectros, clave, espectro, MAX_ESPECTROS)
+
 # Adquisición y reproducción
 def record_signal(signal, input_device, output_device):
     """
@@ -160,6 +386,8 @@ def record_signal(signal, input_device, output_device):
     record_signal(signal, input_device, output_device,duration)
     
     """
+    if sd is None:
+        raise RuntimeError("sounddevice no está disponible, se necesita PortAudio para grabar")
     # Selección de dispositivos de audio
     sd.default.device = input_device, output_device
     # Reproducción de la señal y grabación en simultáneo   
@@ -1,16 +1,26 @@
 import numpy as np
+import pandas as pd
+import logging
 from tkinter import *
 from IPython.display import clear_output, display
 from tkinter import filedialog
 import soundfile as sf
-from scipy import signal
-from funciones import read_wav
+from scipy import signal, fft
+from funciones import read_wav, abrir_audio, precision
 from funciones import esc_log
 from scipy.io.wavfile import write
 from funciones import time_domain_plot
 from funciones import reproducir
 from funciones import analisis_frecuencias
 import matplotlib.pyplot as plt
+from functools import lru_cache
+from dataclasses import dataclass
+from deconvolucion import Deconvolucion
+from generacion_adquisicion import barrido_cacheado
+from suavizado_calculo import deteccion_inicio, lundeby
+from telemetria import medir, instrumentar
+
+logger = logging.getLogger(__name__)
 
 
 ## Función de carga de archivos de audio (dataset)
@@ -51,9 +61,11 @@ def select_files():
     
 
 ## Función de sintetización de respuesta al impulso
-def ir_sint(f_i, tr_i_list, tiempo_impulso=6, frec_muestreo=44100):
+def ir_sint(f_i, tr_i_list, tiempo_impulso=6, frec_muestreo=44100, guardar_wav=True, tamaño_bloque=65536):
     '''
-    Genera una respuesta al impulso sintetizada a partir de los parámetros acústicos brindados.
+    Genera una respuesta al impulso sintetizada a partir de los parámetros acústicos brindados:
+    una suma de cosenos de frecuencias f_i con decaimiento exponencial.
+    Todas las frecuencias se calculan juntas, por bloques de tamaño_bloque muestras.
     
     Parametros
     ----------
@@ -68,6 +80,13 @@ def ir_sint(f_i, tr_i_list, tiempo_impulso=6, frec_muestreo=44100):
     
     frec_muestreo:int
         frecuencia de muestreo    
+
+    guardar_wav: bool
+        Si es True se guarda la RI en 'IR_sint.wav'. Por defecto True.
+
+    tamaño_bloque: int
+        Cantidad de muestras que se calculan a la vez; limita la memoria a
+        tamaño_bloque por la cantidad de frecuencias.
     
     return: Numpy array
         valores de las muestras   
@@ -81,26 +100,147 @@ def ir_sint(f_i, tr_i_list, tiempo_impulso=6, frec_muestreo=44100):
     file = 'ruidoRosa.wav'
     time_domain_plot(file)    
     '''    
-    
-    t = np.arange(0, tiempo_impulso*frec_muestreo)/frec_muestreo
-    y_i_list = []
-    for i in range(len(f_i)):
-        tau_i = np.log(10**(-3))/tr_i_list[i]
-        y_i = (np.exp(tau_i*t))*np.cos(2*np.pi*f_i[i]*t)
-        y_i_list.append(y_i)
-
-    y = sum(y_i_list)
+    f_i = np.asarray(f_i, dtype=float)
+    tau_i = np.log(10**(-3))/np.asarray(tr_i_list, dtype=float)
+    n = int(np.ceil(tiempo_impulso*frec_muestreo))
+    y = np.empty(n)
+    for inicio in range(0, n, tamaño_bloque):
+        t = (np.arange(inicio, min(inicio + tamaño_bloque, n))/frec_muestreo)[:, None]
+        y[inicio:inicio + len(t)] = (np.exp(tau_i*t)*np.cos(2*np.pi*f_i*t)).sum(axis=1)
     # Normalizado
-    y_max = max(abs(max(y)), abs(min(y)))
-    y_norm = y/y_max 
+    y_norm = y/np.max(np.abs(y))
     # Guardar archivo wav
-    write('IR_sint.wav', frec_muestreo, y_norm)
-    # Info del numpy array
-    print(type(y_norm), y_norm)
+    if guardar_wav:
+        write('IR_sint.wav', frec_muestreo, y_norm)
     return(y_norm)
 
+def ri_sintetica_bloques(t60, fs=44100, duracion=None, fraccion=1, retardo=0.01, directo=None, ruido_dB=None,
+                         canales=1, tamaño_bloque=65536, seed=None, orden=4):
+    '''
+    Generador por bloques de una RI sintética con tiempos de reverberación conocidos.
+    Cada banda de BancoFiltrosIEC(fs, fraccion, orden) es un ruido blanco independiente
+    filtrado en la banda con un decaimiento exponencial de -60 dB en el T60 de la banda; las
+    bandas se suman, opcionalmente con un sonido directo y un piso de ruido.
+    Los filtros conservan su estado entre bloques, por lo que la memoria depende
+    sólo de tamaño_bloque, y el resultado no depende de tamaño_bloque.
+
+    Parametros
+    ----------
+    t60: float o secuencia
+        Tiempo de reverberación en segundos, uno para todas las bandas o uno por banda
+        (en el orden de BancoFiltrosIEC(fs, fraccion).frecuencias).
+    fs: int
+        Frecuencia de muestreo.
+    duracion: float
+        Duración en segundos. Por defecto retardo más 1.5 veces el mayor T60 (-90 dB).
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+    retardo: float
+        Segundos de silencio antes del sonido directo y del comienzo del decaimiento.
+    directo: float
+        Amplitud del sonido directo (un impulso) respecto del valor eficaz inicial
+        del ruido de cada banda. Si es None no hay sonido directo.
+    ruido_dB: float
+        Nivel del piso de ruido blanco respecto del valor eficaz inicial del ruido
+        de cada banda, por ejemplo -60. Si es None no hay piso de ruido.
+    canales: int
+        Cantidad de canales, con ruidos independientes y los mismos parámetros.
+    tamaño_bloque: int
+        Cantidad de muestras de cada bloque.
+    seed: int o secuencia de int
+        Semilla del generador aleatorio.
+    orden: int
+        Orden de los filtros Butterworth de las bandas.
+
+    yields: Numpy array
+        Bloques (muestras,) si canales es 1, o (muestras, canales).
+
+    Ejemplo
+    -------
+    ri = np.concatenate(list(ri_sintetica_bloques([2.0, 1.8, 1.5, 1.2, 1.1, 1.0, 0.9, 0.8, 0.6, 0.4],
+                                                  directo=50, ruido_dB=-70, seed=1)))
+    '''
+    banco = BancoFiltrosIEC(fs, fraccion, orden)
+    t60 = np.broadcast_to(np.asarray(t60, dtype=float), (len(banco.bandas),))
+    if duracion is None:
+        duracion = retardo + 1.5*np.max(t60)
+    n = int(round(duracion*fs))
+    n_retardo = int(round(retardo*fs))
+    # Decaimiento de la amplitud: -60 dB (10**-3) en t60
+    tasa = np.log(10**3)/t60
+    # Ruido de las bandas y piso de ruido con secuencias independientes del tamaño de bloque
+    rng_bandas, rng_ruido = [np.random.default_rng(semilla) for semilla in np.random.SeedSequence(seed).spawn(2)]
+    estados = [np.zeros((sos.shape[0], 2, canales)) for *_, sos in banco.bandas]
+    for inicio in range(0, n, tamaño_bloque):
+        m = min(tamaño_bloque, n - inicio)
+        # Un ruido independiente por banda: las bandas no interfieren entre sí
+        ruido = rng_bandas.standard_normal((m, len(banco.bandas), canales))
+        t = (np.arange(inicio, inicio + m) - n_retardo)/fs
+        # Envolventes de todas las bandas juntas: (muestras, bandas), cero antes del retardo
+        envolventes = np.exp(-np.maximum(t, 0)[:, None]*tasa)
+        envolventes[t < 0] = 0
+        bloque = np.zeros((m, canales))
+        for i, (*_, sos) in enumerate(banco.bandas):
+            filtrada, estados[i] = signal.sosfilt(sos, ruido[:, i], axis=0, zi=estados[i])
+            bloque += filtrada*envolventes[:, i:i + 1]
+        if directo is not None and inicio <= n_retardo < inicio + m:
+            bloque[n_retardo - inicio] += directo
+        if ruido_dB is not None:
+            bloque += 10**(ruido_dB/20)*rng_ruido.standard_normal((m, canales))
+        yield bloque[:, 0] if canales == 1 else bloque
+
+def ri_sintetica(t60, fs=44100, **kwargs):
+    '''
+    RI sintética completa (ver ri_sintetica_bloques), normalizada a un máximo de 1.
+    Los parámetros que le corresponden se obtienen con parametros_ri_sintetica.
+    '''
+    ri = np.concatenate(list(ri_sintetica_bloques(t60, fs, **kwargs)))
+    return ri/np.max(np.abs(ri))
+
+def parametros_ri_sintetica(t60, fs=44100, duracion=None, fraccion=1, retardo=0.01, directo=None, ruido_dB=None, orden=4):
+    '''
+    Parámetros verdaderos por banda de una RI de ri_sintetica_bloques con los mismos argumentos.
+
+    C80, C50 y D50 se calculan en forma cerrada con la energía esperada de cada
+    banda de BancoFiltrosIEC desde el sonido directo (o desde el comienzo del
+    decaimiento). La energía que cada banda toma del sonido directo, del piso de
+    ruido y del decaimiento de cada banda sintetizada (también de las vecinas)
+    se obtiene de las respuestas en frecuencia de los filtros. No se considera el
+    retardo de grupo de los filtros, que en las bandas graves pasa energía
+    temprana a la parte tardía.
+
+    Returns
+    -------
+    pandas DataFrame indexado por banda con las columnas T60, C80, C50 y D50.
+    '''
+    bandas = diseño_banco_sos(fs, fraccion, orden)
+    t60 = np.broadcast_to(np.asarray(t60, dtype=float), (len(bandas),))
+    if duracion is None:
+        duracion = retardo + 1.5*np.max(t60)
+    # Muestras desde el inicio hasta el final
+    n = int(round(duracion*fs)) - int(round(retardo*fs))
+    # Potencia de ruido blanco unitario en cada banda (ganancia) y la que pasa por
+    # la banda de análisis b desde la banda sintetizada k (acoplamiento[b, k])
+    potencias = np.array([np.abs(signal.sosfreqz(sos, worN=8192)[1])**2 for *_, sos in bandas])
+    ganancia = potencias.mean(axis=1)
+    acoplamiento = potencias @ potencias.T / potencias.shape[1]
+    # Energía del decaimiento de cada banda sintetizada en [a, b): suma geométrica de razón r
+    r = np.exp(-2*np.log(10**3)/(t60*fs))
+    piso = 0 if ruido_dB is None else 10**(ruido_dB/10)
+    def energia(a, b):
+        a, b = min(a, n), min(b, n)
+        return acoplamiento @ ((r**a - r**b)/(1 - r)) + ganancia*piso*(b - a)
+    directo = ganancia*(0 if directo is None else directo**2)
+    n50, n80 = int(round(0.05*fs)), int(round(0.08*fs))
+    return pd.DataFrame({"T60": t60,
+                         "C80": 10*np.log10((directo + energia(0, n80))/energia(n80, n)),
+                         "C50": 10*np.log10((directo + energia(0, n50))/energia(n50, n)),
+                         "D50": (directo + energia(0, n50))/(directo + energia(0, n))},
+                        index=pd.Index([banda[0] for banda in bandas], name="banda"))
+
 ## Función obtener respuesta al impulso
-def respuesta_impulso(rec_sine_sweep, invfilter, nombre_impulso="impulso"):
+@instrumentar()
+def respuesta_impulso(rec_sine_sweep, invfilter, nombre_impulso="impulso", largo_ri=None, guardar_wav=True):
     """
     Función que genera un impulso a través de la convolución un sinesweep logarítmico grabado y un filtro inverso.
 
@@ -109,8 +249,18 @@ def respuesta_impulso(rec_sine_sweep, invfilter, nombre_impulso="impulso"):
     rec_sine_sweep: str
         Archivo ".wav" del sine sweep grabado.
 
-    invfilter: str
-        Nombre del archivo ".wav" del filtro inverso.
+    invfilter: str o tuple
+        Nombre del archivo ".wav" del filtro inverso, o los parámetros
+        (f1, f2, t_sweep, fs_sweep) del sweep reproducido (ver log_sweep_invfilter).
+        Con los parámetros el filtro inverso y su espectro se toman de la cache de
+        barrido_cacheado y espectro_filtro_inverso, también entre ejecuciones.
+
+    largo_ri: int
+        Cantidad de muestras de la RI a partir del impulso (parte causal).
+        Por defecto se devuelve la convolución completa.
+
+    guardar_wav: bool
+        Si es True se guarda la RI en "<nombre_impulso>.wav".
     
     Returns
     -------
@@ -118,25 +268,600 @@ def respuesta_impulso(rec_sine_sweep, invfilter, nombre_impulso="impulso"):
         datos de respuesta al impulso.
     """
 
-    data_sweep, fs = sf.read(rec_sine_sweep)  
-    data_invfilter, fs = sf.read(invfilter)
+    grabacion = abrir_audio(rec_sine_sweep)
+    data_sweep, fs = grabacion.datos(), grabacion.fs
 
-    impulso = signal.fftconvolve(data_sweep, data_invfilter, mode='full')
-    impulso_max = max(abs(max(impulso)), abs(min(impulso)))
+    # El motor (o el espectro del filtro inverso) se reutiliza entre llamadas
+    if isinstance(invfilter, str):
+        n_inv = len(abrir_audio(invfilter))
+        def motor(**kwargs):
+            return Deconvolucion.desde_archivo(invfilter, len(data_sweep), **kwargs)
+    else:
+        n_inv = len(barrido_cacheado(*invfilter)[1])
+        def motor(**kwargs):
+            return Deconvolucion.desde_barrido(*invfilter, len(data_sweep), **kwargs)
+    if largo_ri is None:
+        deconv = motor(largo_ri=len(data_sweep) + n_inv - 1, inicio=0)
+    else:
+        deconv = motor(largo_ri=largo_ri)
+    impulso = deconv.deconvolucionar(data_sweep)
+    impulso_max = np.max(np.abs(impulso))
     impulso_norm = impulso/impulso_max 
-    sf.write("{}.wav".format(nombre_impulso), impulso_norm, fs)
+    if guardar_wav:
+        sf.write("{}.wav".format(nombre_impulso), impulso_norm, fs)
 
     return impulso_norm
 
+## Acondicionamiento de la RI
+@dataclass
+class RIRecortada:
+    """
+    Vista de una RI sin el silencio inicial ni la cola de ruido sobrante.
+
+    Atributos
+    ---------
+    data: Numpy array
+        Vista data_original[inicio:fin] (sin copia).
+    fs: int
+        Frecuencia de muestreo.
+    inicio, fin: int
+        Muestras de la RI original donde empieza y termina la vista.
+    n_original: int
+        Largo de la RI original.
+    cruce: int
+        Muestra de la RI original donde el decaimiento alcanza el ruido de fondo (Lundeby).
+    """
+    data: np.ndarray
+    fs: int
+    inicio: int
+    fin: int
+    n_original: int
+    cruce: int
+
+    def a_original(self, indice):
+        """Convierte un índice de la vista en un índice de la RI original."""
+        return indice + self.inicio
+
+@instrumentar()
+def recortar_ri(data, fs=44100, margen_inicio=0.005, cola=1.0, umbral_dB=-20):
+    """
+    Recorta el silencio inicial y la cola de ruido de una RI para que las etapas
+    siguientes (filtrado, suavizado, Schroeder) procesen sólo la parte útil.
+
+    El inicio es el del sonido directo (deteccion_inicio) menos margen_inicio.
+    El final es el cruce con el ruido de fondo de Lundeby más una fracción cola
+    del decaimiento, para que el ruido se pueda volver a estimar en cada banda,
+    sin contar los ceros digitales del final.
+    En RI multicanal se usa el menor inicio y el mayor cruce de los canales.
+
+    Parametros
+    ----------
+    data: Numpy array
+        RI mono (muestras,) o multicanal (muestras, canales).
+    fs: int
+        Frecuencia de muestreo.
+    margen_inicio: float
+        Segundos que se conservan antes del sonido directo. Por defecto 5 ms.
+    cola: float
+        Fracción del largo del decaimiento que se conserva después del cruce.
+        Las bandas graves decaen más lento que la señal de banda ancha y su
+        cruce puede ser posterior; con valores menores a 1 el recorte es mayor
+        pero sus tiempos de reverberación pueden cambiar.
+    umbral_dB: float
+        Nivel respecto del máximo que define el inicio (ISO 3382-1). Por defecto -20 dB.
+
+    Returns
+    -------
+    RIRecortada con la vista recortada y los índices en la RI original.
+
+    Ejemplo
+    -------
+    import soundfile as sf
+
+    data, fs = sf.read('data/IR1/Mono.wav')
+    ri = recortar_ri(data, fs)
+    ri.inicio, ri.fin, len(ri.data)
+    """
+    data = np.asarray(data)
+    # Los ceros digitales del final (RI ya recortadas o con fundido) se descartan siempre
+    no_nulas = np.nonzero(np.any(data.reshape(len(data), -1) != 0, axis=1))[0]
+    n = int(no_nulas[-1]) + 1 if len(no_nulas) else len(data)
+    inicio = max(int(np.min(deteccion_inicio(data, umbral_dB))) - int(margen_inicio*fs), 0)
+    canales = data[inicio:n].reshape(n - inicio, -1)
+    cruce = inicio + max(lundeby(canales[:, c], fs).cruce for c in range(canales.shape[1]))
+    fin = min(cruce + int(cola*(cruce - inicio)), n)
+    return RIRecortada(data[inicio:fin], fs, inicio, fin, len(data), cruce)
+
+## Frecuencias nominales según IEC 61260
+FRECUENCIAS_OCTAVA = [31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000]
+FRECUENCIAS_TERCIO = [25, 31.5, 40, 50, 63, 80, 100, 125, 160, 200, 250, 315, 400, 500, 630, 800,
+                      1000, 1250, 1600, 2000, 2500, 3150, 4000, 5000, 6300, 8000, 10000, 12500, 16000, 20000]
+
+def frecuencias_nominales(fraccion=1):
+    """
+    Devuelve las frecuencias centrales nominales de las bandas.
+
+    Parametros
+    ----------
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+
+    Returns
+    -------
+    list con las frecuencias centrales en Hz.
+    """
+    if fraccion == 1:
+        return FRECUENCIAS_OCTAVA
+    if fraccion == 3:
+        return FRECUENCIAS_TERCIO
+    raise ValueError("fraccion debe ser 1 (octava) o 3 (tercio de octava)")
+
+def frecuencias_centrales(fraccion=1, f_min=20, f_max=20000):
+    """
+    Devuelve las frecuencias centrales de las bandas de 1/fraccion de octava
+    entre f_min y f_max. Para octava y tercio de octava son las nominales; para
+    otras fracciones son las exactas en base 2 referidas a 1 kHz (IEC 61260-1).
+
+    Parametros
+    ----------
+    fraccion: int
+        Cantidad de bandas por octava.
+    f_min, f_max: float
+        Rango de frecuencias centrales en Hz.
+
+    Returns
+    -------
+    list con las frecuencias centrales en Hz.
+    """
+    if fraccion in (1, 3):
+        return frecuencias_nominales(fraccion)
+    # Con una cantidad par de bandas por octava 1 kHz queda en un extremo de banda
+    desplazamiento = 0.5 if fraccion % 2 == 0 else 0
+    x_min = int(np.ceil(fraccion*np.log2(f_min/1000) - desplazamiento))
+    x_max = int(np.floor(fraccion*np.log2(f_max/1000) - desplazamiento))
+    return [1000*2**((x + desplazamiento)/fraccion) for x in range(x_min, x_max + 1)]
+
+def frecuencia_exacta(frecuencia, fraccion=1):
+    """
+    Devuelve la frecuencia central exacta en base 2 referida a 1 kHz (IEC 61260-1)
+    de una banda identificada por su frecuencia central. Para octava y tercio de
+    octava la nominal es sólo una etiqueta redondeada (por ejemplo 125 Hz en
+    tercios es 1000*2**(-9/3) = 125 Hz, pero 160 Hz es 1000*2**(-8/3) = 157.5 Hz)
+    y los extremos de las bandas se calculan a partir de la exacta, para que
+    bandas vecinas compartan el extremo. Para otras fracciones la frecuencia de
+    frecuencias_centrales ya es exacta.
+
+    Parametros
+    ----------
+    frecuencia: float
+        Frecuencia central nominal en Hz.
+    fraccion: int
+        Cantidad de bandas por octava.
+
+    Returns
+    -------
+    float con la frecuencia central exacta en Hz.
+    """
+    if fraccion not in (1, 3):
+        return frecuencia
+    return 1000*2**(round(fraccion*np.log2(frecuencia/1000))/fraccion)
+
+def bandas_fraccionales(fs, fraccion=1):
+    """
+    Devuelve los extremos de las bandas de 1/fraccion de octava hasta fs/2,
+    con el mismo criterio que diseño_banco_sos.
+
+    Returns
+    -------
+    tuple de tuplas (centerFrequency_Hz, lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz)
+    """
+    factor = np.power(2, 1.0/(2.0*fraccion))
+    bandas = []
+    for centerFrequency_Hz in frecuencias_centrales(fraccion):
+        lowerCutoffFrequency_Hz = frecuencia_exacta(centerFrequency_Hz, fraccion)/factor
+        upperCutoffFrequency_Hz = frecuencia_exacta(centerFrequency_Hz, fraccion)*factor
+        if lowerCutoffFrequency_Hz >= (fs/2):
+            break
+        if upperCutoffFrequency_Hz >= (fs/2):
+            upperCutoffFrequency_Hz = (fs/2)-1
+        bandas.append((centerFrequency_Hz, lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz))
+    return tuple(bandas)
+
+def longitud_fft(n):
+    """
+    Devuelve la menor longitud de FFT de la forma 2**k o 3*2**k que no es menor
+    que n. Usar sólo estas longitudes hace que las señales de largo parecido
+    compartan las máscaras de mascaras_fft, a costa de hasta un 50 % de relleno.
+    """
+    potencia = 1 << max(int(n) - 1, 0).bit_length()
+    return 3*potencia//4 if 3*potencia//4 >= n else potencia
+
+@lru_cache(maxsize=4)
+def mascaras_fft(fs, n_fft, fraccion=1, orden=4):
+    """
+    Calcula el módulo de la respuesta de todas las bandas en los bins de una
+    rFFT de n_fft puntos. Cada máscara es el módulo del prototipo analógico
+    Butterworth pasabanda de BancoFiltrosIEC, que cumple IEC 61260, sin la
+    distorsión de la transformación bilineal. En la banda cuyo extremo superior
+    se recorta en fs/2 el prototipo analógico no se anula en Nyquist, por lo que
+    se usa el módulo del filtro digital de BancoFiltrosIEC, que cae a cero en fs/2.
+    El resultado queda memoizado; conviene pedir n_fft de longitud_fft para que
+    las señales de largo parecido compartan las máscaras.
+
+    Returns
+    -------
+    Numpy array de solo lectura de shape (bandas, n_fft//2 + 1), con las bandas
+    de bandas_fraccionales(fs, fraccion).
+    """
+    f = fft.rfftfreq(n_fft, 1/fs)
+    f[0] = f[1]/2  # Evita la división por cero en continua
+    mascaras = []
+    for _, lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz in bandas_fraccionales(fs, fraccion):
+        if upperCutoffFrequency_Hz == (fs/2)-1:
+            sos = signal.iirfilter(orden, [lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz],
+                                   rs=60, btype='band', analog=False,
+                                   ftype='butter', fs=fs, output='sos')
+            mascaras.append(np.abs(signal.sosfreqz(sos, worN=f, fs=fs)[1]))
+            continue
+        # Butterworth pasabanda: |H|^2 = 1/(1 + ((f^2 - f0^2)/(f*B))^(2*orden))
+        x = (f**2 - lowerCutoffFrequency_Hz*upperCutoffFrequency_Hz)/(f*(upperCutoffFrequency_Hz - lowerCutoffFrequency_Hz))
+        mascaras.append(1/np.sqrt(1 + x**(2*orden)))
+    mascaras = np.array(mascaras)
+    mascaras[:, 0] = 0
+    mascaras.flags.writeable = False
+    return mascaras
+
+@lru_cache(maxsize=None)
+def diseño_banco_sos(fs, fraccion=1, orden=4):
+    """
+    Diseña las secciones de segundo orden (SOS) de todas las bandas una única vez
+    por (fs, fraccion, orden). El resultado queda memoizado.
+
+    Parametros
+    ----------
+    fs: int
+        Frecuencia de muestreo.
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+    orden: int
+        Orden del filtro Butterworth.
+
+    Returns
+    -------
+    tuple de tuplas (centerFrequency_Hz, lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz, sos)
+        centerFrequency_Hz es la frecuencia nominal y los extremos se calculan a partir
+        de la exacta (frecuencia_exacta). Sólo se incluyen las bandas cuyo extremo
+        inferior está por debajo de fs/2.
+    """
+    #Octava - G = 1.0/2.0 / 1/3 de Octava - G=1.0/6.0
+    G = 1.0/(2.0*fraccion)
+    factor = np.power(2, G)
+    bandas = []
+    for centerFrequency_Hz in frecuencias_nominales(fraccion):
+        #Calculo los extremos de la banda a partir de la frecuencia central exacta
+        lowerCutoffFrequency_Hz = frecuencia_exacta(centerFrequency_Hz, fraccion)/factor
+        upperCutoffFrequency_Hz = frecuencia_exacta(centerFrequency_Hz, fraccion)*factor
+        if lowerCutoffFrequency_Hz >= (fs/2):
+            break
+        if upperCutoffFrequency_Hz >= (fs/2):
+            upperCutoffFrequency_Hz = (fs/2)-1
+
+        sos = signal.iirfilter(orden, [lowerCutoffFrequency_Hz,upperCutoffFrequency_Hz],
+                                    rs=60, btype='band', analog=False,
+                                    ftype='butter', fs=fs, output='sos')
+        bandas.append((centerFrequency_Hz, lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz, sos))
+    return tuple(bandas)
+
+def respuesta_analogica(lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz, orden=4):
+    """
+    Calcula la respuesta en frecuencia del prototipo analógico Butterworth de una banda.
+
+    Returns
+    -------
+    tuple (h, w) con la respuesta y la frecuencia angular.
+    """
+    b,a = signal.iirfilter(orden, [2*np.pi*lowerCutoffFrequency_Hz,2*np.pi*upperCutoffFrequency_Hz],
+                                rs=60, btype='band', analog=True,
+                                ftype='butter')
+    w, h = signal.freqs(b,a)
+    return h, w
+
+class BancoFiltrosIEC:
+    """
+    Banco de filtros de octava o tercio de octava según IEC 61260.
+
+    El diseño de los filtros se obtiene de diseño_banco_sos, por lo que se calcula
+    una sola vez por (fs, fraccion, orden) aunque se creen varios bancos.
+
+    Parametros
+    ----------
+    fs: int
+        Frecuencia de muestreo.
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+    orden: int
+        Orden del filtro Butterworth. Por defecto 4.
+
+    Ejemplo
+    -------
+    import soundfile as sf
+
+    data, fs = sf.read('data/IR2/Mono.wav')
+    banco = BancoFiltrosIEC(fs)
+    bandas = banco.filtrar(data)   # shape (10, len(data))
+    """
+    def __init__(self, fs, fraccion=1, orden=4):
+        self.fs = fs
+        self.fraccion = fraccion
+        self.orden = orden
+        self.bandas = diseño_banco_sos(fs, fraccion, orden)
+
+    @property
+    def frecuencias(self):
+        """Frecuencias centrales de las bandas del banco."""
+        return [banda[0] for banda in self.bandas]
+
+    @instrumentar("BancoFiltrosIEC.filtrar")
+    def filtrar(self, data, dtype=None):
+        """
+        Filtra una señal por todas las bandas del banco.
+
+        Parametros
+        ----------
+        data: Numpy array
+            Señal de audio mono (muestras,) o multicanal (muestras, canales).
+        dtype: Tipo de dato de la salida. Por defecto el de la política de precisión.
+
+        Returns
+        -------
+        Numpy array de shape (bandas, muestras) o (bandas, muestras, canales)
+        con la señal filtrada en cada banda.
+        """
+        salida = np.empty((len(self.bandas),) + np.shape(data), dtype=precision(dtype))
+        for i, (centerFrequency_Hz, _, _, sos) in enumerate(self.bandas):
+            # Todos los canales en una sola llamada a sosfilt. Cada banda tiene sus
+            # propias secciones y sosfilt aplica una sola cascada, por lo que las
+            # bandas se recorren escribiendo en la salida preasignada. Los
+            # coeficientes y el estado se mantienen en float64: en float32 los
+            # polos de las bandas graves, muy cerca del círculo unitario, dan
+            # errores de hasta 2 %.
+            with medir("sosfilt", banda=centerFrequency_Hz):
+                salida[i] = signal.sosfilt(sos, data, axis=0)
+        return salida
+
+    def respuesta_analogica(self):
+        """
+        Calcula la respuesta en frecuencia del prototipo analógico de cada banda.
+
+        Returns
+        -------
+        list de tuplas (h, w) con la respuesta y la frecuencia angular de cada banda.
+        """
+        return [respuesta_analogica(banda[1], banda[2], self.orden) for banda in self.bandas]
+
+class BancoFiltrosMultitasa:
+    """
+    Banco de filtros de octava o tercio de octava con un árbol de diezmado por 2.
+    Cada banda se filtra con el mismo diseño Butterworth que BancoFiltrosIEC pero
+    a la menor frecuencia de muestreo fs/2**k en la que su extremo superior queda
+    por debajo de relacion*(fs/2**k)/2. Entre niveles la señal se diezma con un
+    FIR de media banda de fase lineal cuyo retardo se compensa, por lo que las
+    bandas quedan alineadas con la señal original.
+
+    Parametros
+    ----------
+    fs: int
+        Frecuencia de muestreo.
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+    orden: int
+        Orden del filtro Butterworth. Por defecto 4.
+    relacion: float
+        Fracción de la frecuencia de Nyquist de cada nivel que puede ocupar una banda.
+    taps: int
+        Coeficientes del FIR de media banda, de la forma 4*m+1.
+
+    Ejemplo
+    -------
+    import soundfile as sf
+
+    data, fs = sf.read('data/IR1/Mono.wav')
+    banco = BancoFiltrosMultitasa(fs)
+    bandas = banco.filtrar(data, interpolar=True)   # shape (10, len(data))
+    """
+    def __init__(self, fs, fraccion=1, orden=4, relacion=0.4, taps=61):
+        if taps % 4 != 1:
+            raise ValueError("taps debe ser de la forma 4*m+1")
+        self.fs = fs
+        self.fraccion = fraccion
+        self.orden = orden
+        self.media_banda = signal.firwin(taps, 0.5, window=('kaiser', 8.0))
+        self.retardo = (taps - 1)//4  # Retardo del FIR en muestras de salida
+
+        # Nivel del árbol en el que se filtra cada banda
+        self.bandas = []
+        for centerFrequency_Hz, lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz, _ in diseño_banco_sos(fs, fraccion, orden):
+            nivel = 0
+            while upperCutoffFrequency_Hz < relacion*fs/2**(nivel + 2):
+                nivel += 1
+            sos = dict((banda[0], banda[3]) for banda in diseño_banco_sos(fs/2**nivel, fraccion, orden))[centerFrequency_Hz]
+            self.bandas.append((centerFrequency_Hz, nivel, sos))
+        self.niveles = max(banda[1] for banda in self.bandas) + 1
+
+    @property
+    def frecuencias(self):
+        """Frecuencias centrales de las bandas del banco."""
+        return [banda[0] for banda in self.bandas]
+
+    def diezmar(self, data):
+        """Filtra con el FIR de media banda y diezma por 2, sin retardo."""
+        n = (len(data) + 1)//2
+        salida = signal.upfirdn(self.media_banda, data, down=2, axis=0)
+        return salida[self.retardo:self.retardo + n]
+
+    @staticmethod
+    def interpolar(data, factor, n):
+        """
+        Interpola una banda por un factor entero agregando ceros en su espectro y
+        recorta a n muestras. Las bandas ocupan sólo una parte de su frecuencia de
+        Nyquist, por lo que un único par rfft/irfft reemplaza a la cascada de
+        interpoladores por 2.
+        """
+        n_fft = fft.next_fast_len(len(data) + 64, real=True)
+        espectro = fft.rfft(data, n=n_fft, axis=0)
+        return factor*fft.irfft(espectro, n=factor*n_fft, axis=0)[:n]
+
+    @instrumentar("BancoFiltrosMultitasa.filtrar")
+    def filtrar(self, data, interpolar=False, dtype=None):
+        """
+        Filtra una señal por todas las bandas del banco.
+
+        Parametros
+        ----------
+        data: Numpy array
+            Señal de audio mono (muestras,) o multicanal (muestras, canales).
+        interpolar: bool
+            Si es True cada banda se vuelve a la frecuencia de muestreo original.
+        dtype: Tipo de dato de la salida. Por defecto el de la política de precisión.
+
+        Returns
+        -------
+        Si interpolar es True, Numpy array (bandas, muestras[, canales]) como BancoFiltrosIEC.filtrar.
+        Si no, lista de tuplas (centerFrequency_Hz, señal filtrada, frecuencia de muestreo de la banda).
+        """
+        dtype = precision(dtype)
+        resultado = [None]*len(self.bandas)
+        nivel_data = data
+        for nivel in range(self.niveles):
+            if nivel > 0:
+                with medir("diezmar", nivel=nivel):
+                    nivel_data = self.diezmar(nivel_data)
+            for i, (centerFrequency_Hz, nivel_banda, sos) in enumerate(self.bandas):
+                if nivel_banda == nivel:
+                    with medir("sosfilt", banda=centerFrequency_Hz):
+                        resultado[i] = signal.sosfilt(sos, nivel_data, axis=0).astype(dtype, copy=False)
+
+        if not interpolar:
+            return [(banda[0], filtrada, self.fs/2**banda[1]) for banda, filtrada in zip(self.bandas, resultado)]
+
+        salida = np.empty((len(self.bandas),) + np.shape(data), dtype=dtype)
+        for i, ((centerFrequency_Hz, nivel, _), filtrada) in enumerate(zip(self.bandas, resultado)):
+            with medir("interpolar", banda=centerFrequency_Hz):
+                salida[i] = filtrada if nivel == 0 else self.interpolar(filtrada, 2**nivel, len(data))
+        return salida
+
+class BancoFiltrosFFT:
+    """
+    Banco de filtros de fase cero de 1/fraccion de octava calculado en frecuencia.
+    La señal se transforma una sola vez con una rFFT, se multiplica por las
+    máscaras de todas las bandas (ver mascaras_fft) y las bandas se recuperan con
+    una única irfft sobre el eje de bandas. No hay retardo de grupo, por lo que
+    es adecuado para el análisis fuera de línea de RI, no para tiempo real.
+
+    Parametros
+    ----------
+    fs: int
+        Frecuencia de muestreo.
+    fraccion: int
+        Cantidad de bandas por octava (1, 3 o cualquier 1/N de octava).
+    orden: int
+        Orden del prototipo Butterworth de las máscaras. Por defecto 4.
+    relleno: int
+        Muestras de ceros que se agregan antes de la FFT para que la respuesta de
+        las bandas graves no se solape circularmente. Por defecto se usan cuatro
+        veces la inversa del ancho de la banda más angosta.
+    workers: int
+        Hilos usados por scipy.fft.
+
+    Ejemplo
+    -------
+    import soundfile as sf
+
+    data, fs = sf.read('data/IR2/Mono.wav')
+    banco = BancoFiltrosFFT(fs, fraccion=3)
+    bandas = banco.filtrar(data)   # shape (30, len(data)) a 44.1 kHz
+    """
+    def __init__(self, fs, fraccion=1, orden=4, relleno=None, workers=None):
+        self.fs = fs
+        self.fraccion = fraccion
+        self.orden = orden
+        self.workers = workers
+        self.bandas = bandas_fraccionales(fs, fraccion)
+        if relleno is None:
+            ancho_min = min(banda[2] - banda[1] for banda in self.bandas)
+            relleno = int(np.ceil(4*fs/ancho_min))
+        self.relleno = relleno
+
+    @property
+    def frecuencias(self):
+        """Frecuencias centrales de las bandas del banco."""
+        return [banda[0] for banda in self.bandas]
+
+    @instrumentar("BancoFiltrosFFT.filtrar")
+    def filtrar(self, data, dtype=None):
+        """
+        Filtra una señal por todas las bandas del banco.
+
+        Parametros
+        ----------
+        data: Numpy array
+            Señal de audio mono (muestras,) o multicanal (muestras, canales).
+        dtype: Tipo de dato de la salida. Por defecto el de la política de precisión.
+
+        Returns
+        -------
+        Numpy array de shape (bandas, muestras) o (bandas, muestras, canales)
+        con la señal filtrada en cada banda.
+        """
+        dtype = precision(dtype)
+        data = np.asarray(data, dtype=dtype)
+        n = len(data)
+        n_fft = longitud_fft(n + self.relleno)
+        # En float32 la FFT se calcula en simple precisión (complex64)
+        mascaras = mascaras_fft(self.fs, n_fft, self.fraccion, self.orden).astype(dtype, copy=False)
+        with medir("rfft"):
+            espectro = fft.rfft(data, n=n_fft, axis=0, workers=self.workers)
+        # Se agregan ejes para que las máscaras se apliquen a todos los canales
+        mascaras = mascaras.reshape(mascaras.shape + (1,)*(np.ndim(data) - 1))
+        with medir("irfft"):
+            salida = fft.irfft(mascaras*espectro, n=n_fft, axis=1, workers=self.workers)[:, :n]
+        return salida.astype(dtype, copy=False)
+
+    def respuesta_analogica(self):
+        """
+        Calcula la respuesta en frecuencia del prototipo analógico de cada banda,
+        cuyo módulo es el de las máscaras salvo en la banda recortada en fs/2
+        (ver mascaras_fft).
+
+        Returns
+        -------
+        list de tuplas (h, w) con la respuesta y la frecuencia angular de cada banda.
+        """
+        return [respuesta_analogica(banda[1], banda[2], self.orden) for banda in self.bandas]
+
 ## Función filtros norma IEC 61260
-def filtro_IEC(archivo):
+@instrumentar()
+def filtro_IEC(archivo, fs=None, fraccion=1, orden=4, guardar_wav=True, respuesta=False, metodo="iir"):
     """
     Filtra una señal en bandas de octava.
 
     Parametros
     ----------
-    archivo: Archivo .wav
-        Datos del audio.
+    archivo: Archivo .wav, FuenteAudio o Numpy array
+        Datos del audio, mono o multicanal (muestras, canales). Si es un Numpy array se debe indicar fs.
+    fs: int
+        Frecuencia de muestreo, sólo necesaria si archivo es un Numpy array.
+    fraccion: int
+        1 para bandas de octava, 3 para bandas de tercio de octava.
+    orden: int
+        Orden del filtro Butterworth. Por defecto 4.
+    guardar_wav: bool
+        Si es True se escribe un archivo "Frecuencia X.wav" por banda.
+    respuesta: bool
+        Si es True se calcula la respuesta en frecuencia analógica de cada banda.
+    metodo: str
+        "iir" filtra cada banda con BancoFiltrosIEC. "fft" calcula todas las
+        bandas con fase cero a partir de una única FFT (BancoFiltrosFFT).
        
     Returns
     -------
@@ -144,50 +869,44 @@ def filtro_IEC(archivo):
         Genera una lista para cada banda de octava con los siguientes datos: [centerFrequency_Hz, filt, h, w]
         centerFrequency_Hz: frecuencia central de labanda de octava.
         filt: Señal filtrada
-        h: frecuencia angular
-        w: respuesta en frecuencia
+        h: frecuencia angular (None si respuesta es False)
+        w: respuesta en frecuencia (None si respuesta es False)
     """
+    if isinstance(archivo, np.ndarray):
+        if fs is None:
+            raise ValueError("Se debe indicar fs cuando archivo es un Numpy array")
+        audiodata = archivo
+    else:
+        # Se comparte la lectura (de solo lectura) con las demás etapas que abran el archivo
+        fuente = abrir_audio(archivo)
+        audiodata, fs = fuente.datos(), fuente.fs
 
-    audiodata, fs = sf.read(archivo)
-    lista_filtros = []
-    nominal_frec = [31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000]
-    for i in range(len(nominal_frec)):
-        #Octava - G = 1.0/2.0 / 1/3 de Octava - G=1.0/6.0
-        G = 1.0/2.0
-        factor = np.power(2, G)
-        centerFrequency_Hz = nominal_frec[i]
-
-        #Calculo los extremos de la banda a partir de la frecuencia central
-        lowerCutoffFrequency_Hz = centerFrequency_Hz/factor;
-        upperCutoffFrequency_Hz = centerFrequency_Hz*factor;
-        if upperCutoffFrequency_Hz >= (fs/2):
-            upperCutoffFrequency_Hz = (fs/2)-1
-            
-        
-        # Extraemos los coeficientes del filtro 
-        b,a = signal.iirfilter(4, [2*np.pi*lowerCutoffFrequency_Hz,2*np.pi*upperCutoffFrequency_Hz],
-                                    rs=60, btype='band', analog=True,
-                                    ftype='butter') 
-
-        # para aplicar el filtro es más óptimo
-        sos = signal.iirfilter(4, [lowerCutoffFrequency_Hz,upperCutoffFrequency_Hz],
-                                    rs=60, btype='band', analog=False,
-                                    ftype='butter', fs=fs, output='sos') 
-        w, h = signal.freqs(b,a)
+    if metodo == "iir":
+        banco = BancoFiltrosIEC(fs, fraccion, orden)
+    elif metodo == "fft":
+        banco = BancoFiltrosFFT(fs, fraccion, orden)
+    else:
+        raise ValueError("metodo debe ser 'iir' o 'fft'")
+    filtradas = banco.filtrar(audiodata)
+    if respuesta:
+        respuestas = banco.respuesta_analogica()
+    else:
+        respuestas = [(None, None)] * len(banco.bandas)
 
-        # aplicando filtro al audio
-        filt = signal.sosfilt(sos, audiodata)
-        
-        list = [centerFrequency_Hz, filt, h, w]
-        lista_filtros.append(list)
-        sf.write("Frecuencia {}.wav".format(lista_filtros[i][0]), lista_filtros[i][1], fs)
-        print('Frecuencia de corte inferior: ', round(lowerCutoffFrequency_Hz), 'Hz')
-        print('Frecuencia central: ', centerFrequency_Hz, 'Hz')
-        print('Frecuencia de corte superior: ', round(upperCutoffFrequency_Hz), 'Hz')
+    lista_filtros = []
+    for i, (centerFrequency_Hz, lowerCutoffFrequency_Hz, upperCutoffFrequency_Hz, *_) in enumerate(banco.bandas):
+        h, w = respuestas[i]
+        lista_filtros.append([centerFrequency_Hz, filtradas[i], h, w])
+        if guardar_wav:
+            sf.write("Frecuencia {}.wav".format(centerFrequency_Hz), filtradas[i], fs)
+        logger.debug("Frecuencia de corte inferior: %d Hz", round(lowerCutoffFrequency_Hz))
+        logger.debug("Frecuencia central: %s Hz", centerFrequency_Hz)
+        logger.debug("Frecuencia de corte superior: %d Hz", round(upperCutoffFrequency_Hz))
         
     return(lista_filtros)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     files_names, wav_files = select_files()
     
     # Bandas de Octava según IEC 61260
@@ -205,13 +924,13 @@ if __name__ == "__main__":
 
     def ri_rec():
         rec_sine_sweep = "record_SineSweepLog.wav"
-        invfilter = "InvFilter.wav"
-        respuesta_impulso(rec_sine_sweep, invfilter)
+        # Parámetros del sweep de generacion_adquisicion (SineSweepLog.wav / InvFilter.wav)
+        respuesta_impulso(rec_sine_sweep, (20, 4000, 10, 44100))
         data, fs = sf.read("impulso.wav")
         graph_name = "Impulso test"
         time_domain_plot(data, fs, graph_name)
     
-    file = 'data\IR2\Mono.wav'
+    file = 'data/IR2/Mono.wav'
     def fil_iec():
         data, fs = read_wav(file)
         data_log = esc_log(data, 20)
@@ -1,15 +1,73 @@
 import numpy as np
 from matplotlib import pyplot as plt
 import pandas as pd
-from scipy import signal as s
+from scipy import fft
 import soundfile as sf
-from funciones import read_wav
+from funciones import modo_precision, read_wav, precision
 from funciones import time_domain_plot
 from funciones import esc_log
+from telemetria import instrumentar
 from tkinter import *
+from functools import partial
+import contextvars
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Función promedio móvil
+@instrumentar()
+def media_movil(x, w_size, dtype=None, out=None):
+    '''
+    Calcula el promedio móvil de un array en O(N) a partir de su suma acumulada.
+    Las últimas w_size-1 muestras repiten el último valor promediado, de modo que
+    la salida tiene la misma longitud que la entrada.
+
+    Parametros
+    ----------
+    x: Numpy array
+        Señal mono (muestras,) o multicanal (muestras, canales); se promedia a lo largo del eje 0.
+
+    w_size: Tamaño de la ventana de muestreo.
+
+    dtype: Tipo de dato de la salida (np.float64 o np.float32). Por defecto el de la
+        política de precisión (ver funciones.fijar_precision).
+        La suma acumulada se calcula siempre en float64.
+
+    out: Numpy array opcional de igual longitud que x donde se escribe el resultado.
+        Puede ser el mismo array x para trabajar "in-place".
+
+    return: Numpy array con el promedio móvil.
+
+    Ejemplo
+    -------
+    import numpy as np
+
+    x = np.abs(np.random.randn(44100))
+    media_movil(x, 1000, dtype=np.float32)
+    '''
+    n = len(x)
+    if w_size < 1 or w_size > n:
+        raise ValueError("w_size debe estar entre 1 y la longitud de la señal")
+
+    # Suma acumulada con un cero inicial: sum(x[i:i+w]) = c[i+w] - c[i]
+    c = np.empty((n + 1,) + np.shape(x)[1:], dtype=np.float64)
+    c[0] = 0
+    np.cumsum(x, axis=0, dtype=np.float64, out=c[1:])
+    n_win = n - (w_size - 1)
+    medias = c[w_size:] - c[:n_win]
+    medias /= w_size
+
+    if out is None:
+        out = np.empty(np.shape(x), dtype=precision(dtype))
+    out[:n_win] = medias
+    out[n_win:] = medias[-1]  # Relleno con el último valor promediado
+    return out
 
 # Función suavizado de señal
-def suavizado_señal(signal, w_size):
+@instrumentar()
+def suavizado_señal(signal, w_size, dtype=None, out=None):
     '''
     Calcula la señal analítica de una señal y su transformada de Hilbert y
     Calcula el promedio en un rango de valores de la señal original dado por w_size y los almacena en un array.
@@ -17,8 +75,15 @@ def suavizado_señal(signal, w_size):
     Parametros
     ----------
     signal: Numpy array
+        Señal mono (muestras,) o multicanal (muestras, canales).
 
     w_size: Tamaño de la ventana de muestreo.
+
+    dtype: Tipo de dato de la salida (np.float64 o np.float32). Por defecto el de la
+        política de precisión. En float32 la FFT de la señal analítica también se
+        calcula en simple precisión.
+
+    out: Numpy array opcional donde se escribe la señal suavizada.
            
     return: Numpy array con la señal suavizada.
 
@@ -32,30 +97,248 @@ def suavizado_señal(signal, w_size):
     suavizado_señal(signal, w_size)
     
     '''
-    analytic_signal = s.hilbert(signal) 
-    amplitude_envelope = np.abs(analytic_signal)
+    dtype = precision(dtype)
+    amplitude_envelope = np.abs(señal_analitica(np.asarray(signal, dtype=dtype)))
     
-    signal_win = [] # Inicio una lista donde se van a almacenar los promedios móviles
+    # Promedio móvil por suma acumulada; la envolvente se reutiliza como salida
+    if out is None:
+        out = amplitude_envelope
+    return media_movil(amplitude_envelope, w_size, dtype=dtype, out=out)
 
-    for i in range(len(amplitude_envelope)-(w_size-1)): # Ciclo for con rango hasta el ancho de la ventana
-        w_i = amplitude_envelope[i : i + w_size]    # Ventana que itera en cada ciclo
-        w_mean = np.mean(w_i)   # Calculo el promedio
-        signal_win.append(w_mean)   # Agrego el promedio a la lista signal_win
-    
-    for i in range(w_size-1):   # Ciclo para que shape(signal)=shape(signal_win) agregando el último valor promediado
-        signal_win.append(signal_win[-1])
-       
-    return(np.array(signal_win))
+@instrumentar()
+def señal_analitica(signal):
+    '''
+    Señal analítica a lo largo del eje 0, como scipy.signal.hilbert pero a partir
+    de una rFFT y conservando la precisión de la entrada (float32 da complex64).
+    La FFT es de len(signal) puntos, sin relleno con ceros, para que la envolvente
+    sea la misma que la de scipy.signal.hilbert.
+    '''
+    n = len(signal)
+    espectro = fft.rfft(signal, axis=0)
+    # Frecuencias positivas duplicadas, continua y Nyquist sin cambios
+    espectro[1:(n + 1)//2] *= 2
+    completo = np.zeros((n,) + espectro.shape[1:], dtype=espectro.dtype)
+    completo[:len(espectro)] = espectro
+    return fft.ifft(completo, axis=0, overwrite_x=True)
+
+# Procesamiento multitasa por banda
+def factor_diezmado(frecuencia, fs, fraccion=1, sobremuestreo=8):
+    """
+    Calcula el factor de diezmado de la energía de una banda para que la nueva
+    frecuencia de muestreo sea proporcional a su ancho de banda.
+
+    Parametros
+    ----------
+    frecuencia: float
+        Frecuencia central de la banda.
+    fs: int
+        Frecuencia de muestreo original.
+    fraccion: int
+        1 para bandas de octava, 3 para tercio de octava.
+    sobremuestreo: float
+        Relación entre la nueva frecuencia de muestreo y el ancho de banda.
+
+    return: int, factor de diezmado (1 si no conviene diezmar).
+
+    Ejemplo
+    -------
+    factor_diezmado(31.5, 44100)   # 247: la banda de 31.5 Hz se procesa a ~178 Hz
+    """
+    G = 1.0/(2.0*fraccion)
+    ancho_banda = frecuencia*(np.power(2, G) - np.power(2, -G))
+    return max(int(fs/(sobremuestreo*ancho_banda)), 1)
+
+def energia_diezmada(signal, factor):
+    """
+    Suma la energía de la señal en bloques de factor muestras. La integral de
+    Schroeder de la energía diezmada coincide con la original en el comienzo de cada bloque.
+
+    Parametros
+    ----------
+    signal: Numpy array
+        Señal mono (muestras,) o multicanal (muestras, canales).
+    factor: int
+        Factor de diezmado.
+
+    return: Numpy array con len(signal)//factor bloques (se descarta el resto).
+    """
+    bloques = len(signal)//factor
+    energia = np.power(signal[:bloques*factor], 2)
+    return energia.reshape((bloques, factor) + np.shape(signal)[1:]).sum(axis=1)
+
+@instrumentar()
+def suavizado_multitasa(signal, w_size, factor, dtype=None):
+    """
+    Envolvente suavizada a la frecuencia de muestreo reducida fs/factor, sin
+    transformada de Hilbert sobre la señal completa: la envolvente se obtiene del
+    valor eficaz de cada bloque (multiplicado por raíz de 2 para igualar la amplitud
+    de la envolvente de Hilbert) y luego se aplica el promedio móvil.
+
+    Parametros
+    ----------
+    signal: Numpy array
+        Señal de una banda, mono o multicanal.
+    w_size: int
+        Tamaño de la ventana de muestreo a la frecuencia original.
+    factor: int
+        Factor de diezmado, por ejemplo el de factor_diezmado.
+
+    return: Numpy array con la envolvente suavizada a fs/factor.
+    """
+    dtype = precision(dtype)
+    envolvente = np.sqrt(2*energia_diezmada(signal, factor)/factor).astype(dtype, copy=False)
+    return media_movil(envolvente, max(w_size//factor, 1), dtype=dtype, out=envolvente)
+
+# Estimación automática del límite de integración (Lundeby)
+@dataclass
+class ResultadoLundeby:
+    """
+    Resultado del método de Lundeby para un canal.
+
+    Atributos
+    ---------
+    cruce: int
+        Muestra donde la recta de decaimiento corta el nivel de ruido.
+    ruido_db: float
+        Nivel de ruido de fondo en dB relativo al máximo de la envolvente.
+    pendiente: float
+        Pendiente de la recta de decaimiento en dB por muestra.
+    ordenada: float
+        Ordenada de la recta de decaimiento en dB.
+    referencia: float
+        Energía por muestra correspondiente a 0 dB.
+    """
+    cruce: int
+    ruido_db: float
+    pendiente: float
+    ordenada: float
+    referencia: float
+
+    def compensacion(self, corte):
+        """
+        Energía que la recta de decaimiento aporta después de la muestra corte,
+        que se suma a la integral de Schroeder para compensar el truncamiento.
+        """
+        if self.pendiente >= 0:
+            return 0.0
+        nivel = self.ordenada + self.pendiente*corte
+        return self.referencia * 10**(nivel/10) * (-10/(self.pendiente*np.log(10)))
+
+def _envolvente_db(energia, n):
+    # Promedio de la energía en intervalos de n muestras (envolvente diezmada)
+    bloques = len(energia)//n
+    envolvente = energia[:bloques*n].reshape(bloques, n).mean(axis=1)
+    centros = (np.arange(bloques) + 0.5)*n
+    return envolvente, centros
+
+@instrumentar()
+def lundeby(signal, fs=44100, intervalo=0.03, intervalos_10dB=5, max_iter=5, es_energia=False):
+    """
+    Estima el punto de cruce entre el decaimiento y el ruido de fondo de una RI
+    con el método iterativo de Lundeby, trabajando sobre la envolvente diezmada.
+
+    Parametros
+    ----------
+    signal: Numpy array
+        RI mono.
+    fs: int
+        Frecuencia de muestreo.
+    intervalo: float
+        Duración en segundos de los intervalos de la primera envolvente. Por defecto 30 ms.
+    intervalos_10dB: int
+        Intervalos por cada 10 dB de decaimiento en las iteraciones siguientes.
+    max_iter: int
+        Máxima cantidad de iteraciones.
+    es_energia: bool
+        Si es True signal ya es la energía (la RI al cuadrado), por ejemplo diezmada.
+
+    Returns
+    -------
+    ResultadoLundeby con el punto de cruce, el nivel de ruido y la recta de decaimiento.
+
+    Ejemplo
+    -------
+    import soundfile as sf
+
+    data, fs = sf.read('data/IR2/Mono.wav')
+    lundeby(data, fs).cruce / fs   # límite de integración en segundos
+    """
+    energia = signal if es_energia else np.power(signal, 2)
+    n_total = len(energia)
+    n = max(min(int(intervalo*fs), n_total//10), 1)
+    envolvente, centros = _envolvente_db(energia, n)
+    referencia = np.max(envolvente)
+    with np.errstate(divide='ignore'):
+        env_db = 10*np.log10(envolvente/referencia)
+        # Ruido de fondo estimado con el último 10 % de la señal
+        ruido_db = 10*np.log10(np.mean(energia[-max(n_total//10, 1):])/referencia)
+
+    # Primera recta: desde el máximo hasta 10 dB por encima del ruido
+    i_max = int(np.argmax(env_db))
+    debajo = np.nonzero(env_db[i_max:] < ruido_db + 10)[0]
+    fin = i_max + (debajo[0] if len(debajo) else len(env_db) - i_max)
+    tramo = np.arange(i_max, fin)
+    tramo = tramo[np.isfinite(env_db[tramo])]
+    if len(tramo) < 2:
+        return ResultadoLundeby(n_total, ruido_db, 0.0, 0.0, referencia)
+    pendiente, ordenada = np.polyfit(centros[tramo], env_db[tramo], 1)
+
+    cruce = n_total
+    for _ in range(max_iter):
+        if pendiente >= 0:
+            break
+        cruce_nuevo = int(np.clip(np.nan_to_num((ruido_db - ordenada)/pendiente, posinf=n_total), 0, n_total))
+
+        # Nueva envolvente con intervalos_10dB intervalos cada 10 dB de decaimiento
+        n = int(np.clip(-10/(pendiente*intervalos_10dB), 1, max(n_total//10, 1)))
+        envolvente, centros = _envolvente_db(energia, n)
+        with np.errstate(divide='ignore'):
+            env_db = 10*np.log10(envolvente/referencia)
+
+        # Ruido desde 5 dB por debajo del cruce, tomando al menos el último 10 %
+        inicio_ruido = min(cruce_nuevo + int(-5/pendiente), n_total - max(n_total//10, 1))
+        with np.errstate(divide='ignore'):
+            ruido_db = 10*np.log10(np.mean(energia[inicio_ruido:])/referencia)
+
+        # Recta en el rango dinámico de 5 a 25 dB por encima del ruido
+        i_max = int(np.argmax(env_db))
+        tramo = np.nonzero((env_db[i_max:] <= ruido_db + 25) & (env_db[i_max:] >= ruido_db + 5))[0] + i_max
+        tramo = tramo[np.isfinite(env_db[tramo])]
+        if len(tramo) < 2:
+            cruce = cruce_nuevo
+            break
+        pendiente, ordenada = np.polyfit(centros[tramo], env_db[tramo], 1)
+        convergencia = abs(cruce_nuevo - cruce) < n
+        cruce = cruce_nuevo
+        if convergencia:
+            break
+
+    if pendiente < 0:
+        cruce = int(np.clip(np.nan_to_num((ruido_db - ordenada)/pendiente, posinf=n_total), 1, n_total))
+    return ResultadoLundeby(cruce, ruido_db, pendiente, ordenada, referencia)
 
 # Función integral de Schroeder
-def schroeder(signal, lim=3):
+@instrumentar()
+def schroeder(signal, lim=3, fs=44100, compensacion=False, es_energia=False):
     """
-    Calcula la integral de Schroeder de una RI.
+    Calcula la integral de Schroeder de una RI en dB, con una sola suma acumulada.
      Parametros
     ----------
-    signal:
+    signal: Numpy array
+        RI mono (muestras,) o multicanal (muestras, canales).
+
+    lim: Límite de integración en segundos. Si es None se estima para cada canal
+        con el método de Lundeby; la curva de cada canal se extiende hasta el cruce
+        más tardío y en los canales con un cruce anterior las muestras posteriores
+        a su cruce quedan en -inf dB (también con compensacion).
+
+    fs: Frecuencia de muestreo. Por defecto 44100.
+
+    compensacion: Si es True se suma la energía que el decaimiento estimado por
+        Lundeby tendría después del límite de integración.
 
-    lim:
+    es_energia: Si es True signal ya es la energía (la RI al cuadrado), por ejemplo
+        sumada por bloques con energia_diezmada.
 
     Ejemplo
     -------
@@ -65,12 +348,36 @@ def schroeder(signal, lim=3):
     
     signal, fs = sf.read('impulso_aula2.wav')
     lim = int(len(signal)/fs)
-    schroeder(signal, lim)
+    schroeder(signal, lim, fs)
+    schroeder(signal, None, fs, compensacion=True)
     """
-    cut_lim = lim*44100
-    E = (10*np.log10(np.cumsum(np.power(signal[cut_lim::-1],2))/np.sum(np.power(signal[:cut_lim],2))))[::-1]
-    #E = np.cumsum(np.power(signal[150000::-1],2))[::-1]
-    return(E)
+    energia = signal if es_energia else np.power(signal, 2)
+    canales = energia if energia.ndim == 2 else energia[:, None]
+    n_canales = canales.shape[1]
+    estimaciones = []
+    if lim is None or compensacion:
+        estimaciones = [lundeby(canales[:, c], fs, es_energia=True) for c in range(n_canales)]
+
+    if lim is None:
+        cortes = np.array([min(estimacion.cruce, len(energia) - 1) for estimacion in estimaciones])
+    else:
+        cortes = np.full(n_canales, min(int(lim*fs), len(energia) - 1))
+    cut_lim = int(np.max(cortes))
+
+    # Energía a partir de cada muestra hasta el corte de cada canal, acumulada en float64
+    E = np.cumsum(canales[cut_lim::-1], axis=0, dtype=np.float64)[::-1]
+    for c in range(n_canales):
+        if cortes[c] < cut_lim:
+            # Se descarta la energía posterior al corte propio del canal
+            E[:cortes[c] + 1, c] -= E[cortes[c] + 1, c]
+            E[cortes[c] + 1:, c] = 0
+    if compensacion:
+        for c, (estimacion, corte) in enumerate(zip(estimaciones, cortes)):
+            E[:corte + 1, c] += estimacion.compensacion(corte)
+    with np.errstate(divide='ignore'):
+        E = 10*np.log10(E/E[0])
+    E = E.astype(precision(), copy=False)
+    return E if energia.ndim == 2 else E[:, 0]
 
 # Función regresión lineal por mínimos cuadrados
 def regresion_lineal(X, y):
@@ -113,13 +420,167 @@ def regresion_lineal(X, y):
     # Cálculo de los coeficientes de la regresión
     m = np.sum(XY_dev) / np.sum(X_dev_sq)
     b = y_mean - m * X_mean
-    print(m/60,"Pendiente = ", m, "Intersección = ", b)
+    logger.debug("Pendiente = %s Intersección = %s", m, b)
     # Crea la función de regresión lineal
     #def regression_function(x):
      #   return m * x + b
     
     return(m, b)
 
+# Índice de curvas de decaimiento monótonas
+class IndiceDecaimiento:
+    """
+    Búsqueda binaria de niveles en curvas de decaimiento. Al construirlo las
+    curvas se fuerzan a ser no crecientes (una sola pasada) y luego cada nivel
+    en dB se ubica en O(log N) con np.searchsorted en cada curva.
+
+    Parametros
+    ----------
+    curvas: Numpy array
+        Curvas de decaimiento en dB con el tiempo en el eje 0, shape (muestras, ...).
+
+    Ejemplo
+    -------
+    indice = IndiceDecaimiento(schroeder(data, None, fs))
+    indice.indice([-5, -15, -25, -35])        # índices más cercanos a cada nivel
+    indice.cruce(-10, interpolar=True) / fs   # instante de cruce con resolución sub-muestra
+    """
+    def __init__(self, curvas):
+        self.curvas = np.minimum.accumulate(np.asarray(curvas, dtype=np.float64), axis=0)
+        self.n_muestras = len(self.curvas)
+        # Curvas negadas (crecientes) como columnas para np.searchsorted
+        self._columnas = -self.curvas.reshape(self.n_muestras, -1).T
+
+    def _primero_debajo(self, nivel):
+        # Primer índice con curva <= nivel (n_muestras si no hay ninguno)
+        niveles = -np.ravel(nivel)
+        indices = np.stack([np.searchsorted(columna, niveles, side='left') for columna in self._columnas], axis=-1)
+        return indices.reshape(np.shape(nivel) + self.curvas.shape[1:])
+
+    def _valor(self, indices):
+        curvas = self.curvas if np.ndim(indices) == self.curvas.ndim - 1 else np.broadcast_to(self.curvas[:, None], (self.n_muestras,) + np.shape(indices))
+        return np.take_along_axis(curvas, np.asarray(indices)[None], axis=0)[0]
+
+    def indice(self, nivel_dB):
+        """
+        Índice de la muestra más cercana a nivel_dB en cada curva (equivale a
+        valor_cercano para curvas monótonas). nivel_dB puede ser un escalar o una lista de niveles.
+        """
+        nivel = np.asarray(nivel_dB, dtype=np.float64)
+        i = np.minimum(self._primero_debajo(nivel), self.n_muestras - 1)
+        anterior = np.maximum(i - 1, 0)
+        nivel_b = np.reshape(nivel, np.shape(nivel) + (1,)*(self.curvas.ndim - 1))
+        mas_cerca_anterior = np.abs(self._valor(anterior) - nivel_b) <= np.abs(self._valor(i) - nivel_b)
+        return np.where(mas_cerca_anterior, anterior, i)
+
+    def cruce(self, nivel_dB, interpolar=False):
+        """
+        Posición donde cada curva cruza nivel_dB (primer índice con curva <= nivel).
+        Con interpolar=True se devuelve una posición fraccionaria interpolando
+        linealmente entre las muestras vecinas. Si la curva no llega al nivel se
+        devuelve n_muestras.
+        """
+        nivel = np.asarray(nivel_dB, dtype=np.float64)
+        i = self._primero_debajo(nivel)
+        if not interpolar:
+            return i
+        nivel_b = np.reshape(nivel, np.shape(nivel) + (1,)*(self.curvas.ndim - 1))
+        anterior = np.clip(i - 1, 0, self.n_muestras - 1)
+        actual = np.minimum(i, self.n_muestras - 1)
+        y0 = self._valor(anterior)
+        y1 = self._valor(actual)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraccion = np.where((y0 > y1) & np.isfinite(y1), (y0 - nivel_b)/(y0 - y1), 1.0)
+        return np.where((i > 0) & (i < self.n_muestras), anterior + fraccion, i).astype(np.float64)
+
+# Ajuste de rectas de decaimiento con sumas acumuladas
+class AjusteDecaimiento:
+    """
+    Permite calcular la recta de mínimos cuadrados de cualquier tramo de una o
+    varias curvas de decaimiento en O(1), a partir de sumas acumuladas de y y n·y
+    calculadas una sola vez (las sumas de n y n² de un tramo tienen forma cerrada).
+
+    Parametros
+    ----------
+    curvas: Numpy array
+        Curvas de decaimiento en dB con el tiempo en el eje 0, shape (muestras, ...).
+        Los ejes restantes pueden ser RI, bandas, canales, etc.
+    fs: int
+        Frecuencia de muestreo.
+
+    Ejemplo
+    -------
+    E = schroeder(data, None, fs)
+    ajuste = AjusteDecaimiento(E, fs)
+    m, b, inicio, fin = ajuste.ajuste_dB(-5, -35)   # T30
+    ajuste.tiempo_reverberacion(-5, -65)            # T60 directo, si el rango dinámico alcanza
+    """
+    def __init__(self, curvas, fs=44100):
+        self.curvas = np.asarray(curvas)
+        self.indice = IndiceDecaimiento(self.curvas)
+        n_muestras = len(self.curvas)
+        # Mismo eje temporal que np.linspace(0, n_muestras/fs, n_muestras)
+        self.paso = (n_muestras/fs)/max(n_muestras - 1, 1)
+        y = np.where(np.isfinite(self.curvas), self.curvas, 0)
+        n = np.arange(n_muestras, dtype=np.float64).reshape((-1,) + (1,)*(y.ndim - 1))
+        self._suma_y = np.zeros((n_muestras + 1,) + y.shape[1:])
+        self._suma_ny = np.zeros((n_muestras + 1,) + y.shape[1:])
+        np.cumsum(y, axis=0, dtype=np.float64, out=self._suma_y[1:])
+        np.cumsum(n*y, axis=0, out=self._suma_ny[1:])
+
+    def _tomar(self, suma, indices):
+        indices = np.broadcast_to(indices, suma.shape[1:])
+        return np.take_along_axis(suma, indices[None], axis=0)[0]
+
+    def ajuste(self, inicio, fin):
+        """
+        Recta de mínimos cuadrados del tramo [inicio, fin) de cada curva.
+
+        Parametros
+        ----------
+        inicio, fin: int o Numpy array
+            Índices del tramo, escalares o con la forma de los ejes de las curvas.
+
+        Returns
+        -------
+        (m, b): pendiente en dB/s y ordenada en dB de cada curva.
+        """
+        inicio = np.asarray(inicio)
+        fin = np.asarray(fin)
+        cantidad = (fin - inicio).astype(np.float64)
+        suma_y = self._tomar(self._suma_y, fin) - self._tomar(self._suma_y, inicio)
+        suma_ny = self._tomar(self._suma_ny, fin) - self._tomar(self._suma_ny, inicio)
+        n_media = (inicio + fin - 1)/2
+        y_media = suma_y/cantidad
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Covarianza y varianza de n en el tramo (la varianza de enteros consecutivos es exacta)
+            pendiente_n = (suma_ny - n_media*suma_y)/(cantidad*(cantidad**2 - 1)/12)
+        m = pendiente_n/self.paso
+        b = y_media - m*n_media*self.paso
+        return m, b
+
+    def indice_nivel(self, nivel_dB):
+        """Índice de la muestra de cada curva más cercana a nivel_dB."""
+        return self.indice.indice(nivel_dB)
+
+    def ajuste_dB(self, inicio_dB, fin_dB):
+        """
+        Recta de mínimos cuadrados del tramo entre dos niveles en dB.
+
+        Returns
+        -------
+        (m, b, inicio, fin): recta e índices del tramo de cada curva.
+        """
+        inicio = self.indice_nivel(inicio_dB)
+        fin = self.indice_nivel(fin_dB)
+        m, b = self.ajuste(inicio, fin)
+        return m, b, inicio, fin
+
+    def tiempo_reverberacion(self, inicio_dB, fin_dB):
+        """Tiempo de reverberación (extrapolado a 60 dB) del tramo entre dos niveles."""
+        m, _, _, _ = self.ajuste_dB(inicio_dB, fin_dB)
+        return -60/m
+
 # Función cálculo de parámetros acústicos
 def valor_cercano(lista, valor_buscado):
     """
@@ -149,7 +610,312 @@ def valor_cercano(lista, valor_buscado):
     indice = np.argmin(dif)
     return(lista[indice], indice)
 
-def parametros_acústicos(data, limit, w_size=1000, fs=44100, graph_name="IR"):
+def deteccion_inicio(data, umbral_dB=-20, eje=0):
+    """
+    Detecta el inicio de una RI según ISO 3382-1 (A.3.4): la primera muestra en la
+    que la energía alcanza umbral_dB respecto de su máximo.
+
+    Parametros
+    ----------
+    data: Numpy array
+        RI de cualquier forma, con el tiempo en el eje indicado. Cada traza
+        (canal, banda) se analiza por separado.
+    umbral_dB: float
+        Nivel respecto del máximo que define el inicio. Por defecto -20 dB.
+    eje: int
+        Eje del tiempo. Por defecto 0.
+
+    Returns
+    -------
+    int o Numpy array de enteros con la forma de data sin el eje del tiempo.
+    """
+    energia = np.square(np.moveaxis(np.asarray(data), eje, 0))
+    umbral = np.max(energia, axis=0) * 10**(umbral_dB/10)
+    return np.argmax(energia >= umbral, axis=0)
+
+class EnergiaAcumulada:
+    """
+    Energía acumulada de una RI desde su inicio, de la que se obtienen todos los
+    parámetros de energía (C50, C80, D50, Ts y cualquier relación temprana/tardía).
+    La señal se eleva al cuadrado y se acumula una única vez; cada parámetro es
+    una resta de dos valores de la acumulada.
+
+    Parametros
+    ----------
+    data: Numpy array
+        RI de cualquier forma, con el tiempo en el eje indicado, por ejemplo
+        (muestras, canales) o la salida (bandas, muestras, canales) de un banco
+        de filtros con eje=1. Todas las trazas se procesan juntas.
+    fs: int
+        Frecuencia de muestreo.
+    inicio: int o Numpy array
+        Muestra de inicio de cada traza (ver deteccion_inicio). Si es None se
+        detecta en data. Conviene detectarlo una vez en la RI de banda ancha y
+        usarlo en todas las bandas.
+    eje: int
+        Eje del tiempo. Por defecto 0.
+
+    Ejemplo
+    -------
+    import soundfile as sf
+    from preprocesamiento_filtrado import BancoFiltrosIEC
+
+    data, fs = sf.read('data/IR2/Mono.wav')
+    bandas = BancoFiltrosIEC(fs).filtrar(data)
+    energia = EnergiaAcumulada(bandas, fs, inicio=deteccion_inicio(data), eje=1)
+    energia.claridad(0.08)   # C80 de las 10 bandas
+    """
+    def __init__(self, data, fs=44100, inicio=None, eje=0):
+        data = np.moveaxis(np.asarray(data), eje, 0)
+        self.fs = fs
+        self.n = len(data)
+        if inicio is None:
+            inicio = deteccion_inicio(data)
+        self.inicio = np.broadcast_to(inicio, data.shape[1:])
+        # acumulada[k] es la energía de las muestras [0, k)
+        self.acumulada = np.empty((self.n + 1,) + data.shape[1:])
+        self.acumulada[0] = 0
+        np.square(data, out=self.acumulada[1:])
+        np.cumsum(self.acumulada[1:], axis=0, out=self.acumulada[1:])
+        self._momento = None
+
+    def _en(self, acumulada, t):
+        """Valor de la acumulada t segundos después del inicio de cada traza (None: final)."""
+        if t is None:
+            return acumulada[-1]
+        indice = np.clip(self.inicio + int(round(t*self.fs)), 0, self.n)
+        return np.take_along_axis(acumulada, indice[None], axis=0)[0]
+
+    def energia(self, t_inicio=0, t_fin=None):
+        """Energía entre t_inicio y t_fin segundos después del inicio (t_fin None: hasta el final)."""
+        return self._en(self.acumulada, t_fin) - self._en(self.acumulada, t_inicio)
+
+    def relacion(self, temprana, tardia):
+        """
+        Relación entre las energías de dos intervalos (t_inicio, t_fin) en segundos
+        desde el inicio, por ejemplo relacion((0, 0.05), (0, None)) es D50.
+        """
+        return self.energia(*temprana) / self.energia(*tardia)
+
+    def claridad(self, t=0.08):
+        """Claridad en dB: energía hasta t respecto de la energía posterior (C50, C80)."""
+        return 10 * np.log10(self.relacion((0, t), (t, None)))
+
+    def definicion(self, t=0.05):
+        """Definición: energía hasta t respecto de la energía total desde el inicio (D50)."""
+        return self.relacion((0, t), (0, None))
+
+    def centro_tiempo(self):
+        """Tiempo central Ts en segundos, medido desde el inicio."""
+        if self._momento is None:
+            # Acumulada de n*p^2, a partir de la energía de cada muestra
+            n = np.arange(self.n).reshape((-1,) + (1,)*(self.acumulada.ndim - 1))
+            self._momento = np.empty_like(self.acumulada)
+            self._momento[0] = 0
+            np.multiply(np.diff(self.acumulada, axis=0), n, out=self._momento[1:])
+            np.cumsum(self._momento[1:], axis=0, out=self._momento[1:])
+        momento = self._momento[-1] - self._en(self._momento, 0)
+        return (momento / self.energia() - self.inicio) / self.fs
+
+@dataclass
+class ResultadoParametros:
+    """
+    Resultado del cálculo de parámetros acústicos de una RI.
+
+    Atributos
+    ---------
+    EDT, T10, T20, T30: float
+        Tiempos de reverberación en segundos (Numpy arrays por canal si la RI es multicanal).
+    C50, C80: float
+        Claridad en dB.
+    D50: float
+        Definición (relación de energía).
+    Ts: float
+        Tiempo central en segundos.
+    ajustes: dict
+        Recta de regresión de cada tiempo de reverberación, {"EDT": (m, b), ...}.
+    rangos: dict
+        Índices [inicio, fin) de la curva de Schroeder usados en cada regresión.
+    schroeder: Numpy array
+        Integral de Schroeder en dB.
+    diezmado: int
+        Factor de diezmado de la curva de Schroeder (su frecuencia de muestreo es fs/diezmado).
+    """
+    EDT: float
+    T10: float
+    T20: float
+    T30: float
+    C80: float
+    D50: float
+    C50: float = None
+    Ts: float = None
+    ajustes: dict = field(default_factory=dict)
+    rangos: dict = field(default_factory=dict)
+    schroeder: np.ndarray = field(default=None, repr=False)
+    diezmado: int = 1
+
+    def lista(self):
+        """Parámetros en el orden de PARAMETROS."""
+        return [getattr(self, nombre) for nombre in PARAMETROS]
+
+PARAMETROS = ["EDT", "T10", "T20", "T30", "C80", "D50", "C50", "Ts"]
+
+# Rangos en dB de cada tiempo de reverberación según ISO 3382
+RANGOS_DB = {"EDT": (0, -10), "T10": (-5, -15), "T20": (-5, -25), "T30": (-5, -35)}
+
+@instrumentar()
+def calculo_parametros(data, limit=None, fs=44100, compensacion=False, diezmado=1, inicio=None):
+    """
+    Calcula los parámetros acústicos de una RI sin graficar ni imprimir.
+
+    Parametros
+    ----------
+    data: Numpy array
+        RI mono (muestras,) o multicanal (muestras, canales). Los canales se
+        procesan juntos en una sola pasada vectorizada.
+    limit: float
+        Límite de integración de Schroeder en segundos. Si es None se estima
+        para cada banda y canal con el método de Lundeby.
+    fs:int 
+        Frecuencia de muestreo de la señal de audio. 
+        Valor por defecto es 44100.
+    compensacion: bool
+        Si es True se agrega a la integral de Schroeder el término de compensación del ruido.
+    diezmado: int
+        Factor de diezmado de la energía para la integral de Schroeder y los ajustes
+        (ver factor_diezmado). La curva de Schroeder resultante está a fs/diezmado.
+    inicio: int o Numpy array
+        Muestra de inicio de la RI (por canal) desde la que se miden C50, C80, D50
+        y Ts. Si es None se detecta en data con deteccion_inicio.
+
+    Returns
+    -------
+    ResultadoParametros con EDT, T10, T20, T30, C80, D50, C50, Ts, las rectas de regresión
+    y los rangos de índices utilizados. Si data es multicanal cada valor es un
+    Numpy array con un elemento por canal.
+
+    Ejemplo
+    -------
+    import soundfile as sf
+
+    data, fs = sf.read('data/IR2/Mono.wav')
+    resultado = calculo_parametros(data, 1, fs)
+    resultado.T30
+    """
+    data_suav_sch = curva_schroeder(data, limit, fs, compensacion, diezmado)
+    tiempos, ajustes, rangos = tiempos_reverberacion(data_suav_sch, fs/diezmado)
+    energias = parametros_energia(data, fs, inicio)
+    return ResultadoParametros(**energias, ajustes=ajustes, rangos=rangos,
+                               schroeder=data_suav_sch, diezmado=diezmado, **tiempos)
+
+@instrumentar()
+def curva_schroeder(data, limit=None, fs=44100, compensacion=False, diezmado=1):
+    """
+    Integral de Schroeder en dB de una RI, a fs/diezmado si se diezma la energía
+    (ver schroeder y energia_diezmada).
+    """
+    if diezmado > 1:
+        return schroeder(energia_diezmada(data, diezmado), limit, fs/diezmado, compensacion, es_energia=True)
+    return schroeder(data, limit, fs, compensacion)
+
+@instrumentar()
+def tiempos_reverberacion(data_suav_sch, fs=44100):
+    """
+    Calcula EDT, T10, T20 y T30 a partir de la integral de Schroeder, todos los
+    canales a la vez.
+
+    Parametros
+    ----------
+    data_suav_sch: Numpy array
+        Integral de Schroeder en dB, mono o multicanal (ver curva_schroeder).
+    fs: int
+        Frecuencia de muestreo de la curva.
+
+    Returns
+    -------
+    (tiempos, ajustes, rangos): dicts indexados por "EDT", "T10", "T20", "T30" con
+    el T60 en segundos, la recta (m, b) y los índices [inicio, fin) de cada regresión.
+    """
+    multicanal = data_suav_sch.ndim == 2
+    ajuste = AjusteDecaimiento(data_suav_sch, fs)
+    tiempos = {}
+    ajustes = {}
+    rangos = {}
+    for nombre, (inicio_dB, fin_dB) in RANGOS_DB.items():
+        m, b, inicio, fin = ajuste.ajuste_dB(inicio_dB, fin_dB)
+        if not multicanal:
+            m, b, inicio, fin = float(m), float(b), int(inicio), int(fin)
+        tiempos[nombre] = -60/m
+        ajustes[nombre] = (m, b)
+        rangos[nombre] = (inicio, fin)
+    return tiempos, ajustes, rangos
+
+@instrumentar()
+def parametros_energia(data, fs=44100, inicio=None):
+    """
+    Calcula C50, C80, D50 y Ts desde el inicio de la RI (ISO 3382) con EnergiaAcumulada.
+
+    Returns
+    -------
+    dict con las claves "C50", "C80", "D50" y "Ts".
+    """
+    energia = EnergiaAcumulada(data, fs, inicio)
+    return dict(C50=energia.claridad(0.05), C80=energia.claridad(0.08),
+                D50=energia.definicion(0.05), Ts=energia.centro_tiempo())
+
+@instrumentar()
+def graficar_parametros(data, resultado, fs=44100, w_size=1000, graph_name="IR", data_suav=None):
+    """
+    Grafica la RI, su versión suavizada, la integral de Schroeder y las rectas de regresión.
+
+    Parametros
+    ----------
+    data: Numpy array
+        Array que contiene la señal de audio.
+    resultado: ResultadoParametros
+        Resultado de calculo_parametros para data.
+    fs:int 
+        Frecuencia de muestreo de la señal de audio.
+    w_size:int 
+        Tamaño de la ventana utilizada en el suavizado de la señal.
+    graph_name: str
+        Nombre del gráfico
+    data_suav: Numpy array
+        Señal suavizada ya calculada (ver suavizado_señal). Si es None se calcula con w_size.
+    """
+    data_suav_sch = resultado.schroeder
+    fs_sch = fs/resultado.diezmado
+    t_sch = np.linspace(0, len(data_suav_sch)/fs_sch, num=len(data_suav_sch))
+    t_data = np.linspace(0, len(data)/fs, num=len(data))
+    
+    # Suavizo la señal con Hilbert y filtro promedio movil
+    if data_suav is None:
+        data_suav = suavizado_señal(data, w_size)
+
+    # Transformo los datos a escala logarítmica
+    log_data = esc_log(data)
+    data_suav_log = esc_log(data_suav)
+
+    # Recta de regresión sobre toda la curva de Schroeder
+    m, b = AjusteDecaimiento(data_suav_sch, fs_sch).ajuste(0, len(data_suav_sch))
+    x_values = np.array([t_sch[0], t_sch[-1]])
+
+    fig, ax = plt.subplots(nrows=1)
+    ax.plot(t_data, log_data, label='Señal original')
+    ax.plot(t_data, data_suav_log, label='Señal suavizada')
+    ax.plot(x_values, m*x_values+b, label='Recta minimos cuadrados')
+    for nombre, (m_i, b_i) in resultado.ajustes.items():
+        ax.plot(x_values, m_i*x_values+b_i, label='Recta {}'.format(nombre))
+    ax.plot(t_sch, data_suav_sch, label='Scroeder')
+    ax.set_xlabel("tiempo en segundos")
+    ax.set_ylabel("Amplitud en dB")
+    ax.set_ylim(-100, 1)
+    ax.legend()
+    plt.title("Gráfico de: {}".format(graph_name))
+    plt.show()
+
+@instrumentar()
+def parametros_acústicos(data, limit, w_size=1000, fs=44100, graph_name="IR", graficar=True, inicio=None):
     """
     Calcula los parámetros acústicos a partir de una RI.
 
@@ -158,7 +924,8 @@ def parametros_acústicos(data, limit, w_size=1000, fs=44100, graph_name="IR"):
     data: Numpy array
         Array que contiene la señal de audio.
     limit: float
-        Límite utilizado en el filtrado de Schroeder.
+        Límite de integración de Schroeder en segundos. Si es None se estima
+        para cada banda y canal con el método de Lundeby.
     w_size:int 
         Tamaño de la ventana utilizada en el suavizado de la señal. 
         Valor por defecto es 1000.
@@ -167,6 +934,10 @@ def parametros_acústicos(data, limit, w_size=1000, fs=44100, graph_name="IR"):
         Valor por defecto es 44100.
     graph_name: str
         Nombre del gráfico
+    graficar: bool
+        Si es False no se suaviza la señal ni se genera el gráfico. Por defecto True.
+    inicio: int
+        Muestra de inicio de la RI para los parámetros de energía. Si es None se detecta en data.
 
     Returns:
         list_param :list 
@@ -178,122 +949,128 @@ def parametros_acústicos(data, limit, w_size=1000, fs=44100, graph_name="IR"):
                 - T30: (float) Tiempo de reverberación equivalente al nivel de [-5:-35] dB.
                 - C80: (float) Claridad acústica medida en porcentaje de energía tardía (80 ms) respecto a la energía total.
                 - D50: (float) Definición acústica medida en porcentaje de energía temprana (50 ms) respecto a la energía total.
+                - C50: (float) Claridad acústica a 50 ms en dB.
+                - Ts: (float) Tiempo central en segundos.
     """
-    list_param = []
-    # Suavizo la señal con Hilbert, filtro promedio movil y Schroeder
-    data_suav = suavizado_señal(data, w_size)
-    data_suav_sch = schroeder(data, limit)
-    
-    # Transformo los datos a escala logarítmica
-    log_data = esc_log(data)    
-    data_suav_log = esc_log(data_suav)
+    resultado = calculo_parametros(data, limit, fs, inicio=inicio)
+    for nombre in PARAMETROS:
+        logger.info("%s: %s", nombre, getattr(resultado, nombre))
+    if graficar:
+        graficar_parametros(data, resultado, fs, w_size, graph_name)
+    return resultado.lista()
 
-    # Genero los linspace de tiempo
-    t_data = np.linspace(0, len(data)/fs, num=len(data))
-    t_sch = np.linspace(0, len(data_suav_sch)/fs, num=len(data_suav_sch))
+def _calculo_banda(banda_diezmado, limit, fs, compensacion, inicio, dtype):
+    # Recibe (banda, diezmado) como un solo argumento para pool.map sobre zip.
+    # La precisión llega explícita: los procesos del pool no heredan la del padre
+    banda, diezmado = banda_diezmado
+    with modo_precision(dtype):
+        return calculo_parametros(banda, limit, fs, compensacion, diezmado, inicio).lista()
 
-    # Datos 
-    X = t_sch
-    y = data_suav_sch
-    
-    # T60 a partir de T10, T20, T30
-    # EDT
-    X_EDT = X[:valor_cercano(y, -10)[1]]
-    y_EDT = data_suav_sch[:valor_cercano(y, -10)[1]]
-    
-    # T10
-    X_T10 = X[valor_cercano(y, -5)[1]:valor_cercano(y, -15)[1]]
-    y_T10 = data_suav_sch[valor_cercano(y, -5)[1]:valor_cercano(y, -15)[1]]
-
-    # T20
-    X_T20 = X[valor_cercano(y, -5)[1]:valor_cercano(y, -25)[1]]
-    y_T20 = data_suav_sch[valor_cercano(y, -5)[1]:valor_cercano(y, -25)[1]]
-
-    # T30
-    X_T30 = X[valor_cercano(y, -5)[1]:valor_cercano(y, -35)[1]]
-    y_T30 = data_suav_sch[valor_cercano(y, -5)[1]:valor_cercano(y, -35)[1]]
-
-    #------------------------------------------
-    # Llamada a la función de regresión lineal
-    x_values = np.linspace(min(X), max(X), fs)
-    m, b = regresion_lineal(X, y)
-    #print("T: ", -m/60)
-    #list_param.append(-m/60)
-
-    # EDT
-    x_values_edt = np.linspace(min(X), max(X), fs)
-    m_EDT, b_EDT = regresion_lineal(X_EDT, y_EDT)
-    print("EDT: ", -60/m_EDT)
-    list_param.append(-60/m_EDT)
-    
-    # T10
-    x_values_T10 = np.linspace(min(X), max(X), fs)
-    m_T10, b_T10 = regresion_lineal(X_T10, y_T10)
-    print("T10", -m_T10/60)
-    list_param.append(-60/m_T10)
-
-    # T20
-    x_values_T20 = np.linspace(min(X), max(X), fs)
-    m_T20, b_T20 = regresion_lineal(X_T20, y_T20)
-    print("T20", -60/m_T20)
-    list_param.append(-60/m_T20)
-
-    # T30
-    x_values_T30 = np.linspace(min(X), max(X), fs)
-    m_T30, b_T30 = regresion_lineal(X_T30, y_T30)
-    print("T30", -60/m_T30)
-    list_param.append(-60/m_T30)
-
-    # C80
-    t_80 = int(0.08 * fs)   
-    C80 = 10 * np.log10(np.sum(np.power(np.array(data),2)[0:t_80]) / np.sum(np.power(np.array(data),2)[t_80:]))
-    print("C80", C80)
-    list_param.append(C80)
-
-    # D50
-    t_50 = int(0.05 * fs)  
-    D50 = np.sum(np.power(np.array(data),2)[0:t_50]) / np.sum(np.power(np.array(data),2))
-    print("D50", D50)
-    list_param.append(D50)
-
-    #------------------------------------------
-    # Generar valores para la línea de regresión
-    y_values = m*x_values+b
-    
-    # EDT
-    y_values_edt = m_EDT*x_values_edt+b_EDT
+@instrumentar()
+def parametros_bandas(bandas, limit=None, frecuencias=None, fs=44100, n_workers=None, ejecutor="proceso",
+                      compensacion=False, multitasa=False, fraccion=1, inicio=None, dtype=None):
+    """
+    Calcula los parámetros acústicos de todas las bandas en paralelo, sin graficar.
 
-    # T10
-    y_values_T10 = m_T10*x_values_T10+b_T10
+    Parametros
+    ----------
+    bandas: Numpy array (bandas, muestras[, canales]) o lista de Numpy arrays
+        Señal filtrada de cada banda, por ejemplo la salida de BancoFiltrosIEC.filtrar.
+    limit: float
+        Límite de integración de Schroeder en segundos. Si es None se estima
+        para cada banda y canal con el método de Lundeby.
+    frecuencias: list
+        Frecuencias centrales de las bandas, se usan como índice del DataFrame.
+        Por defecto se usa la posición de cada banda.
+    fs: int
+        Frecuencia de muestreo de la señal de audio.
+    n_workers: int
+        Cantidad de procesos o hilos. Por defecto la cantidad de núcleos disponibles.
+        Con n_workers=1 las bandas se calculan en serie sin crear un pool.
+    ejecutor: str
+        "proceso" para ProcessPoolExecutor o "hilo" para ThreadPoolExecutor.
+    compensacion: bool
+        Si es True se agrega a la integral de Schroeder el término de compensación del ruido.
+    multitasa: bool
+        Si es True la energía de cada banda se diezma según su ancho de banda
+        (ver factor_diezmado) antes de la integral de Schroeder y los ajustes.
+        Requiere frecuencias.
+    fraccion: int
+        1 para bandas de octava, 3 para tercio de octava. Se usa con multitasa.
+    inicio: int o Numpy array
+        Muestra de inicio de la RI (por canal), común a todas las bandas. Si es
+        None se detecta en cada banda.
+    dtype: str
+        Precisión del cálculo, "float64" o "float32". Por defecto la de la
+        política actual (ver funciones.fijar_precision), que se pasa a cada banda.
 
-    # T20
-    y_values_T20 = m_T20*x_values_T20+b_T20
+    Returns
+    -------
+    pandas DataFrame con una fila por banda (en el mismo orden que bandas)
+    y las columnas de PARAMETROS. Si las bandas son multicanal
+    el índice es (banda, canal).
 
-    # T30
-    y_values_T30 = m_T30*x_values_T30+b_T30
+    Ejemplo
+    -------
+    import soundfile as sf
+    from preprocesamiento_filtrado import BancoFiltrosIEC
 
-    #------------------------------------------
-    # Visualizar los datos y la línea de regresión    
-    fig, ax = plt.subplots(nrows=1)
-    ax.plot(t_data, log_data, label='Señal original')
-    ax.plot(t_data, data_suav_log, label='Señal suavizada')
-    ax.plot(x_values, y_values, label='Recta minimos cuadrados')
-    ax.plot(x_values_edt, y_values_edt, label='Recta EDT')
-    ax.plot(x_values_T10, y_values_T10, label='Recta T10')
-    ax.plot(x_values_T20, y_values_T20, label='Recta T20')
-    ax.plot(x_values_T30, y_values_T30, label='Recta T30')
-    ax.plot(t_sch, data_suav_sch, label='Scroeder')
-    ax.set_xlabel("tiempo en segundos")
-    ax.set_ylabel("Amplitud en dB")
-    ax.set_ylim(-100, 1)
-    ax.legend()
-    plt.title("Gráfico de: {}".format(graph_name))
-    plt.show()
-    print(list_param)
-    return list_param
+    data, fs = sf.read('data/IR2/Mono.wav')
+    banco = BancoFiltrosIEC(fs)
+    df = parametros_bandas(banco.filtrar(data), None, banco.frecuencias, fs=fs, n_workers=4)
+    """
+    calculo = partial(_calculo_banda, limit=limit, fs=fs, compensacion=compensacion, inicio=inicio,
+                      dtype=precision(dtype).name)
+    if multitasa:
+        if frecuencias is None:
+            raise ValueError("multitasa=True requiere frecuencias (las frecuencias centrales de las bandas)")
+        diezmados = [factor_diezmado(frecuencia, fs, fraccion) for frecuencia in frecuencias]
+    else:
+        diezmados = [1]*len(bandas)
+    if n_workers == 1:
+        resultados = [calculo(argumentos) for argumentos in zip(bandas, diezmados)]
+    else:
+        if ejecutor == "proceso":
+            pool = ProcessPoolExecutor(max_workers=n_workers)
+        elif ejecutor == "hilo":
+            pool = ThreadPoolExecutor(max_workers=n_workers)
+        else:
+            raise ValueError("ejecutor debe ser 'proceso' o 'hilo'")
+        with pool:
+            if ejecutor == "hilo":
+                # Los hilos no heredan las variables de contexto: cada banda
+                # corre en una copia del contexto actual
+                futuros = [pool.submit(contextvars.copy_context().run, calculo, argumentos)
+                           for argumentos in zip(bandas, diezmados)]
+                resultados = [futuro.result() for futuro in futuros]
+            else:
+                # map conserva el orden de las bandas
+                resultados = list(pool.map(calculo, zip(bandas, diezmados)))
+
+    if frecuencias is None:
+        frecuencias = list(range(len(resultados)))
+    if np.ndim(resultados[0][0]) == 0:
+        return pd.DataFrame(resultados, index=frecuencias, columns=PARAMETROS)
+
+    # Bandas multicanal: una fila por (banda, canal)
+    canales = len(resultados[0][0])
+    filas = [valores for resultado in resultados for valores in np.column_stack(resultado)]
+    indice = pd.MultiIndex.from_product([frecuencias, range(canales)], names=["banda", "canal"])
+    return pd.DataFrame(filas, index=indice, columns=PARAMETROS)
+
+def leer_limite(texto):
+    """
+    Convierte el texto ingresado como límite de integración a segundos.
+    Si no es un número devuelve None para estimarlo automáticamente.
+    """
+    try:
+        return float(texto)
+    except ValueError:
+        return None
 
 if __name__ == "__main__":
-    file = 'data\IR2\Mono.wav'
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    file = 'data/IR2/Mono.wav'
     signal, fs = read_wav(file)
     def plot_sig():
         log_signal = esc_log(signal)
@@ -305,11 +1082,11 @@ if __name__ == "__main__":
     window.title("Suavizado y calculo")
 
     limit= Entry(window, width=50)
-    limit.insert(0, "Ingrese el límite de integración en segundos: ")
+    limit.insert(0, "Ingrese el límite de integración en segundos (vacío: automático)")
     limit.pack()
     
     def param():
-        parametros_acústicos(signal, int(limit.get()))
+        parametros_acústicos(signal, leer_limite(limit.get()), fs=fs)
 
     button = Button(window, 
                     text="Graficar impulso en dominio del tiempo", 
@@ -0,0 +1,271 @@
+# Instrumentación opcional de las etapas del análisis: tiempo de reloj, tiempo
+# de CPU y, si se pide, memoria asignada (tracemalloc) de cada etapa y banda.
+# Está desactivada por defecto y entonces no mide nada. Se activa desde el
+# código con activar() / sesion() o, sin modificar el código, con la variable
+# de entorno SIGNAL_SISTEMS_TELEMETRIA (también en los procesos de un lote):
+#
+#   SIGNAL_SISTEMS_TELEMETRIA=traza.jsonl python analisis_lote.py "../data/IR*/Mono.wav"
+#   SIGNAL_SISTEMS_TELEMETRIA_MEMORIA=1   (además, memoria asignada por etapa)
+#   python telemetria.py traza.jsonl       (resumen por etapa)
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+VARIABLE_ENTORNO = "SIGNAL_SISTEMS_TELEMETRIA"
+VARIABLE_MEMORIA = "SIGNAL_SISTEMS_TELEMETRIA_MEMORIA"
+
+_local = threading.local()
+
+class SumideroMemoria:
+    """
+    Sumidero que guarda los eventos en una lista.
+
+    Ejemplo
+    -------
+    sumidero = SumideroMemoria()
+    with sesion(sumidero):
+        analizar_archivo('data/IR2/Mono.wav')
+    print(resumen(sumidero.eventos))
+    """
+    def __init__(self):
+        self.eventos = []
+
+    def registrar(self, evento):
+        self.eventos.append(evento)
+
+class SumideroJSONL:
+    """
+    Sumidero que agrega cada evento como una línea JSON al archivo ruta. Varios
+    procesos pueden escribir en el mismo archivo: cada uno lo abre por su cuenta
+    y escribe líneas completas en modo append.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._archivo = None
+        self._pid = None
+
+    def registrar(self, evento):
+        # Los procesos hijos de un fork no reutilizan el archivo del padre
+        if self._pid != os.getpid():
+            self._archivo = open(self.ruta, "a", buffering=1, encoding="utf-8")
+            self._pid = os.getpid()
+        self._archivo.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+
+    def cerrar(self):
+        if self._archivo is not None and self._pid == os.getpid():
+            self._archivo.close()
+        self._archivo = None
+
+def activar(*sumideros, memoria=False):
+    """
+    Activa la instrumentación en el contexto actual (ver _estado).
+
+    Parametros
+    ----------
+    sumideros:
+        Objetos con un método registrar(evento) que reciben cada evento (dict).
+    memoria: bool
+        Si es True también se mide la memoria asignada por etapa con tracemalloc
+        (bastante más lento; sólo para buscar picos de memoria).
+    """
+    _estado.set((tuple(sumideros), memoria))
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def desactivar():
+    """Desactiva la instrumentación en el contexto actual."""
+    _estado.set(_INACTIVO)
+
+def activa():
+    """True si la instrumentación está activa."""
+    return bool(_estado.get()[0])
+
+@contextmanager
+def sesion(*sumideros, memoria=False):
+    """
+    Activa la instrumentación dentro de un bloque with y restaura el estado anterior al salir.
+
+    Ejemplo
+    -------
+    with sesion(SumideroMemoria()) as sumidero:
+        parametros_acústicos(data, None, fs=fs, graficar=False)
+    print(resumen(sumidero.eventos))
+    """
+    iniciar_tracemalloc = memoria and not tracemalloc.is_tracing()
+    if iniciar_tracemalloc:
+        tracemalloc.start()
+    token = _estado.set((tuple(sumideros), memoria))
+    try:
+        yield sumideros[0] if len(sumideros) == 1 else sumideros
+    finally:
+        _estado.reset(token)
+        if iniciar_tracemalloc:
+            tracemalloc.stop()
+
+class _Nula:
+    # Medición que no hace nada, cuando la instrumentación está desactivada
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *error):
+        return False
+
+_NULA = _Nula()
+
+class _Medicion:
+    def __init__(self, etapa, etiquetas):
+        self.etapa = etapa
+        self.etiquetas = etiquetas
+
+    def __enter__(self):
+        pila = getattr(_local, "pila", None)
+        if pila is None:
+            pila = _local.pila = []
+        self.padre = pila[-1] if pila else None
+        # Las etiquetas (por ejemplo la banda) se heredan en las etapas anidadas
+        if self.padre is not None:
+            self.etiquetas = dict(self.padre.etiquetas, **self.etiquetas)
+        self.ruta = self.etapa if self.padre is None else self.padre.ruta + "/" + self.etapa
+        self.sumideros, memoria = _estado.get()
+        self.memoria = memoria and tracemalloc.is_tracing()
+        if self.memoria:
+            actual, pico = tracemalloc.get_traced_memory()
+            if self.padre is not None and self.padre.memoria:
+                self.padre.pico = max(self.padre.pico, pico)
+            tracemalloc.reset_peak()
+            self.memoria_inicio = actual
+            self.pico = actual
+        pila.append(self)
+        self.inicio = time.time()
+        self.cpu = time.thread_time()
+        self.reloj = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, error, traza):
+        duracion = time.perf_counter() - self.reloj
+        cpu = time.thread_time() - self.cpu
+        _local.pila.pop()
+        evento = {"etapa": self.etapa, "ruta": self.ruta, "inicio": self.inicio, "duracion": duracion,
+                  "cpu": cpu, "pid": os.getpid(), "error": None if tipo is None else tipo.__name__}
+        if self.memoria:
+            actual, pico = tracemalloc.get_traced_memory()
+            self.pico = max(self.pico, pico)
+            if self.padre is not None and self.padre.memoria:
+                self.padre.pico = max(self.padre.pico, self.pico)
+            evento["memoria_pico"] = self.pico - self.memoria_inicio
+            evento["memoria_neta"] = actual - self.memoria_inicio
+        evento.update(self.etiquetas)
+        for sumidero in self.sumideros:
+            sumidero.registrar(evento)
+        return False
+
+def medir(etapa, **etiquetas):
+    """
+    Context manager que mide el bloque como la etapa indicada. Si la
+    instrumentación está desactivada no hace nada.
+
+    Cada evento tiene etapa, ruta (las etapas que lo contienen, por ejemplo
+    "analizar_archivo/banda/schroeder"), inicio (time.time()), duracion y cpu
+    (segundos; cpu es el tiempo del hilo que ejecuta la etapa, sin el de los
+    hilos o procesos que la etapa lance), pid, error (nombre de la excepción o None), las etiquetas
+    propias y heredadas y, con memoria, memoria_pico y memoria_neta (bytes
+    asignados respecto del inicio de la etapa).
+
+    Ejemplo
+    -------
+    with medir("banda", banda=1000):
+        schroeder(banda, None, fs)
+    """
+    if not _estado.get()[0]:
+        return _NULA
+    return _Medicion(etapa, etiquetas)
+
+def instrumentar(etapa=None):
+    """
+    Decorador que mide cada llamada a la función con medir(). Por defecto la
+    etapa es el nombre de la función.
+    """
+    def decorador(funcion):
+        nombre = etapa or funcion.__name__
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _estado.get()[0]:
+                return funcion(*args, **kwargs)
+            with _Medicion(nombre, {}):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def leer_jsonl(ruta):
+    """Lee los eventos de un archivo escrito por SumideroJSONL."""
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+def resumen(eventos, por=("etapa",)):
+    """
+    Resumen de los eventos por etapa (u otras columnas).
+
+    Parametros
+    ----------
+    eventos: list de dict, pandas DataFrame o str
+        Eventos de un SumideroMemoria, o ruta de un archivo JSON lines.
+    por: tuple
+        Columnas de agrupación, por ejemplo ("etapa", "banda") o ("ruta",).
+
+    Returns
+    -------
+    pandas DataFrame ordenado por tiempo total, con las columnas n, total,
+    media y max (segundos de reloj), cpu (segundos), porcentaje (del tiempo de
+    las etapas de primer nivel) y, si se midió, memoria_pico_MB (máximo).
+    """
+    import pandas as pd
+    if isinstance(eventos, str):
+        eventos = leer_jsonl(eventos)
+    df = pd.DataFrame(eventos)
+    if df.empty:
+        return pd.DataFrame(columns=["n", "total", "media", "max", "cpu", "porcentaje"])
+    grupos = df.groupby(list(por), dropna=False)
+    tabla = pd.DataFrame({"n": grupos["duracion"].size(), "total": grupos["duracion"].sum(),
+                          "media": grupos["duracion"].mean(), "max": grupos["duracion"].max(),
+                          "cpu": grupos["cpu"].sum()})
+    # Las etapas anidadas están incluidas en las de primer nivel
+    total = df.loc[~df["ruta"].str.contains("/"), "duracion"].sum()
+    tabla["porcentaje"] = 100*tabla["total"]/total if total > 0 else float("nan")
+    if "memoria_pico" in df:
+        tabla["memoria_pico_MB"] = grupos["memoria_pico"].max()/2**20
+    return tabla.sort_values("total", ascending=False)
+
+def _configurar_desde_entorno():
+    ruta = os.environ.get(VARIABLE_ENTORNO)
+    if not ruta:
+        return _INACTIVO
+    memoria = os.environ.get(VARIABLE_MEMORIA, "") not in ("", "0")
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return ((SumideroJSONL(ruta),), memoria)
+
+# Estado (sumideros, memoria) de la instrumentación. Es una variable de contexto:
+# activar() y sesion() valen para el hilo (o la tarea de asyncio) que las llama,
+# y los hilos nuevos empiezan con el estado configurado por la variable de
+# entorno. Para medir en otros hilos ejecutar sus tareas con
+# contextvars.copy_context().run, como hace parametros_bandas.
+_INACTIVO = ((), False)
+_estado = ContextVar("telemetria", default=_configurar_desde_entorno())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumen por etapa de una traza de telemetría (JSON lines).")
+    parser.add_argument("traza", help="Archivo .jsonl escrito con SIGNAL_SISTEMS_TELEMETRIA")
+    parser.add_argument("--por", nargs="+", default=["etapa"], help="Columnas de agrupación, por ejemplo: etapa banda")
+    args = parser.parse_args(argv)
+    tabla = resumen(args.traza, tuple(args.por))
+    print(tabla.to_string(float_format="{:.4f}".format))
+    return tabla
+
+if __name__ == "__main__":
+    main()
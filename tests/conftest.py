@@ -0,0 +1,7 @@
+# Los módulos del proyecto están en src/ y se importan por su nombre, como al
+# ejecutar los scripts desde ese directorio.
+import os
+import sys
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from almacen_resultados import AlmacenResultados, configuracion
+from suavizado_calculo import PARAMETROS
+
+def _filas(rng):
+    filas = []
+    for canal in range(2):
+        for banda in (125.0, 250.0, 500.0):
+            filas.append(dict(canal=canal, banda=banda, **dict(zip(PARAMETROS, rng.random(len(PARAMETROS))))))
+    return filas
+
+def test_agregar_existe_leer(tmp_path):
+    rng = np.random.default_rng(0)
+    (tmp_path / "Sala1").mkdir()
+    archivo = str(tmp_path / "Sala1" / "P1.wav")
+    sf.write(archivo, rng.standard_normal((1000, 2))*0.1, 8000)
+    clave, ajustes = configuracion(fraccion=1)
+    filas = _filas(rng)
+
+    with AlmacenResultados(str(tmp_path / "resultados.sqlite")) as almacen:
+        assert not almacen.existe(archivo, clave)
+        assert almacen.agregar(archivo, clave, ajustes, filas)
+        assert almacen.existe(archivo, clave)
+        # Los resultados no se sobrescriben
+        assert not almacen.agregar(archivo, clave, ajustes, _filas(rng))
+        # Otra configuración es otro análisis
+        assert not almacen.existe(archivo, configuracion(fraccion=3)[0])
+        leidos = almacen.leer(archivo, clave)
+
+    esperado = pd.DataFrame(filas).assign(archivo=archivo)[["archivo", "canal", "banda"] + PARAMETROS]
+    pd.testing.assert_frame_equal(leidos, esperado, check_dtype=False)
+
+def test_existe_por_contenido(tmp_path):
+    rng = np.random.default_rng(1)
+    data = rng.standard_normal(1000)*0.1
+    for nombre in ("a", "b"):
+        (tmp_path / nombre).mkdir()
+        sf.write(str(tmp_path / nombre / "Mono.wav"), data, 8000)
+    clave, ajustes = configuracion()
+    with AlmacenResultados(str(tmp_path / "resultados.sqlite")) as almacen:
+        almacen.agregar(str(tmp_path / "a" / "Mono.wav"), clave, ajustes, _filas(rng))
+        # El mismo contenido en otra sala no cuenta como analizado
+        assert not almacen.existe(str(tmp_path / "b" / "Mono.wav"), clave)
+        assert almacen.existe(str(tmp_path / "b" / "Mono.wav"), clave, sala="a")
@@ -0,0 +1,61 @@
+import numpy as np
+import soundfile as sf
+from scipy import signal
+from generacion_adquisicion import log_sweep_invfilter
+from deconvolucion import Deconvolucion, deconvolucion_stream
+
+FS = 8000
+
+def _normalizada(x, sos):
+    x = signal.sosfiltfilt(sos, x)
+    return x/np.max(np.abs(x))
+
+def test_convolucion_y_division_dan_la_misma_ri():
+    x, k_t = log_sweep_invfilter(50, 3500, 2, FS, guardar_wav=False)
+    rng = np.random.default_rng(0)
+    ri = np.zeros(800)
+    ri[100], ri[250] = 1, -0.5
+    ri[300:] = 0.2*np.exp(-np.arange(500)/80)*rng.standard_normal(500)
+    grabacion = signal.fftconvolve(x, ri)
+
+    convolucion = Deconvolucion(k_t, len(grabacion), largo_ri=len(ri)).deconvolucionar(grabacion)
+    division = Deconvolucion(k_t, len(grabacion), largo_ri=len(ri), metodo="division",
+                             sweep=x).deconvolucionar(grabacion)
+
+    # El impulso queda en la misma muestra con los dos métodos
+    assert np.argmax(np.abs(convolucion)) == np.argmax(np.abs(division)) == 100
+    # Dentro de la banda del sweep coinciden en forma (el filtro inverso no es plano en amplitud)
+    sos = signal.butter(4, [100, 1000], "band", fs=FS, output="sos")
+    np.testing.assert_allclose(_normalizada(convolucion, sos), _normalizada(division, sos), atol=0.02)
+    np.testing.assert_allclose(_normalizada(division, sos), _normalizada(ri, sos), atol=0.002)
+
+def test_deconvolucionar_multicanal_igual_a_cada_canal():
+    x, k_t = log_sweep_invfilter(50, 3500, 1, FS, guardar_wav=False)
+    grabacion = np.column_stack([signal.fftconvolve(x, [0, 1, 0.5, 0]), signal.fftconvolve(x, [0.2, 0, 0, 1])])
+    deconv = Deconvolucion(k_t, len(grabacion), largo_ri=200)
+    ri = deconv.deconvolucionar(grabacion)
+    for canal in range(2):
+        np.testing.assert_allclose(ri[:, canal], deconv.deconvolucionar(grabacion[:, canal]), atol=1e-12)
+
+def test_deconvolucion_stream_igual_a_la_grabacion_completa(tmp_path):
+    x, k_t = log_sweep_invfilter(50, 3500, 1, FS, guardar_wav=False)
+    periodo, inicio, largo_ri = len(x) + FS//2, 300, 1500
+    rng = np.random.default_rng(1)
+    grabacion = np.zeros(inicio + 3*periodo)
+    for j in range(3):
+        ri = np.zeros(largo_ri)
+        ri[20 + 10*j] = 1
+        ri[200:] = 0.1*np.exp(-np.arange(largo_ri - 200)/200)*rng.standard_normal(largo_ri - 200)
+        grabacion[inicio + j*periodo:][:len(x) + largo_ri - 1] += signal.fftconvolve(x, ri)
+    archivo = str(tmp_path / "sesion.wav")
+    sf.write(archivo, np.column_stack([np.zeros_like(grabacion), grabacion]), FS, subtype="DOUBLE")
+
+    completa = signal.fftconvolve(grabacion, k_t)
+    # Bloques chicos para que cada RI quede repartida entre varios bloques
+    ris = list(deconvolucion_stream(archivo, k_t, periodo, largo_ri, inicio=inicio,
+                                    n_fft=2*len(k_t), canal=1))
+    assert [j for j, _ in ris] == [0, 1, 2]
+    for j, ri in ris:
+        comienzo = inicio + j*periodo + len(k_t) - 1
+        np.testing.assert_allclose(ri, completa[comienzo:comienzo + largo_ri], atol=1e-9)
+        assert np.argmax(np.abs(ri)) == 20 + 10*j
@@ -0,0 +1,29 @@
+from etapas import CacheEtapas
+
+def test_cache_desaloja_el_menos_usado():
+    cache = CacheEtapas(max_elementos=2)
+    calculados = []
+    def calcular(clave):
+        def f():
+            calculados.append(clave)
+            return clave.upper()
+        return f
+
+    assert cache.obtener("a", calcular("a")) == "A"
+    assert cache.obtener("b", calcular("b")) == "B"
+    assert cache.obtener("a", calcular("a")) == "A"   # "a" pasa a ser el más reciente
+    cache.obtener("c", calcular("c"))                  # desaloja "b"
+    assert len(cache) == 2
+    assert "a" in cache and "c" in cache and "b" not in cache
+    cache.obtener("b", calcular("b"))                  # se recalcula y desaloja "a"
+    assert "a" not in cache
+    assert calculados == ["a", "b", "c", "b"]
+    assert (cache.aciertos, cache.fallos) == (1, 4)
+
+def test_cache_en_disco(tmp_path):
+    cache = CacheEtapas(max_elementos=1, directorio=str(tmp_path))
+    cache.obtener("a", lambda: [1, 2])
+    cache.obtener("b", lambda: [3])
+    # "a" salió de la memoria pero se recupera del disco sin recalcular
+    assert cache.obtener("a", lambda: None) == [1, 2]
+    assert CacheEtapas(directorio=str(tmp_path)).obtener("b", lambda: None) == [3]
@@ -0,0 +1,79 @@
+import threading
+import numpy as np
+import pytest
+import soundfile as sf
+import funciones
+from funciones import FuenteAudio, abrir_audio, modo_precision, precision, read_wav
+
+FS = 8000
+
+@pytest.fixture
+def senal():
+    return np.random.default_rng(0).uniform(-0.9, 0.9, (FS, 2))
+
+@pytest.mark.parametrize("subtype", ["PCM_U8", "PCM_16", "PCM_24", "PCM_32", "FLOAT", "DOUBLE"])
+@pytest.mark.parametrize("dtype", ["float64", "float32"])
+def test_fuente_mapeada_igual_a_soundfile(tmp_path, senal, subtype, dtype):
+    archivo = str(tmp_path / "senal.wav")
+    sf.write(archivo, senal, FS, subtype=subtype)
+    esperado, _ = sf.read(archivo, dtype=dtype)
+    fuente = FuenteAudio(archivo)
+    assert fuente.mapa is not None
+    np.testing.assert_array_equal(fuente.leer(dtype=dtype), esperado)
+    np.testing.assert_array_equal(fuente.leer(100, 300, dtype=dtype), esperado[100:300])
+    np.testing.assert_array_equal(np.concatenate(list(fuente.bloques(3000, dtype=dtype))), esperado)
+
+    data, fs = read_wav(archivo, dtype)
+    assert fs == FS and data.dtype == dtype and data.flags.writeable
+    np.testing.assert_array_equal(data, esperado)
+
+def test_read_wav_no_guarda_la_fuente(tmp_path, senal, monkeypatch):
+    monkeypatch.setattr(funciones, "_fuentes", funciones.OrderedDict())
+    archivo = str(tmp_path / "senal.wav")
+    sf.write(archivo, senal, FS, subtype="DOUBLE")
+    data, _ = read_wav(archivo, "float64")
+    data[0] = 0  # Es una copia propia aunque el WAV se mapee sin conversión
+    assert not funciones._fuentes
+    assert abrir_audio(archivo).datos("float64")[0, 0] == senal[0, 0]
+
+def test_fuentes_acotadas_por_bytes(tmp_path, senal, monkeypatch):
+    monkeypatch.setattr(funciones, "_fuentes", funciones.OrderedDict())
+    monkeypatch.setattr(funciones, "MAX_BYTES_FUENTES", 2*senal.nbytes)
+    fuentes = []
+    for i in range(3):
+        archivo = str(tmp_path / "senal_{}.wav".format(i))
+        sf.write(archivo, senal, FS, subtype="PCM_16")
+        fuentes.append(abrir_audio(archivo))
+        fuentes[-1].datos("float64")
+    # La menos usada recientemente se descarta y libera su mapa y sus datos
+    assert list(funciones._fuentes.values()) == fuentes[1:]
+    assert fuentes[0]._mapa is None and fuentes[0].nbytes == 0
+    assert abrir_audio(str(tmp_path / "senal_1.wav")) is fuentes[1]
+
+    # Una fuente más grande que el límite se conserva mientras se usa
+    monkeypatch.setattr(funciones, "MAX_BYTES_FUENTES", senal.nbytes//2)
+    fuentes[2].datos("float32")
+    assert list(funciones._fuentes.values()) == [fuentes[2]]
+
+def test_precision_aislada_por_hilo():
+    barrera = threading.Barrier(2)
+    vistas = {}
+    def tarea(dtype):
+        with modo_precision(dtype):
+            barrera.wait()  # Los dos hilos cambian la política antes de leerla
+            vistas[dtype] = precision().name
+            barrera.wait()
+    with modo_precision("float32"):
+        hilos = [threading.Thread(target=tarea, args=(dtype,)) for dtype in ("float32", "float64")]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        assert precision() == np.float32
+        # Un hilo nuevo empieza con la política por defecto
+        nuevo = []
+        hilo = threading.Thread(target=lambda: nuevo.append(precision().name))
+        hilo.start()
+        hilo.join()
+    assert vistas == {"float32": "float32", "float64": "float64"}
+    assert nuevo == ["float64"] and precision() == np.float64
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy import signal
+from generacion_adquisicion import ruido_rosa_bloques, ruido_rosa_wav
+
+FS = 44100
+
+@pytest.mark.parametrize("tamaño_bloque", [1000, 8192])
+def test_ruido_rosa_bloques_espectro_rosa(tamaño_bloque):
+    ruido = np.concatenate(list(ruido_rosa_bloques(10, FS, tamaño_bloque=tamaño_bloque, seed=0)))
+    assert len(ruido) == 10*FS
+    assert np.max(np.abs(ruido)) <= 1
+    f, potencia = signal.welch(ruido, FS, nperseg=8192)
+    def nivel(f1):
+        return 10*np.log10(potencia[(f >= f1) & (f < 2*f1)].mean())
+    # -3 dB por octava entre 100 Hz y 6.4 kHz, sin saltos en los bordes de los bloques
+    pendiente = (nivel(6400) - nivel(100))/6
+    assert -4 < pendiente < -2.5
+
+def test_ruido_rosa_bloques_reproducible():
+    a = np.concatenate(list(ruido_rosa_bloques(1, FS, seed=3)))
+    b = np.concatenate(list(ruido_rosa_bloques(1, FS, seed=3)))
+    np.testing.assert_array_equal(a, b)
+
+def test_ruido_rosa_wav(tmp_path):
+    archivo = str(tmp_path / "rosa.wav")
+    ruido_rosa_wav(archivo, 2.5, FS, tamaño_bloque=4096, seed=0, subtype="FLOAT")
+    data, fs = sf.read(archivo)
+    assert fs == FS and len(data) == int(2.5*FS)
+    np.testing.assert_allclose(data, np.concatenate(list(ruido_rosa_bloques(2.5, FS, tamaño_bloque=4096, seed=0))),
+                               atol=1e-7)
+
+import generacion_adquisicion as ga
+
+def test_barrido_cacheado_memoria_y_disco(tmp_path, monkeypatch):
+    monkeypatch.setattr(ga, "_cache_barridos", ga.OrderedDict())
+    monkeypatch.setattr(ga, "_cache_espectros", ga.OrderedDict())
+    x, k_t = ga.barrido_cacheado(50, 3500, 1, 8000, directorio=str(tmp_path))
+    referencia = ga.log_sweep_invfilter(50, 3500, 1, 8000, guardar_wav=False)
+    np.testing.assert_array_equal(x, referencia[0])
+    np.testing.assert_array_equal(k_t, referencia[1])
+    assert ga.barrido_cacheado(50, 3500, 1, 8000, directorio=str(tmp_path))[0] is x
+    espectro = ga.espectro_filtro_inverso(50, 3500, 1, 8000, 16384, directorio=str(tmp_path))
+    np.testing.assert_allclose(espectro, np.fft.rfft(k_t, 16384))
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+
+    # Desde el disco, sin la cache en memoria
+    ga._cache_barridos.clear()
+    x_disco, _ = ga.barrido_cacheado(50, 3500, 1, 8000, directorio=str(tmp_path))
+    assert x_disco is not x
+    np.testing.assert_array_equal(x_disco, x)
+
+    assert ga.limpiar_cache_barridos(str(tmp_path)) == 2
+    assert not list(tmp_path.glob("*.npy")) and not ga._cache_barridos and not ga._cache_espectros
+
+def test_barrido_cacheado_memoria_acotada(monkeypatch):
+    monkeypatch.setattr(ga, "_cache_barridos", ga.OrderedDict())
+    monkeypatch.setattr(ga, "MAX_BARRIDOS", 2)
+    for t_sweep in (0.1, 0.2, 0.3):
+        ga.barrido_cacheado(50, 3500, t_sweep, 8000, directorio=None)
+    assert len(ga._cache_barridos) == 2
+    assert ga.clave_barrido(50, 3500, 0.1, 8000) not in ga._cache_barridos
+
+def test_clave_barrido_incluye_version(monkeypatch):
+    clave = ga.clave_barrido(20, 20000, 10, 44100)
+    monkeypatch.setattr(ga, "VERSION_BARRIDO", ga.VERSION_BARRIDO + 1)
+    assert ga.clave_barrido(20, 20000, 10, 44100) != clave
@@ -0,0 +1,74 @@
+import logging
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy import signal
+from generacion_adquisicion import log_sweep_invfilter
+from preprocesamiento_filtrado import (BancoFiltrosFFT, BancoFiltrosIEC, BancoFiltrosMultitasa, filtro_IEC,
+                                      longitud_fft, mascaras_fft, respuesta_impulso, ri_sintetica)
+from suavizado_calculo import parametros_bandas
+
+FS = 8000
+
+def test_filtro_iec_no_imprime(capsys, caplog):
+    data = np.random.default_rng(0).standard_normal(FS)
+    with caplog.at_level(logging.DEBUG, logger="preprocesamiento_filtrado"):
+        bandas = filtro_IEC(data, FS, guardar_wav=False)
+    assert capsys.readouterr().out == ""
+    assert sum("Frecuencia central" in mensaje for mensaje in caplog.messages) == len(bandas)
+
+def test_respuesta_impulso_desde_parametros_del_sweep(tmp_path):
+    x, k_t = log_sweep_invfilter(50, 3500, 1, FS, guardar_wav=False)
+    grabacion, invfilter = str(tmp_path / "grabacion.wav"), str(tmp_path / "invfilter.wav")
+    ri = np.zeros(400)
+    ri[50], ri[120] = 1, 0.3
+    sf.write(grabacion, signal.fftconvolve(x, ri), FS, subtype="DOUBLE")
+    sf.write(invfilter, k_t, FS, subtype="DOUBLE")
+    for largo_ri in (None, 400):
+        desde_archivo = respuesta_impulso(grabacion, invfilter, largo_ri=largo_ri, guardar_wav=False)
+        desde_barrido = respuesta_impulso(grabacion, (50, 3500, 1, FS), largo_ri=largo_ri, guardar_wav=False)
+        np.testing.assert_allclose(desde_barrido, desde_archivo, atol=1e-12)
+
+@pytest.fixture(scope="module")
+def ri():
+    t60 = np.linspace(1.5, 0.6, len(BancoFiltrosIEC(FS).frecuencias))
+    return ri_sintetica(t60, FS, duracion=1.5, ruido_dB=-70, seed=0)
+
+def _parametros(bandas, frecuencias):
+    return parametros_bandas(bandas, None, frecuencias, fs=FS, n_workers=1)
+
+def test_banco_multitasa_igual_al_iir(ri):
+    banco = BancoFiltrosMultitasa(FS)
+    iir = BancoFiltrosIEC(FS).filtrar(ri)
+    multitasa = banco.filtrar(ri, interpolar=True)
+    assert banco.niveles > 1
+    for i, (_, nivel, _) in enumerate(banco.bandas):
+        if nivel == 0:
+            np.testing.assert_array_equal(multitasa[i], iir[i])
+    referencia, resultado = _parametros(iir, banco.frecuencias), _parametros(multitasa, banco.frecuencias)
+    np.testing.assert_allclose(resultado["T30"], referencia["T30"], rtol=0.01)
+    np.testing.assert_allclose(resultado["C80"], referencia["C80"], atol=0.1)
+
+def test_banco_fft_igual_al_iir(ri):
+    banco = BancoFiltrosFFT(FS)
+    iir = BancoFiltrosIEC(FS).filtrar(ri)
+    referencia, resultado = _parametros(iir, banco.frecuencias), _parametros(banco.filtrar(ri), banco.frecuencias)
+    # Incluye la banda de 4 kHz, recortada en Nyquist (antes su T30 daba 4 % menos)
+    np.testing.assert_allclose(resultado["T30"], referencia["T30"], rtol=0.035)
+
+def test_mascara_de_la_banda_recortada_en_nyquist():
+    n_fft = 4096
+    mascaras = mascaras_fft(FS, n_fft)
+    _, _, superior, sos = BancoFiltrosIEC(FS).bandas[-1]
+    assert superior == FS/2 - 1
+    f = np.fft.rfftfreq(n_fft, 1/FS)
+    np.testing.assert_allclose(mascaras[-1, 1:], np.abs(signal.sosfreqz(sos, worN=f[1:], fs=FS)[1]), atol=1e-12)
+    assert mascaras[-1, -1] < 1e-6
+
+def test_longitud_fft_comparte_mascaras():
+    assert [longitud_fft(n) for n in (1, 5, 7, 1000, 4097, 6145)] == [1, 6, 8, 1024, 6144, 8192]
+    banco = BancoFiltrosFFT(FS)
+    mascaras_fft.cache_clear()
+    for n in (FS, FS + 10, FS + 100):
+        banco.filtrar(np.ones(n))
+    assert mascaras_fft.cache_info().misses == 1
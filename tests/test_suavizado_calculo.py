@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+from scipy import signal
+from funciones import modo_precision
+from preprocesamiento_filtrado import BancoFiltrosIEC, ri_sintetica
+from suavizado_calculo import (AjusteDecaimiento, EnergiaAcumulada, deteccion_inicio, lundeby, media_movil,
+                               parametros_bandas, parametros_energia, schroeder, suavizado_señal)
+
+FS = 8000
+
+def _media_movil_lazo(x, w_size):
+    # Implementación original de suavizado_señal, ventana por ventana
+    medias = [np.mean(x[i:i + w_size]) for i in range(len(x) - (w_size - 1))]
+    return np.array(medias + [medias[-1]]*(w_size - 1))
+
+@pytest.mark.parametrize("w_size", [1, 7, 100, 999])
+def test_media_movil_igual_al_lazo_original(w_size):
+    x = np.abs(np.random.default_rng(0).standard_normal(1000))
+    np.testing.assert_allclose(media_movil(x, w_size, dtype=np.float64), _media_movil_lazo(x, w_size),
+                               rtol=1e-12, atol=1e-12)
+
+def test_media_movil_multicanal_y_en_el_lugar():
+    x = np.abs(np.random.default_rng(1).standard_normal((500, 3)))
+    esperado = np.column_stack([_media_movil_lazo(x[:, c], 50) for c in range(3)])
+    np.testing.assert_allclose(media_movil(x, 50, dtype=np.float64), esperado, rtol=1e-12)
+    y = x.copy()
+    assert media_movil(y, 50, dtype=np.float64, out=y) is y
+    np.testing.assert_allclose(y, esperado, rtol=1e-12)
+
+@pytest.fixture(scope="module")
+def bandas():
+    banco = BancoFiltrosIEC(FS)
+    t60 = np.linspace(1.5, 0.6, len(banco.frecuencias))
+    ri = ri_sintetica(t60, FS, duracion=1.5, ruido_dB=-70, seed=0)
+    return banco.filtrar(ri), banco.frecuencias
+
+@pytest.mark.parametrize("multitasa", [False, True])
+@pytest.mark.parametrize("ejecutor", ["hilo", "proceso"])
+def test_parametros_bandas_paralelo_igual_a_serie(bandas, ejecutor, multitasa):
+    filtradas, frecuencias = bandas
+    serie = parametros_bandas(filtradas, None, frecuencias, fs=FS, n_workers=1, multitasa=multitasa)
+    paralelo = parametros_bandas(filtradas, None, frecuencias, fs=FS, n_workers=2, ejecutor=ejecutor,
+                                 multitasa=multitasa)
+    assert list(paralelo.index) == list(serie.index)
+    np.testing.assert_array_equal(paralelo.to_numpy(), serie.to_numpy())
+
+@pytest.mark.parametrize("ejecutor", ["hilo", "proceso"])
+def test_parametros_bandas_paralelo_respeta_la_precision(bandas, ejecutor):
+    filtradas, frecuencias = bandas
+    with modo_precision("float32"):
+        serie = parametros_bandas(filtradas, None, frecuencias, fs=FS, n_workers=1)
+        paralelo = parametros_bandas(filtradas, None, frecuencias, fs=FS, n_workers=2, ejecutor=ejecutor)
+    np.testing.assert_array_equal(paralelo.to_numpy(), serie.to_numpy())
+    explicito = parametros_bandas(filtradas, None, frecuencias, fs=FS, n_workers=2, ejecutor=ejecutor, dtype="float32")
+    np.testing.assert_array_equal(explicito.to_numpy(), serie.to_numpy())
+    assert not np.array_equal(serie.to_numpy(), parametros_bandas(filtradas, None, frecuencias, fs=FS, n_workers=1).to_numpy())
+
+def test_parametros_bandas_pool_de_procesos_por_defecto(bandas):
+    # Regresión: con los argumentos por defecto (pool de procesos, n_workers=None)
+    # el factor de diezmado llegaba a los procesos en el lugar de limit
+    filtradas, frecuencias = bandas
+    serie = parametros_bandas(filtradas, None, frecuencias, fs=FS, n_workers=1)
+    np.testing.assert_array_equal(parametros_bandas(filtradas, None, frecuencias, fs=FS).to_numpy(),
+                                  serie.to_numpy())
+
+def test_parametros_bandas_multitasa_requiere_frecuencias(bandas):
+    filtradas, _ = bandas
+    with pytest.raises(ValueError, match="frecuencias"):
+        parametros_bandas(filtradas, None, None, fs=FS, n_workers=1, multitasa=True)
+
+@pytest.mark.parametrize("n", [20011, 20000])
+def test_suavizado_señal_igual_a_hilbert_y_lazo_original(n):
+    # Regresión: la envolvente no debe cambiar respecto de scipy.signal.hilbert
+    # (con relleno hasta una longitud rápida se desviaba hasta un 3 % del pico)
+    t = np.arange(n)/FS
+    x = np.random.default_rng(3).standard_normal(n)*np.exp(-t/0.3)
+    esperado = _media_movil_lazo(np.abs(signal.hilbert(x)), 50)
+    np.testing.assert_allclose(suavizado_señal(x, 50), esperado, rtol=1e-9, atol=1e-12)
+
+@pytest.mark.parametrize("compensacion", [False, True])
+def test_schroeder_multicanal_igual_a_cada_canal(compensacion):
+    rng = np.random.default_rng(2)
+    t = np.arange(2*FS)/FS
+    ri = rng.standard_normal((len(t), 2))*np.exp(-6.9*t[:, None]/np.array([0.4, 0.9]))
+    ri += rng.standard_normal((len(t), 2))*np.array([1e-3, 1e-4])
+    curvas = schroeder(ri, None, FS, compensacion=compensacion)
+    largos = [len(schroeder(ri[:, c], None, FS, compensacion=compensacion)) for c in range(2)]
+    assert largos[0] != largos[1] and len(curvas) == max(largos)
+    for c, largo in enumerate(largos):
+        np.testing.assert_allclose(curvas[:largo, c], schroeder(ri[:, c], None, FS, compensacion=compensacion))
+        assert np.all(curvas[largo:, c] == -np.inf)
+
+def test_lundeby_piso_de_ruido_conocido():
+    rng = np.random.default_rng(1)
+    t60, ruido_dB = 0.8, -50
+    t = np.arange(3*FS)/FS
+    ri = rng.standard_normal(len(t))*10**(-3*t/t60) + rng.standard_normal(len(t))*10**(ruido_dB/20)
+    resultado = lundeby(ri, FS)
+    # El decaimiento alcanza el piso de ruido en t60*ruido_dB/-60
+    assert resultado.ruido_db == pytest.approx(ruido_dB, abs=3)
+    assert resultado.cruce/FS == pytest.approx(t60*ruido_dB/-60, rel=0.15)
+    assert -60/(resultado.pendiente*FS) == pytest.approx(t60, rel=0.15)
+
+def test_ajuste_decaimiento_igual_a_polyfit():
+    rng = np.random.default_rng(0)
+    muestras = 2000
+    t = np.linspace(0, muestras/FS, muestras)
+    curvas = -60*t[:, None]/np.array([0.5, 1.0, 2.0]) + rng.normal(0, 0.5, (muestras, 3))
+    ajuste = AjusteDecaimiento(curvas, FS)
+    for inicio, fin in [(0, muestras), (100, 900), (1500, 1510)]:
+        m, b = ajuste.ajuste(inicio, fin)
+        for canal in range(curvas.shape[1]):
+            m_ref, b_ref = np.polyfit(t[inicio:fin], curvas[inicio:fin, canal], 1)
+            assert m[canal] == pytest.approx(m_ref, rel=1e-6)
+            assert b[canal] == pytest.approx(b_ref, rel=1e-6)
+
+def _parametros_energia_directos(p, fs, inicio):
+    # Definiciones de ISO 3382 con sumas explícitas desde el inicio
+    e = p[inicio:]**2
+    n50, n80 = int(round(0.05*fs)), int(round(0.08*fs))
+    return dict(C50=10*np.log10(e[:n50].sum()/e[n50:].sum()), C80=10*np.log10(e[:n80].sum()/e[n80:].sum()),
+                D50=e[:n50].sum()/e.sum(), Ts=np.sum(np.arange(len(e))*e)/e.sum()/fs)
+
+def test_parametros_energia_desde_el_inicio():
+    rng = np.random.default_rng(4)
+    t = np.arange(FS)/FS
+    retardos = [120, 400]
+    ri = np.zeros((FS + 500, 2))
+    for canal, retardo in enumerate(retardos):
+        ri[retardo + 5:retardo + 5 + FS, canal] = rng.standard_normal(FS)*np.exp(-6.9*t/0.5)
+        ri[retardo, canal] = 4
+        ri[:retardo, canal] = 1e-3*rng.standard_normal(retardo)
+    np.testing.assert_array_equal(deteccion_inicio(ri), retardos)
+
+    resultado = parametros_energia(ri, FS)
+    for canal, retardo in enumerate(retardos):
+        for parametro, valor in _parametros_energia_directos(ri[:, canal], FS, retardo).items():
+            assert resultado[parametro][canal] == pytest.approx(valor, rel=1e-9)
+
+    # Bandas en el eje 0 y tiempo en el eje 1, con el inicio de la RI de banda ancha
+    bandas = np.stack([ri, 0.5*ri])
+    energia = EnergiaAcumulada(bandas, FS, inicio=deteccion_inicio(ri), eje=1)
+    np.testing.assert_allclose(energia.claridad(0.08), [resultado["C80"]]*2)
+    np.testing.assert_allclose(energia.centro_tiempo(), [resultado["Ts"]]*2)
@@ -0,0 +1,53 @@
+import contextvars
+import threading
+import time
+import telemetria
+from telemetria import SumideroMemoria, activa, medir, resumen, sesion
+
+def _en_hilo(funcion):
+    resultado = []
+    hilo = threading.Thread(target=lambda: resultado.append(funcion()))
+    hilo.start()
+    hilo.join()
+    return resultado[0]
+
+def test_sesion_anidada_restaura_el_estado():
+    assert not activa()
+    with sesion(SumideroMemoria()) as externo:
+        with sesion(SumideroMemoria()) as interno:
+            with medir("etapa", banda=1000):
+                pass
+        with medir("etapa"):
+            pass
+        assert activa()
+    assert not activa()
+    assert [evento["banda"] for evento in interno.eventos] == [1000]
+    assert [evento["ruta"] for evento in externo.eventos] == ["etapa"]
+
+def test_sesion_por_hilo():
+    with sesion(SumideroMemoria()) as sumidero:
+        # Un hilo nuevo no hereda la sesión; con copy_context sí
+        assert not _en_hilo(activa)
+        contexto = contextvars.copy_context()
+        assert _en_hilo(lambda: contexto.run(activa))
+        # Una sesión en otro hilo no cambia la de este
+        def otra_sesion():
+            with sesion(SumideroMemoria()):
+                return activa()
+        assert _en_hilo(otra_sesion)
+        assert telemetria._estado.get()[0] == (sumidero,)
+
+def test_cpu_del_hilo_de_la_etapa():
+    def ocupar():
+        fin = time.perf_counter() + 0.2
+        while time.perf_counter() < fin:
+            pass
+    with sesion(SumideroMemoria()) as sumidero:
+        with medir("espera"):
+            hilo = threading.Thread(target=ocupar)
+            hilo.start()
+            hilo.join()
+    evento, = sumidero.eventos
+    assert evento["duracion"] >= 0.2
+    assert evento["cpu"] < 0.5*evento["duracion"]
+    assert resumen(sumidero.eventos).loc["espera", "n"] == 1